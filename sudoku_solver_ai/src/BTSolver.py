@@ -1,27 +1,129 @@
 import SudokuBoard
 import Variable
 import Domain
+import BitDomain
 import Trail
 import Constraint
 import ConstraintNetwork
+import VariableQueue
+import SolverStats
+import SolveResult
+import NogoodStore
 import time
 import random
-from collections import deque, Counter, defaultdict
+from collections import deque
 from pprint import pprint
 
 
+def luby(i):
+    """
+        Return: the i-th term (from 1) of the Luby sequence
+                1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
 class BTSolver:
 
+    # Restart strategies, see restartCutoff
+    RESTARTS = ["luby", "geometric"]
+
+    # Growth of the cutoff from one geometric restart to the next
+    GEOMETRIC_FACTOR = 1.5
+
+    # Shortest run allowed. A run of a few backtracks is cut off before
+    # it can finish even an easy subtree: on 6x6 boards without
+    # propagation a base of 5 took 12 times the nodes of a single run.
+    MIN_RESTART_BASE = 10
+
     # ==================================================================
     # Constructors
     # ==================================================================
 
-    def __init__(self, gb, trail, val_sh, var_sh, cc):
+    """
+        @param backjump     jump back to the deepest decision a failure
+                            follows from instead of the last one, see explain
+        @param nogoods      keep up to this many nogoods learned while
+                            backjumping, 0 for none; implies backjump
+        @param restarts     "luby" or "geometric" to cut each run of the
+                            search off after a growing number of
+                            backtracks and start over, None for a single
+                            run; see restartCutoff
+        @param restartBase  backtracks of the shortest run, at least
+                            MIN_RESTART_BASE. Without propagation (cc
+                            neither forward checking nor Norvig's)
+                            backtracks are cheap and plentiful, so it
+                            takes a base in the hundreds to pay off, if
+                            restarts pay off at all
+        @param maxRestarts  restarts after which the run is no longer cut
+                            off, None for no bound
+        @param seed         seed of the random tie-breaking in the
+                            variable and value heuristics, which restarts
+                            turn on; None for a fresh one
+        @param bitDomains   keep the domains as BitDomain masks instead
+                            of value lists; see BitDomain for when that
+                            pays off
+    """
+
+    def __init__(self, gb, trail, val_sh, var_sh, cc, backjump=False, nogoods=0,
+                 restarts=None, restartBase=100, maxRestarts=None, seed=None, bitDomains=False):
         self.network = ConstraintNetwork.ConstraintNetwork(gb)
+        if bitDomains:
+            # every domain, givens included: LCV and the trail compare them
+            for v in self.network.getVariables():
+                v.domain = BitDomain.BitDomain(v.domain.values)
         self.hassolution = False
         self.gameboard = gb
         self.trail = trail
 
+        self.stats = SolverStats.SolverStats()
+
+        # SolveResult of the last solve, and the best partial assignment
+        # it reached (see recordPartial)
+        self.result = None
+        self.bestAssigned = -1
+        self.bestBoard = None
+
+        # Frames of a search stopped by a limit, so the next call resumes
+        # it; expandPending is set when it stopped before expanding a node
+        self.stack = None
+        self.expandPending = False
+
+        # solutions found by the last countSolutions
+        self.numSolutions = 0
+
+        # Conflict-directed backjumping: reasons maps every assignment made
+        # by the search, keyed by its variable, and every value removed,
+        # keyed by (variable, value), to the decision levels it follows
+        # from, as a bitmask; reasonLog lists the keys in the order they
+        # were set and reasonMarks where each level starts in it
+        self.backjump = backjump or nogoods > 0
+        self.reasons = dict() if self.backjump else None
+        self.reasonLog = []
+        self.reasonMarks = []
+        self.conflict = None  # levels of the last failure, set by the propagators
+        self.nogoods = NogoodStore.NogoodStore(nogoods) if nogoods > 0 else None
+
+        # Restarts: restartRun counts the runs cut off so far, and
+        # restartAt is the backtrack count ending the current one, None
+        # once runs are no longer cut off
+        if restarts is not None and restarts not in BTSolver.RESTARTS:
+            raise ValueError("Unknown restart strategy " + str(restarts))
+        if restartBase < BTSolver.MIN_RESTART_BASE:
+            raise ValueError("restartBase must be at least " + str(BTSolver.MIN_RESTART_BASE))
+        self.restarts = restarts
+        self.restartBase = restartBase
+        self.maxRestarts = maxRestarts
+        self.restartRun = 0
+        self.restartAt = None
+
+        # breaks heuristic ties at random when set
+        self.random = random.Random(seed) if restarts is not None or seed is not None else None
+
         self.varHeuristics = var_sh
         self.valHeuristics = val_sh
         self.cChecks = cc
@@ -30,30 +132,35 @@ class BTSolver:
         self.assignedVars = deque()  # should perhaps refactor this to be more clear
 
         """ NORVIG CHECKING HELPER MEMORY"""
-        # Create a value index tracker to:
-        # 1) Track the count of each value (corresponding to the N - length of either set)
-        # 2) Retrieve in constant time the index of the variable which must have a certain value
+        # Unit membership and per-value candidate counts live in the
+        # network (shared geometry index, Constraint.candidateCounts)
 
         self.N = self.gameboard.N
 
-        rows = defaultdict(list)
-        cols = defaultdict(list)
-        blocks = defaultdict(list)
-
-        for var in self.network.getVariables():
-            if var not in rows[var.row]:
-                rows[var.row].append(var)
-
-            if var not in cols[var.col]:
-                cols[var.col].append(var)
-
-            if var not in blocks[var.block]:
-                blocks[var.block].append(var)
-
-        self.units = [rows, cols, blocks]
+        if self.cChecks in ["norvigCheck", "tournCC"]:
+            self.network.trackCandidates()
 
         self.arcConsistency()
 
+        # MRV and the learning heuristics select through a priority queue
+        # instead of a full scan
+        self.variableQueue = None
+        if var_sh == "MinimumRemainingValue":
+            self.variableQueue = VariableQueue.VariableQueue(self.network)
+        elif var_sh in ["MRVwithTieBreaker", "tournVar"]:
+            self.variableQueue = VariableQueue.VariableQueue(self.network, useDegree=True)
+        elif var_sh == "DomOverWeightedDegree":
+            self.variableQueue = VariableQueue.VariableQueue(self.network, weighting="wdeg")
+        elif var_sh == "ActivityDecay":
+            self.variableQueue = VariableQueue.VariableQueue(self.network, weighting="activity")
+
+        # the queue of a learning heuristic, told of every failure
+        self.weightedQueue = None
+        if self.variableQueue is not None and self.variableQueue.weighting is not None:
+            self.weightedQueue = self.variableQueue
+        if self.random is not None and self.variableQueue is not None:
+            self.variableQueue.shuffle(self.random)
+
     # ==================================================================
     # Consistency Checks
     # ==================================================================
@@ -62,6 +169,8 @@ class BTSolver:
     def assignmentsCheck(self):
         for c in self.network.getConstraints():
             if not c.isConsistent():
+                if self.weightedQueue is not None:
+                    self.weightedQueue.constraintFailed(c)
                 return False
         return True
 
@@ -80,7 +189,12 @@ class BTSolver:
     """
 
     def forwardChecking(self):
+        reasons = self.reasons
         if not self.network.isConsistent():
+            if reasons is not None:
+                self.conflict = self.assignmentConflict(self.assignedVars[0])
+            if self.weightedQueue is not None:
+                self.clashFailed(self.assignedVars[0])
             return ({}, False)
 
         modified_var_domains = {}
@@ -88,18 +202,29 @@ class BTSolver:
 
         while assignedVarsRecent:
             var = assignedVarsRecent.popleft()
+            val = var.getAssignment()
 
             for neighbor in self.network.getNeighborsOfVariable(var):
-                if neighbor.isChangeable and not neighbor.isAssigned() and neighbor.getDomain().contains(var.getAssignment()):
+                if neighbor.isChangeable and not neighbor.isAssigned() and neighbor.getDomain().contains(val):
 
                     self.trail.push(neighbor)
-                    neighbor.removeValueFromDomain(var.getAssignment())
+                    neighbor.removeValueFromDomain(val)
+                    self.stats.domainRemovals += 1
+                    if reasons is not None:
+                        self.explain((neighbor, val), reasons.get(var, 0))
                     if neighbor.getDomain().size() == 1:
                         self.trail.push(neighbor)
-                        neighbor.assignValue(neighbor.domain.values[0])
+                        if reasons is not None:
+                            self.explainSingleton(neighbor)
+                        neighbor.assignValue(neighbor.domain.first())
+                        self.stats.propagations += 1
                         assignedVarsRecent.append(neighbor)
 
                         if not self.network.isConsistent():
+                            if reasons is not None:
+                                self.conflict = self.assignmentConflict(neighbor)
+                            if self.weightedQueue is not None:
+                                self.clashFailed(neighbor)
                             return (modified_var_domains, False)
 
                     modified_var_domains[var] = var.getDomain()
@@ -110,24 +235,24 @@ class BTSolver:
     # Arc Consistency
     # =================================================================
     def arcConsistency(self):
-        assigned = set()
-
-        for c in self.network.constraints:  # optimize
-            for v in c.vars:
-                if v.isAssigned() and (v.row, v.col) not in assigned:
-                    self.assignedVars.append(v)
-                    value, row, col = v.getAssignment(), v.row, v.col
-                    assigned.add((v.row, v.col))
+        # variables are in row-major order, the order the row constraints
+        # visit them in, so each assigned variable is seen exactly once
+        for v in self.network.getVariables():
+            if v.isAssigned():
+                self.assignedVars.append(v)
 
         assignedVarsCopy = self.assignedVars.copy()
 
         while len(assignedVarsCopy) != 0:
             av = assignedVarsCopy.popleft()
+            val = av.getAssignment()
             for neighbor in self.network.getNeighborsOfVariable(av):
-                if neighbor.isChangeable and not neighbor.isAssigned() and neighbor.getDomain().contains(av.getAssignment()):
-                    neighbor.removeValueFromDomain(av.getAssignment())
+                if neighbor.isChangeable and not neighbor.isAssigned() and neighbor.getDomain().contains(val):
+                    neighbor.removeValueFromDomain(val)
+                    self.stats.domainRemovals += 1
                     if neighbor.domain.size() == 1:
-                        neighbor.assignValue(neighbor.domain.values[0])
+                        neighbor.assignValue(neighbor.domain.first())
+                        self.stats.propagations += 1
                         assignedVarsCopy.append(neighbor)
 
     """
@@ -148,109 +273,230 @@ class BTSolver:
                 The bool is true if assignment is consistent, false otherwise.
     """
 
-    def norvigCheck(self):  # Good time for encapsulation
+    def norvigCheck(self):
+        reasons = self.reasons
         if not self.network.isConsistent():
+            if reasons is not None:
+                self.conflict = self.assignmentConflict(self.assignedVars[0])
+            if self.weightedQueue is not None:
+                self.clashFailed(self.assignedVars[0])
             return ({}, False)
 
-        modified_var_domains = {}
         assignedVarsRecent = deque([self.assignedVars[0]])
 
         variables_assigned = {}
 
-        modified_vars = []
-
         while assignedVarsRecent:
-            var = assignedVarsRecent.popleft()
-
-            for neighbor in self.network.getNeighborsOfVariable(var):
-                if neighbor.isChangeable and not neighbor.isAssigned() and neighbor.getDomain().contains(var.getAssignment()):
+            # (1) eliminate assigned values from the neighbors
+            while assignedVarsRecent:
+                var = assignedVarsRecent.popleft()
+                val = var.getAssignment()
 
-                    self.trail.push(neighbor)
-                    modified_vars.append(neighbor)
+                for neighbor in self.network.getNeighborsOfVariable(var):
+                    if neighbor.isChangeable and not neighbor.isAssigned() and neighbor.getDomain().contains(val):
 
-                    neighbor.removeValueFromDomain(var.getAssignment())
-                    if neighbor.getDomain().size() == 1:
-                        value = neighbor.domain.values[0]
                         self.trail.push(neighbor)
-                        neighbor.assignValue(value)
-                        variables_assigned[var] = value
-                        assignedVarsRecent.append(neighbor)
-
-                        if not self.network.isConsistent():
-                            return (variables_assigned, False)
-
-        # change the self variables in constraintnetwork back
-        # find a different method
 
-        # track the counts of each rows and cols
-        # need to also backtrack the counts of each rows and cols and blocks
+                        neighbor.removeValueFromDomain(val)
+                        self.stats.domainRemovals += 1
+                        if reasons is not None:
+                            self.explain((neighbor, val), reasons.get(var, 0))
+                        if neighbor.getDomain().size() == 1:
+                            value = neighbor.domain.first()
+                            self.trail.push(neighbor)
+                            if reasons is not None:
+                                self.explainSingleton(neighbor)
+                            neighbor.assignValue(value)
+                            self.stats.propagations += 1
+                            variables_assigned[neighbor] = value
+                            assignedVarsRecent.append(neighbor)
+
+                            if not self.network.isConsistent():
+                                if reasons is not None:
+                                    self.conflict = self.assignmentConflict(neighbor)
+                                if self.weightedQueue is not None:
+                                    self.clashFailed(neighbor)
+                                return (variables_assigned, False)
+
+            # (2) the network queues every (unit, value) whose candidate count
+            # dropped to 0 or 1, so only units touched since the last pass
+            # are visited. Entries may be stale, so recheck the count.
+            for c, val in self.network.popPendingSingles():
+                count = c.candidateCounts[val]
+                if count == 0:
+                    if reasons is not None:
+                        self.conflict = self.unitConflict(c, val, None)
+                    if self.weightedQueue is not None:
+                        self.weightedQueue.constraintFailed(c)
+                    return (variables_assigned, False)
+                if count != 1:
+                    continue
+
+                for var in c.vars:
+                    if var.getDomain().contains(val):
+                        if not var.isAssigned():
+                            self.trail.push(var)
+                            if reasons is not None:
+                                self.explainAssignment(var, val, self.unitConflict(c, val, var))
+                            var.assignValue(val)
+                            self.stats.propagations += 1
+                            self.stats.hiddenSingles += 1
+                            variables_assigned[var] = val
+                            assignedVarsRecent.append(var)
+                            if not self.network.isConsistent():
+                                if reasons is not None:
+                                    self.conflict = self.assignmentConflict(var)
+                                if self.weightedQueue is not None:
+                                    self.clashFailed(var)
+                                return (variables_assigned, False)
+                        break
 
-        # get the modified var domains
-
-        # just check the modified var domains
-
-        # count each row, each col, and each block
-        # check the modified
-
-        """
-        Keep an array of hashmap of hashmaps in the class to keep track of domain counts of each row/col/block
-
-        Update counts durin arc  consistency porrtion
-
-        In Norvig, iterate over the modified domains of 
-        to check all affected rows, columns and blocks
-
-        how to reduce number of counts to check for counter[val] == 1
+        return (variables_assigned, True)
 
-        Use the set of modified domains to backtrack this 
+    """
+         Optional TODO: Implement your own advanced Constraint Propagation
 
+         Completing the three tourn heuristic will automatically enter
+         your program into a tournament.
+    """
 
-        
-        """
+    def getTournCC(self):
 
-        for units_type in self.units:  # O(NNq)
+        return self.norvigCheck()
 
-            # count the values in each unit (ex row)
-            # should be able to do this at beginning and avoid repeated work
+    # ==================================================================
+    # Conflict-Directed Backjumping
+    # ==================================================================
 
-            units = list(units_type.values())
+    """
+        With backjump set, the propagators record why each assignment and
+        each removal they make holds, as the set of decision levels it
+        follows from: bit k stands for the value tried at stack frame k.
+        A removal follows from the assignment that caused it, a naked
+        single from the removals of its other values, and a hidden single
+        from the removals of its value from the rest of the unit. Givens
+        and anything derived before the search belong to no level.
+
+        A failure follows from the levels of the two clashing assignments,
+        or of the removals that emptied a unit of a value. Once every
+        value of a frame has failed, the union of their levels, without
+        the frame's own, holds every decision the failure depends on, so
+        the search returns straight to the deepest of them; the levels in
+        between cannot change the outcome and are skipped.
+    """
 
-            for unit_index in range(self.N):
+    # Records the levels of an assignment or removal for the current level
+    def explain(self, key, levels):
+        self.reasons[key] = levels
+        self.reasonLog.append(key)
+
+    # Records v = val, along with the removal of v's other values
+    def explainAssignment(self, v, val, levels):
+        for other in v.domain.others(val):
+            self.explain((v, other), levels)
+        self.explain(v, levels)
+
+    # Records the assignment of v to the one value left in its domain
+    def explainSingleton(self, v):
+        self.explain(v, self.removalConflict(v))
+
+    # Levels of the removals of every value gone from the domain of v
+    def removalConflict(self, v):
+        reasons = self.reasons
+        levels = 0
+        for val in range(1, self.N + 1):
+            levels |= reasons.get((v, val), 0)
+        return levels
+
+    # Levels of the removals of val from the variables of c other than v
+    def unitConflict(self, c, val, v):
+        reasons = self.reasons
+        levels = 0
+        for x in c.vars:
+            if x is not v:
+                levels |= reasons.get((x, val), 0)
+        return levels
+
+    # Levels of the clash between v and a neighbor holding the same value
+    def assignmentConflict(self, v):
+        reasons = self.reasons
+        val = v.getAssignment()
+        for x in self.network.getNeighborsOfVariable(v):
+            if x.isAssigned() and x.getAssignment() == val:
+                return reasons.get(v, 0) | reasons.get(x, 0)
+        # unexplained: blame every level, i.e. backtrack chronologically
+        return (1 << len(self.stack or ())) - 1
+
+    # Levels of the failure of the last consistency check
+    def takeConflict(self, v):
+        conflict = self.conflict
+        self.conflict = None
+        if conflict is None:
+            conflict = self.assignmentConflict(v)
+        return conflict
+
+    # Undoes the last level, on the trail and in reasons
+    def undoLevel(self):
+        self.trail.undo()
+        if self.reasons is not None:
+            mark = self.reasonMarks.pop()
+            log = self.reasonLog
+            for key in log[mark:]:
+                self.reasons.pop(key, None)
+            del log[mark:]
 
-                # optimize
-                counter = Counter()
-                # count the frequency of each value in domains in the unit
-                for i in range(1, self.N+1):  # O(nq)
-                    for val in units[unit_index][i-1].getDomain().values:
-                        counter[val] += 1
+    """
+        Called once the frame on top of the stack ran out of values and
+        was popped, with conflict the levels its failure follows from.
+        Learns the decisions at those levels as a nogood, undoes the
+        levels above the deepest of them and hands it the rest.
 
-                # find a value with a single possible location in this unit
-                # find the only variable which it can be assigned to
-                for i in range(1, self.N+1):  # O(nq)
-                    if counter[i] == 1:
-                        # find the one domain in unit that has i for a possible value
+        Return: False if conflict is empty, i.e. the board has no solution
+    """
 
-                        # optimize
-                        for var in units[unit_index]:
-                            if not var.isAssigned() and var.getDomain().contains(i):
-                                self.trail.push(var)
-                                var.assignValue(i)
-                                variables_assigned[var] = i
-                                if not self.network.isConsistent():
-                                    return (variables_assigned, False)
+    def backjumpTo(self, stack, conflict):
+        if self.nogoods is not None and conflict:
+            nogood = []
+            levels = conflict
+            while levels:
+                k = levels.bit_length() - 1
+                levels ^= 1 << k
+                v = stack[k][0]
+                nogood.append((v, v.getAssignment()))
+            self.nogoods.add(nogood)
+
+        target = conflict.bit_length() - 1
+        while len(stack) > target + 1:
+            frame = stack.pop()
+            if frame[2]:
+                self.undoLevel()
+            self.stats.backjumps += 1
+
+        if target < 0:
+            return False
+        stack[target][3] |= conflict & ~(1 << target)
+        return True
 
-        return (variables_assigned, True)
+    # ==================================================================
+    # Failure Weighting
+    # ==================================================================
 
     """
-         Optional TODO: Implement your own advanced Constraint Propagation
-
-         Completing the three tourn heuristic will automatically enter
-         your program into a tournament.
+        The learning variable heuristics, dom/wdeg and activity, rank
+        variables by what failed so far: every time a propagator finds
+        the board inconsistent, it names the constraint that failed to the
+        variable queue, see VariableQueue.constraintFailed. That is the
+        unit left with no place for a value, or the unit holding two
+        equal values, found here.
     """
 
-    def getTournCC(self):
-
-        return self.norvigCheck()
+    # Reports the constraint where v's value clashed with a neighbor's
+    def clashFailed(self, v):
+        val = v.getAssignment()
+        for c in self.network.getConstraintsContainingVariable(v):
+            if c.valueCounts.get(val, 0) > 1:
+                self.weightedQueue.constraintFailed(c)
+                return
 
     # ==================================================================
     # Variable Selectors
@@ -271,17 +517,13 @@ class BTSolver:
         Return: The unassigned variable with the smallest domain
     """
 
-    def getMRV(self):  # optimize by calculating at start
+    def getMRV(self):
+        if self.variableQueue is not None and not self.variableQueue.useDegree:
+            return self.variableQueue.select()
+
         min_domain_size = float("inf")
         min_rem_vals_var = None
 
-        """
-        Potential Optimizations:
-        Store this as a dict[set] in the class itself. Prevent recalculation and can update as board is solved.
-        # track assigned and uniassigned varaibles
-        # use itertools to use c instead
-        """
-
         for v in self.network.variables:
             if not v.isAssigned() and v.getDomain().size() < min_domain_size:
                 min_domain_size = v.getDomain().size()
@@ -337,6 +579,8 @@ class BTSolver:
      """
 
     def getTournVar(self):
+        if self.variableQueue is not None and self.variableQueue.useDegree:
+            return self.variableQueue.select()
 
         return self.MRVwithTieBreaker()[0]
 
@@ -344,9 +588,12 @@ class BTSolver:
     # Value Selectors
     # ==================================================================
 
-    # Default Value Ordering
+    # Default Value Ordering; every value ties, so with random
+    # tie-breaking the order is random
     def getValuesInOrder(self, v):
         values = v.domain.values
+        if self.random is not None:
+            return self.random.sample(values, len(values))
         return sorted(values)
 
     """
@@ -365,23 +612,31 @@ class BTSolver:
         Bucket sort: O(nlogn) -> O(n)
         """
 
-        domain = set(v.getDomain().values)
-        value_knockout_count = Counter()  # (k: v) -- (Value: # Neighbors knocked out)
+        values = v.getDomain().values
 
         # Count # of neighbors that match any of the values in the domain of v
-        for v in self.network.getNeighborsOfVariable(v):
-            for val in v.getDomain().values:
-                if val in domain:
-                    value_knockout_count[val] += 1
+        # (k: v) -- (Value: # Neighbors knocked out)
+        value_knockout_count = v.getDomain().countShared(
+            n.getDomain() for n in self.network.getNeighborsOfVariable(v))
 
         # Alternatively, bucket sort is efficient because of the constrained domains of each value is maximally the max(width, height) of the board
 
+        # With random tie-breaking, values with equal counts come out of
+        # the stable sort in random order
+        counts = value_knockout_count.items()
+        if self.random is not None:
+            values = self.random.sample(values, len(values))
+            counts = self.random.sample(list(counts), len(counts))
+
         # print(value_knockout_count)
         lcv_sorted_counts = sorted(
-            value_knockout_count.items(), key=lambda pair: pair[1])
+            counts, key=lambda pair: pair[1])
 
-        # Get just the values from the sorted pairs
-        lcv_sorted_vals = [val for val, count in lcv_sorted_counts]
+        # Get just the values from the sorted pairs. Values no neighbor
+        # holds knock nothing out and come first; leaving them out would
+        # make the search incomplete.
+        lcv_sorted_vals = [val for val in values if val not in value_knockout_count]
+        lcv_sorted_vals += [val for val, count in lcv_sorted_counts]
 
         return lcv_sorted_vals
 
@@ -399,53 +654,361 @@ class BTSolver:
     # Engine Functions
     # ==================================================================
 
+    """
+        Depth-first search over an explicit stack instead of recursion, so
+        the search depth is not bounded by Python's recursion limit and no
+        frame is created per node. Each stack entry holds the branching
+        variable, the iterator over its remaining values, whether one of
+        them is currently assigned and, when backjumping, the levels its
+        failed values were blamed on; the trail gets one marker per assigned
+        value, exactly as in the recursive formulation.
+
+        Return: 0 once the search finished (check hassolution), or -1 if
+                it gave up because time_left dropped to 60 seconds
+    """
+
     def solve(self, time_left=600):
-        if time_left <= 60:
-            return -1
+        status = self.runSearch(time.monotonic() + time_left - 60, None, None)
+        return -1 if status == SolveResult.SolveResult.TIMEOUT else 0
 
-        start_time = time.time()
-        if self.hassolution:
-            return 0
+    """
+        Runs the search under optional limits, each None for no limit.
+        A run stopped by a limit is resumed by the next solve or
+        solveWithin call, so a search can be run in slices.
+
+        @param timeLimit      seconds of wall-clock time
+        @param maxNodes       nodes to expand
+        @param maxBacktracks  backtracks to allow
+        Return: a SolveResult with the status, the solution or the best
+                partial assignment reached, and the stats; also kept in
+                self.result
+    """
 
-        # Variable Selection
-        v = self.selectNextVariable()
+    def solveWithin(self, timeLimit=None, maxNodes=None, maxBacktracks=None):
+        deadline = time.monotonic() + timeLimit if timeLimit is not None else None
+        self.runSearch(deadline, maxNodes, maxBacktracks)
+        return self.result
 
-        # check if the assigment is complete
-        if (v == None):
-            # Success
-            self.hassolution = True
-            return 0
+    """
+        Counts the solutions of the board, up to limit, by resuming the
+        search after each one: its last decision is undone through the
+        trail as if the solution were a dead end. The limits are as in
+        solveWithin and cover the whole count.
+
+        @param limit  stop once this many solutions were found, None to
+                      count them all; 2 is enough to tell a unique board
+        Return: the number of solutions found, also kept in
+                self.numSolutions. self.result holds the first solution;
+                its status is TIMEOUT or BUDGET if a limit cut the count
+                short, which then is only a lower bound.
+    """
+
+    def countSolutions(self, limit=None, timeLimit=None, maxNodes=None, maxBacktracks=None):
+        stats = self.stats
+        deadline = time.monotonic() + timeLimit if timeLimit is not None else None
+        nodes = stats.nodes
+        backtracks = stats.backtracks
+
+        count = 0
+        first = None
+        resumed = False
+        status = SolveResult.SolveResult.UNSAT
+        while limit is None or count < limit:
+            nodesLeft = maxNodes - (stats.nodes - nodes) if maxNodes is not None else None
+            backtracksLeft = maxBacktracks - (stats.backtracks - backtracks) if maxBacktracks is not None else None
+            # restarting past a full assignment would find it again
+            status = self.runSearch(deadline, nodesLeft, backtracksLeft, not resumed)
+            if status != SolveResult.SolveResult.SOLVED:
+                break
+            resumed = True
+            self.hassolution = False
+            # a full assignment that still breaks a constraint is a
+            # dead end, not a solution
+            if not self.network.isConsistent():
+                continue
+            count += 1
+            if first is None:
+                first = self.result.board
+
+        self.numSolutions = count
+        self.hassolution = count > 0
+        if count > 0:
+            if not self.result.isLimited():
+                status = SolveResult.SolveResult.SOLVED
+            self.result = SolveResult.SolveResult(status, first, self.gameboard.N * self.gameboard.N, stats)
+        return count
+
+    # The search loop behind solve and solveWithin, returns the status
+    def runSearch(self, deadline, maxNodes, maxBacktracks, restart=True):
+        stats = self.stats
+        start_time = time.perf_counter()
+        nodeLimit = stats.nodes + maxNodes if maxNodes is not None else None
+        backtrackLimit = stats.backtracks + maxBacktracks if maxBacktracks is not None else None
+
+        if stats.profiler is not None:
+            stats.profiler.enable()
+        try:
+            if self.restarts is not None and restart:
+                status = self.restartLoop(deadline, nodeLimit, backtrackLimit)
+            else:
+                status = self.searchLoop(deadline, nodeLimit, backtrackLimit)
+        finally:
+            if stats.profiler is not None:
+                stats.profiler.disable()
+            stats.timeTotal += time.perf_counter() - start_time
+
+        if status == SolveResult.SolveResult.SOLVED:
+            board = self.getSolution()
+            assigned = self.gameboard.N * self.gameboard.N
+        else:
+            board = self.bestBoard
+            assigned = self.bestAssigned
+        self.result = SolveResult.SolveResult(status, board, assigned, stats)
+        return status
+
+    def searchLoop(self, deadline, nodeLimit, backtrackLimit):
+        stats = self.stats
+        trail = self.trail
+
+        if self.hassolution:
+            return SolveResult.SolveResult.SOLVED
+
+        if self.stack is None:
+            self.bestAssigned = -1
+            self.recordPartial()
+            stack = self.stack = []
+            # givens that clash, or that the first propagation made
+            # clash, leave nothing to search
+            if not self.network.isConsistent():
+                return SolveResult.SolveResult.UNSAT
+            if deadline is not None and time.monotonic() >= deadline:
+                self.expandPending = True
+                return SolveResult.SolveResult.TIMEOUT
+            if self.expandNode(stack):
+                return SolveResult.SolveResult.SOLVED
+        else:
+            stack = self.stack
+            if self.expandPending:
+                self.expandPending = False
+                if self.expandNode(stack):
+                    return SolveResult.SolveResult.SOLVED
+
+        reasons = self.reasons
+        nogoods = self.nogoods
+
+        while stack:
+            frame = stack[-1]
+            v = frame[0]
+
+            # Undo the value tried last at this level
+            if frame[2]:
+                self.undoLevel()
+                frame[2] = False
+                stats.backtracks += 1
+                if stats.hooks:
+                    stats.fire("backtrack", self)
+                if backtrackLimit is not None and stats.backtracks >= backtrackLimit:
+                    return SolveResult.SolveResult.BUDGET
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return SolveResult.SolveResult.TIMEOUT
+
+            i = next(frame[1], None)
+            if i is None:
+                # Values exhausted, return to the parent, or with
+                # backjumping to the deepest level to blame
+                stack.pop()
+                if reasons is not None and not self.backjumpTo(stack, frame[3]):
+                    return SolveResult.SolveResult.UNSAT
+                continue
+
+            # Skip a value that completes a known nogood, blaming the
+            # levels of its other assignments
+            if nogoods is not None:
+                nogood = nogoods.find(v, i)
+                if nogood is not None:
+                    for x, a in nogood:
+                        if x is not v:
+                            frame[3] |= reasons.get(x, 0)
+                    stats.nogoodPrunes += 1
+                    continue
 
-        # Attempt to assign a value
-        for i in self.getNextValues(v):
             # Store place in trail and push variable's state on trail
-            self.trail.placeTrailMarker()
-            self.trail.push(v)
+            trail.placeTrailMarker()
+            trail.push(v)
+
+            if reasons is not None:
+                self.reasonMarks.append(len(self.reasonLog))
+                self.explainAssignment(v, i, 1 << (len(stack) - 1))
+                self.conflict = None
 
             # Assign the value
             v.assignValue(i)
+            frame[2] = True
+
+            self.assignedVars.appendleft(v)
+
+            # Propagate constraints, check consistency, descend
+            t = time.perf_counter()
+            consistent = self.checkConsistency()
+            stats.timeConsistency += time.perf_counter() - t
+
+            if not consistent and reasons is not None:
+                frame[3] |= self.takeConflict(v) & ~(1 << (len(stack) - 1))
+            elif consistent:
+                if self.network.assignedCount > self.bestAssigned:
+                    self.recordPartial()
+                if nodeLimit is not None and stats.nodes >= nodeLimit:
+                    self.expandPending = True
+                    return SolveResult.SolveResult.BUDGET
+                if self.expandNode(stack):
+                    return SolveResult.SolveResult.SOLVED
+
+        return SolveResult.SolveResult.UNSAT
 
-            self.assignedVars.appendleft(v)  # changed
+    """
+        Runs searchLoop, starting it over from the root (see restart)
+        whenever the current run used up its backtracks. Runs get longer
+        with every restart, so the search stays complete: on a heavy
+        tailed board an early wrong decision only costs one run, and a
+        later run with other tie-breaks can avoid it.
+    """
 
-            # Optimize later
+    def restartLoop(self, deadline, nodeLimit, backtrackLimit):
+        if self.stack is None:
+            self.restartAt = self.restartCutoff()
 
-            # Propagate constraints, check consistency, recur
-            if self.checkConsistency():
-                elapsed_time = time.time() - start_time
-                new_start_time = time_left - elapsed_time
-                if self.solve(time_left=new_start_time) == -1:
-                    return -1
+        while True:
+            cutoff = self.restartAt
+            cut = cutoff is not None and (backtrackLimit is None or cutoff < backtrackLimit)
+            status = self.searchLoop(deadline, nodeLimit, cutoff if cut else backtrackLimit)
 
-            # If this assignment succeeded, return
-            if self.hassolution:
-                return 0
+            # only a budget that is the cutoff's, not the caller's, restarts
+            if status != SolveResult.SolveResult.BUDGET or not cut or self.expandPending:
+                return status
+            self.restart()
 
-            # Otherwise backtrack
-            self.trail.undo()
+    """
+        Return: the backtrack count at which the current run is cut off,
+                None once maxRestarts runs were. The n-th run gets
+                restartBase times the n-th term of the Luby sequence, or
+                times GEOMETRIC_FACTOR to the n-1 with geometric restarts.
+    """
 
-        return 0
+    def restartCutoff(self):
+        if self.maxRestarts is not None and self.restartRun >= self.maxRestarts:
+            return None
+        if self.restarts == "luby":
+            length = self.restartBase * luby(self.restartRun + 1)
+        else:
+            length = int(self.restartBase * BTSolver.GEOMETRIC_FACTOR ** self.restartRun)
+        return self.stats.backtracks + length
+
+    # Abandons the current run: undoes every level back to the root and
+    # reshuffles the variable tie-breaks. Stored nogoods stay valid and
+    # are kept, as is the best partial assignment.
+    def restart(self):
+        stack = self.stack
+        while stack:
+            frame = stack.pop()
+            if frame[2]:
+                self.undoLevel()
+        self.expandPending = True
+        self.restartRun += 1
+        self.stats.restarts += 1
+        if self.variableQueue is not None:
+            self.variableQueue.shuffle(self.random)
+        self.restartAt = self.restartCutoff()
+
+    """
+        Takes the untried values of the shallowest level with any off a
+        stopped search, so another solver can explore them instead.
+
+        Return: one grid per value taken, the root board with the
+                decisions leading to that level plus the value, or [] if
+                nothing is left to give away
+    """
+
+    def splitOff(self):
+        if not self.stack:
+            return []
+
+        for k, frame in enumerate(self.stack):
+            rest = list(frame[1])
+            if rest:
+                break
+        else:
+            return []
+
+        grid = [row[:] for row in self.gameboard.board]
+        for frame in self.stack[:k]:
+            v = frame[0]
+            grid[v.row][v.col] = v.getAssignment()
+
+        # the values given away are no longer searched here, so a failure
+        # of this level no longer says anything about the levels above
+        self.stack[k][3] |= (1 << k) - 1
+
+        # a restart would go back to the root and search them again, so
+        # the current run is no longer cut off
+        self.restartAt = None
+
+        v = self.stack[k][0]
+        grids = []
+        for val in rest:
+            child = [row[:] for row in grid]
+            child[v.row][v.col] = val
+            grids.append(child)
+        return grids
+
+    # Keeps the current assignment as the best partial one
+    def recordPartial(self):
+        self.bestAssigned = self.network.assignedCount
+        self.bestBoard = self.getSolution()
+
+    # Selects the next variable and pushes its frame on the stack.
+    # Returns True if every variable is assigned, i.e. a solution was found.
+    def expandNode(self, stack):
+        stats = self.stats
+
+        # Variable Selection
+        t = time.perf_counter()
+        v = self.selectNextVariable()
+        stats.timeVariableSelection += time.perf_counter() - t
+
+        # check if the assigment is complete
+        if v is None:
+            # Success; a search resumed past it, to count solutions,
+            # must not jump over any level
+            self.hassolution = True
+            if self.reasons is not None and stack:
+                stack[-1][3] |= (1 << (len(stack) - 1)) - 1
+            if stats.hooks:
+                stats.fire("solution", self)
+            return True
+
+        t = time.perf_counter()
+        values = self.getNextValues(v)
+        stats.timeValueOrdering += time.perf_counter() - t
+
+        # values already gone from v's domain failed for the reasons they
+        # were removed, so the levels of those are to blame from the start
+        blame = self.removalConflict(v) if self.reasons is not None else 0
+        stack.append([v, iter(values), False, blame])
+        stats.nodes += 1
+        if len(stack) > stats.maxDepth:
+            stats.maxDepth = len(stack)
+        if stats.hooks:
+            stats.fire("node", self)
+
+        return False
 
     def checkConsistency(self):
+        # The propagators start from the last assignment; on a board
+        # without givens there is none yet and nothing to propagate
+        if not self.assignedVars and self.cChecks in ["forwardChecking", "norvigCheck", "tournCC"]:
+            return self.network.isConsistent()
+
         if self.cChecks == "forwardChecking":
             return self.forwardChecking()[1]
 
@@ -463,11 +1026,16 @@ class BTSolver:
             return self.getMRV()
 
         if self.varHeuristics == "MRVwithTieBreaker":
+            if self.variableQueue is not None:
+                return self.variableQueue.select()
             return self.MRVwithTieBreaker()[0]
 
         if self.varHeuristics == "tournVar":
             return self.getTournVar()
 
+        if self.varHeuristics in ["DomOverWeightedDegree", "ActivityDecay"]:
+            return self.variableQueue.select()
+
         else:
             return self.getfirstUnassignedVariable()
 
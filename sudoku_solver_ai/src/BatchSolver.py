@@ -0,0 +1,133 @@
+import os
+import SudokuBoard
+import BTSolver
+import DLXSolver
+import Trail
+import VectorPropagator
+import SolverStats
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+    Solves many board files across a pool of worker processes. Every board
+    gets its own Trail and BTSolver inside the worker, so runs share no
+    state and scale with the number of cores instead of the GIL.
+"""
+
+# Returns sudokudata reduced by VectorPropagator, which needs numpy
+def presolveBoard ( sudokudata ):
+    reduced = VectorPropagator.reduceBoard( sudokudata )
+    # a contradiction is left for the search to report
+    return reduced if reduced is not None else sudokudata
+
+# Builds the solver for backend "BT" (backtracking) or "DLX" (exact
+# cover). The DLX solver ignores the heuristics and options and never
+# touches trail. options is a dict of BTSolver's keyword arguments for
+# the search (backjump, nogoods, restarts, ...). With presolve the board
+# is first reduced, see presolveBoard.
+def makeSolver ( sudokudata, trail, val_sh, var_sh, cc, backend = "BT", presolve = False, options = None ):
+    if presolve:
+        sudokudata = presolveBoard( sudokudata )
+
+    if backend == "DLX":
+        return DLXSolver.DLXSolver( sudokudata )
+    return BTSolver.BTSolver( sudokudata, trail, val_sh, var_sh, cc, **( options or {} ) )
+
+# Runs a built solver, under limits if given: a dict of the keyword
+# arguments of solveWithin (timeLimit, maxNodes, maxBacktracks).
+# With countLimit the solutions are counted up to it, 0 for all of
+# them, see BTSolver.countSolutions. Either way solver.result holds the
+# SolveResult afterwards.
+def runSearch ( solver, limits = None, countLimit = None ):
+    if countLimit is not None:
+        solver.countSolutions( countLimit or None, **( limits or {} ) )
+    elif limits:
+        solver.solveWithin( **limits )
+    else:
+        solver.solve()
+    return solver.result
+
+# Builds a solver for sudokudata, runs it and returns (solver, trail).
+# A cProfile.Profile passed as profiler is enabled during the search.
+def runSolver ( sudokudata, val_sh, var_sh, cc, profiler = None, backend = "BT", presolve = False, limits = None, countLimit = None, options = None ):
+    trail  = Trail.Trail()
+    solver = makeSolver( sudokudata, trail, val_sh, var_sh, cc, backend, presolve, options )
+    solver.stats.profiler = profiler
+    if cc in ["forwardChecking","norvigCheck","tournCC"]:
+        solver.checkConsistency()
+    runSearch( solver, limits, countLimit )
+    return solver, trail
+
+# Worker entry point, must stay at module level so it can be pickled
+def solveBoardFile ( task ):
+    filepath, val_sh, var_sh, cc, backend, presolve, limits, countLimit, options = task
+
+    sudokudata = SudokuBoard.SudokuBoard( filepath=filepath )
+    solver, trail = runSolver( sudokudata, val_sh, var_sh, cc, backend=backend, presolve=presolve, limits=limits, countLimit=countLimit, options=options )
+
+    result = {
+        "board"      : os.path.basename( filepath ),
+        "solved"     : solver.hassolution,
+        "status"     : solver.result.status,
+        "pushes"     : trail.getPushCount(),
+        "backtracks" : trail.getUndoCount(),
+        "stats"      : solver.stats.toDict(),
+        # grid of the solution, for the caller's solution cache
+        "solution"   : solver.getSolution().board if solver.hassolution and countLimit is None else None,
+    }
+    if countLimit is not None:
+        result["solutions"] = solver.numSolutions
+    return result
+
+class BatchSolver:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param jobs       number of worker processes, None or 0 for one per core
+        @param chunkSize  boards handed to a worker at a time
+        @param backend    "BT" or "DLX", see makeSolver
+        @param presolve   reduce each board with VectorPropagator first
+        @param limits     per-board limits, see runSearch
+        @param countLimit count solutions up to it instead, see runSearch
+        @param options    search options of each solver, see makeSolver
+    """
+    def __init__ ( self, val_sh, var_sh, cc, jobs = None, chunkSize = 1, backend = "BT", presolve = False, limits = None, countLimit = None, options = None ):
+        self.val_sh     = val_sh
+        self.var_sh     = var_sh
+        self.cc         = cc
+        self.jobs       = jobs or os.cpu_count()
+        self.chunkSize  = max( 1, chunkSize )
+        self.backend    = backend
+        self.presolve   = presolve
+        self.limits     = limits
+        self.countLimit = countLimit
+        self.options    = options
+
+        self.numSolutions  = 0
+        self.numPushes     = 0
+        self.numBacktracks = 0
+        self.stats         = SolverStats.SolverStats()
+
+    # ==================================================================
+    # Engine Functions
+    # ==================================================================
+
+    # Yields one result dict per board, in the order of filepaths, and
+    # accumulates the totals as results arrive
+    def solveFiles ( self, filepaths ):
+        tasks = [ ( f, self.val_sh, self.var_sh, self.cc, self.backend, self.presolve, self.limits, self.countLimit, self.options ) for f in filepaths ]
+
+        with ProcessPoolExecutor( max_workers=self.jobs ) as pool:
+            for result in pool.map( solveBoardFile, tasks, chunksize=self.chunkSize ):
+                if result["solved"]:
+                    self.numSolutions += 1
+                self.numPushes     += result["pushes"]
+                self.numBacktracks += result["backtracks"]
+                self.stats.merge( SolverStats.SolverStats.fromDict( result["stats"] ) )
+                yield result
+
+    def solveDirectory ( self, directory ):
+        files = sorted( os.listdir( directory ) )
+        return self.solveFiles( [ os.path.join( directory, f ) for f in files ] )
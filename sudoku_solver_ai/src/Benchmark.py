@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import time
+import random
+import platform
+import tracemalloc
+import SudokuBoard
+import BTSolver
+import Trail
+import SolveResult
+
+"""
+    Reproducible benchmark of the BTSolver heuristic combinations.
+
+    Boards are generated from fixed seeds through SudokuBoard(p, q, m), so
+    every run solves exactly the same puzzles. Each heuristic combination is
+    run on each board, and wall time, nodes, trail pushes and backtracks are
+    summarised as percentiles per (combination, board size).
+
+    Every board is solved REPEAT times, 3 by default, and its time is the
+    fastest of them; how far the slowest strayed from it is kept as the
+    board's timing noise, see compare.
+
+    Usage:
+        python3 Benchmark.py [SIZES=9x9,16x16] [SEEDS=n] [LIMIT=seconds] [REPEAT=n]
+                             [OUT=results.json] [BASELINE=baseline.json] [MEMORY]
+                             [CBJ] [NOGOODS=n] [RESTARTS=luby|geometric]
+                             [RESTARTBASE=n] [MAXRESTARTS=n] [SEED=s] [BIT]
+
+    OUT saves the results as JSON; BASELINE compares this run against a
+    previously saved file and reports the metrics that regressed. MEMORY
+    also records, per board and through tracemalloc, which slows the run
+    down, the memory held by the built solver (networkKB) and the peak
+    memory allocated while building and solving (peakKB), the bytes
+    allocated per search node (nodeBytes), plus the peak RSS of the whole
+    run.
+
+    The remaining options are BTSolver's search options, as in Main, and
+    apply to every combination; with restarts the time percentiles show
+    how much of the tail they cut off.
+"""
+
+# Board sizes from the README: (p, q, number of givens)
+SIZES = {
+    "9x9"   : ( 3, 3, 7 ),
+    "12x12" : ( 3, 4, 11 ),
+    "16x16" : ( 4, 4, 20 ),
+    "25x25" : ( 5, 5, 30 ),
+}
+
+# Main argument names -> ( var_sh, val_sh, cc )
+COMBINATIONS = {
+    "MRV FC"      : ( "MinimumRemainingValue", "", "forwardChecking" ),
+    "MRV LCV FC"  : ( "MinimumRemainingValue", "LeastConstrainingValue", "forwardChecking" ),
+    "MRV NOR"     : ( "MinimumRemainingValue", "", "norvigCheck" ),
+    "MRV LCV NOR" : ( "MinimumRemainingValue", "LeastConstrainingValue", "norvigCheck" ),
+    "MAD FC"      : ( "MRVwithTieBreaker", "", "forwardChecking" ),
+    "MAD LCV FC"  : ( "MRVwithTieBreaker", "LeastConstrainingValue", "forwardChecking" ),
+    "MAD NOR"     : ( "MRVwithTieBreaker", "", "norvigCheck" ),
+    "MAD LCV NOR" : ( "MRVwithTieBreaker", "LeastConstrainingValue", "norvigCheck" ),
+    "WDEG FC"     : ( "DomOverWeightedDegree", "", "forwardChecking" ),
+    "WDEG NOR"    : ( "DomOverWeightedDegree", "", "norvigCheck" ),
+    "ACT FC"      : ( "ActivityDecay", "", "forwardChecking" ),
+    "ACT NOR"     : ( "ActivityDecay", "", "norvigCheck" ),
+    "TOURN"       : ( "tournVar", "tournVal", "tournCC" ),
+}
+
+METRICS        = [ "time", "timeSpread", "nodes", "pushes", "backtracks" ]
+MEMORY_METRICS = [ "peakKB", "networkKB", "nodeBytes" ]
+PERCENTILES = [ 50, 90, 99 ]
+
+# A solver hook summing the memory allocated during the search while
+# tracemalloc is tracing. tracemalloc only sees what is alive, so at
+# every event the peak since the last one is taken over what was held
+# then and the peak is reset; memory allocated and freed again between
+# two events is counted once, so the total is a lower bound.
+def allocationCounter ( ):
+    def hook ( event, solver ):
+        current, peak = tracemalloc.get_traced_memory()
+        hook.total += max( 0, peak - hook.held )
+        hook.held = current
+        tracemalloc.reset_peak()
+    hook.total = 0
+    hook.held  = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    return hook
+
+# Peak resident set size of this process in KB, None where unavailable
+def peakRSS ( ):
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+    # bytes on macOS, KB elsewhere
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+# Nearest-rank percentile of an already sorted list
+def percentile ( values, pct ):
+    if not values:
+        return 0
+    rank = max( 0, int( round( pct / 100.0 * len( values ) + 0.5 ) ) - 1 )
+    return values[min( rank, len( values ) - 1 )]
+
+class Benchmark:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param sizes   keys of SIZES to run
+        @param seeds   number of seeded boards per size
+        @param limit   per-board time limit in seconds
+        @param memory  also record the memory metrics, see MEMORY_METRICS
+        @param options search options of every solver, BTSolver's keyword
+                       arguments
+        @param repeats times every board is solved, see runOne
+    """
+    def __init__ ( self, sizes = None, seeds = 5, limit = 60, memory = False, options = None, repeats = 3 ):
+        self.sizes   = sizes or [ "9x9", "12x12", "16x16" ]
+        self.seeds   = seeds
+        self.limit   = limit
+        self.memory  = memory
+        self.options = options or dict()
+        self.repeats = max( 1, repeats )
+        self.runs    = []
+
+    def metrics ( self ):
+        return METRICS + MEMORY_METRICS if self.memory else METRICS
+
+    # ==================================================================
+    # Engine Functions
+    # ==================================================================
+
+    def makeBoard ( self, size, seed ):
+        p, q, m = SIZES[size]
+        random.seed( seed )
+        return SudokuBoard.SudokuBoard( p, q, m )
+
+    # Builds and solves the board once, returns (seconds, solver, trail,
+    # memory); while tracemalloc is tracing memory holds networkKB, the
+    # memory the built solver holds, and nodeBytes, the bytes allocated
+    # per node, see allocationCounter; it is None otherwise
+    def solveOnce ( self, size, seed, combination ):
+        var_sh, val_sh, cc = COMBINATIONS[combination]
+        board  = self.makeBoard( size, seed )
+        trail  = Trail.Trail()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            held = tracemalloc.get_traced_memory()[0]
+
+        start  = time.perf_counter()
+        solver = BTSolver.BTSolver( board, trail, val_sh, var_sh, cc, **self.options )
+        memory = None
+        if tracing:
+            memory = { "networkKB" : ( tracemalloc.get_traced_memory()[0] - held ) / 1024.0 }
+            allocated = allocationCounter()
+            solver.stats.addHook( allocated )
+        solver.checkConsistency()
+        solver.solveWithin( timeLimit=self.limit )
+        if tracing:
+            allocated( None, solver )
+            memory["nodeBytes"] = allocated.total / max( 1, solver.stats.nodes )
+        return time.perf_counter() - start, solver, trail, memory
+
+    """
+        Solves the board repeats times. The search is the same every time,
+        so the counts come from the first solve and only the time varies:
+        time is the fastest solve, and timeSpread the slowest minus the
+        fastest. With memory the first solve runs under tracemalloc.
+    """
+    def runOne ( self, size, seed, combination ):
+        if self.memory:
+            tracemalloc.start()
+        elapsed, solver, trail, memory = self.solveOnce( size, seed, combination )
+        if self.memory:
+            peakKB = tracemalloc.get_traced_memory()[1] / 1024.0
+            tracemalloc.stop()
+
+        status   = solver.result.status
+        timedOut = status == SolveResult.SolveResult.TIMEOUT
+        times = [ elapsed ]
+        # a board that ran into the limit once is not worth timing again
+        if timedOut:
+            times = times * self.repeats
+        while len( times ) < self.repeats:
+            times.append( self.solveOnce( size, seed, combination )[0] )
+
+        result = {
+            "size"        : size,
+            "seed"        : seed,
+            "combination" : combination,
+            "solved"      : solver.hassolution,
+            "status"      : status,
+            "timedOut"    : timedOut,
+            "time"        : min( times ),
+            "timeSpread"  : max( times ) - min( times ),
+            "nodes"       : solver.stats.nodes,
+            "pushes"      : trail.getPushCount(),
+            "backtracks"  : trail.getUndoCount(),
+        }
+
+        if self.memory:
+            result["peakKB"] = peakKB
+            result.update( memory )
+
+        return result
+
+    def run ( self, log = None ):
+        for size in self.sizes:
+            for combination in COMBINATIONS:
+                for seed in range( self.seeds ):
+                    result = self.runOne( size, seed, combination )
+                    self.runs.append( result )
+                    if log is not None:
+                        log( result )
+        return self.summary()
+
+    # ==================================================================
+    # Reporting
+    # ==================================================================
+
+    # Percentiles of every metric, keyed by "<size> <combination>"
+    def summary ( self ):
+        groups = dict()
+        for r in self.runs:
+            groups.setdefault( r["size"] + " " + r["combination"], [] ).append( r )
+
+        out = dict()
+        for key, runs in groups.items():
+            entry = { "boards" : len( runs ),
+                      "solved" : sum( 1 for r in runs if r["solved"] ),
+                      "timeouts" : sum( 1 for r in runs if r["timedOut"] ) }
+            for metric in self.metrics():
+                values = sorted( r[metric] for r in runs )
+                entry[metric] = { "p" + str(pct) : percentile( values, pct ) for pct in PERCENTILES }
+                entry[metric]["mean"] = sum( values ) / len( values )
+            out[key] = entry
+        return out
+
+    def toDict ( self ):
+        return {
+            "meta" : {
+                "sizes"   : self.sizes,
+                "seeds"   : self.seeds,
+                "limit"   : self.limit,
+                "repeats" : self.repeats,
+                "python"  : platform.python_version(),
+                "machine" : platform.machine(),
+                "memory"  : self.memory,
+                "options" : self.options,
+                "peakRSSKB" : peakRSS() if self.memory else None,
+            },
+            "summary" : self.summary(),
+            "runs"    : self.runs,
+        }
+
+    def save ( self, path ):
+        with open( path, "w" ) as f:
+            json.dump( self.toDict(), f, indent=2 )
+
+    """
+        Compares this run's summary against a saved baseline. Search metrics
+        (nodes, pushes, backtracks) are deterministic for a given seed, so any
+        increase is reported. Wall time is reported once its median grows
+        by more than timeTolerance, by more than timeFloor seconds and by
+        more than noiseFactor times the median timeSpread of either run,
+        so timer noise on trivial boards is ignored.
+
+        Return: a list of human readable regression descriptions
+    """
+    def compare ( self, baseline, timeTolerance = 0.25, timeFloor = 0.01, noiseFactor = 2 ):
+        regressions = []
+        current = self.summary()
+
+        # different seed counts mean different boards, so means are not comparable
+        if baseline["meta"]["seeds"] != self.seeds:
+            return [ "baseline used SEEDS=" + str(baseline["meta"]["seeds"]) + ", this run SEEDS="
+                     + str(self.seeds) + "; rerun with the same seeds to compare" ]
+
+        for key, entry in current.items():
+            if key not in baseline["summary"]:
+                continue
+            old = baseline["summary"][key]
+
+            if entry["solved"] < old["solved"]:
+                regressions.append( key + ": solved " + str(old["solved"]) + " -> " + str(entry["solved"]) )
+
+            for metric in [ "nodes", "pushes", "backtracks" ]:
+                if entry[metric]["mean"] > old[metric]["mean"]:
+                    regressions.append( key + ": mean " + metric + " " + str(old[metric]["mean"])
+                                        + " -> " + str(entry[metric]["mean"]) )
+
+            # baselines saved before repeats were timed have no spread
+            noise = max( entry["timeSpread"]["p50"], old.get( "timeSpread", { "p50" : 0 } )["p50"] )
+            grown = entry["time"]["p50"] - old["time"]["p50"]
+            if grown > old["time"]["p50"] * timeTolerance and grown > timeFloor and grown > noise * noiseFactor:
+                regressions.append( key + ": median time " + format( old["time"]["p50"], ".4f" )
+                                    + "s -> " + format( entry["time"]["p50"], ".4f" ) + "s" )
+
+        return regressions
+
+    def report ( self ):
+        lines = []
+        header = "{:<20} {:>7} {:>10} {:>10} {:>10} {:>9} {:>10} {:>10}".format(
+            "size / heuristics", "solved", "t p50", "t p90", "t p99", "nodes p50", "pushes p50", "bt p50" )
+        lines.append( header )
+        for key, e in self.summary().items():
+            lines.append( "{:<20} {:>7} {:>10.4f} {:>10.4f} {:>10.4f} {:>9} {:>10} {:>10}".format(
+                key, str(e["solved"]) + "/" + str(e["boards"]),
+                e["time"]["p50"], e["time"]["p90"], e["time"]["p99"],
+                e["nodes"]["p50"], e["pushes"]["p50"], e["backtracks"]["p50"] ) )
+        return "\n".join( lines )
+
+    def memoryReport ( self ):
+        lines = []
+        lines.append( "{:<20} {:>12} {:>12} {:>16} {:>16}".format(
+            "size / heuristics", "peak KB p50", "peak KB p99", "network KB p50", "node bytes p50" ) )
+        for key, e in self.summary().items():
+            lines.append( "{:<20} {:>12.1f} {:>12.1f} {:>16.1f} {:>16.1f}".format(
+                key, e["peakKB"]["p50"], e["peakKB"]["p99"], e["networkKB"]["p50"], e["nodeBytes"]["p50"] ) )
+        lines.append( "peak RSS KB: " + str(peakRSS()) )
+        return "\n".join( lines )
+
+def main ( ):
+    sizes    = None
+    seeds    = 5
+    limit    = 60
+    out      = ""
+    baseline = ""
+    memory   = False
+    repeats  = 3
+    options  = dict()
+
+    for arg in sys.argv[1:]:
+        if arg.startswith( "SIZES=" ):
+            sizes = arg[len("SIZES="):].split( "," )
+        elif arg.startswith( "SEEDS=" ):
+            seeds = int( arg[len("SEEDS="):] )
+        elif arg.startswith( "LIMIT=" ):
+            limit = float( arg[len("LIMIT="):] )
+        elif arg.startswith( "REPEAT=" ):
+            repeats = int( arg[len("REPEAT="):] )
+        elif arg.startswith( "OUT=" ):
+            out = arg[len("OUT="):]
+        elif arg.startswith( "BASELINE=" ):
+            baseline = arg[len("BASELINE="):]
+        elif arg == "MEMORY":
+            memory = True
+        elif arg == "CBJ":
+            options["backjump"] = True
+        elif arg.startswith( "NOGOODS=" ):
+            options["nogoods"] = int( arg[len("NOGOODS="):] )
+        elif arg.startswith( "RESTARTS=" ):
+            options["restarts"] = arg[len("RESTARTS="):]
+        elif arg.startswith( "RESTARTBASE=" ):
+            options["restartBase"] = int( arg[len("RESTARTBASE="):] )
+        elif arg.startswith( "MAXRESTARTS=" ):
+            options["maxRestarts"] = int( arg[len("MAXRESTARTS="):] )
+        elif arg.startswith( "SEED=" ):
+            options["seed"] = int( arg[len("SEED="):] )
+        elif arg == "BIT":
+            options["bitDomains"] = True
+        else:
+            print ( "[ERROR] Unknown argument: " + arg )
+            return 2
+
+    for size in sizes or []:
+        if size not in SIZES:
+            print ( "[ERROR] Unknown size: " + size + " (expected one of " + ", ".join( SIZES ) + ")" )
+            return 2
+
+    if "restarts" in options and options["restarts"] not in BTSolver.BTSolver.RESTARTS:
+        print ( "[ERROR] RESTARTS must be one of " + ", ".join( BTSolver.BTSolver.RESTARTS ) )
+        return 2
+
+    if options.get( "restartBase", BTSolver.BTSolver.MIN_RESTART_BASE ) < BTSolver.BTSolver.MIN_RESTART_BASE:
+        print ( "[ERROR] RESTARTBASE must be at least " + str(BTSolver.BTSolver.MIN_RESTART_BASE) )
+        return 2
+
+    bench = Benchmark( sizes, seeds, limit, memory, options, repeats )
+    bench.run()
+    print ( bench.report() )
+    if memory:
+        print ( bench.memoryReport() )
+
+    if out != "":
+        bench.save( out )
+
+    if baseline != "":
+        with open( baseline ) as f:
+            regressions = bench.compare( json.load( f ) )
+        for r in regressions:
+            print ( "[REGRESSION] " + r )
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit( main() )
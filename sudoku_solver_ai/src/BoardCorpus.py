@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import mmap
+import SudokuBoard
+import PuzzleStream
+
+"""
+    Binary corpus of same-sized boards, for archives too large to parse
+    as text on every run.
+
+    A corpus file is an 8 byte header followed by fixed-size records, one
+    per board, with no separators:
+
+      * header: the magic bytes "SDKC", the format version, p, q, and the
+        bits per cell (4 or 8)
+      * record: the N*N cells in row-major order. With 4 bits per cell two
+        cells share a byte, the first one in the high nibble, and a record
+        with an odd number of cells ends in a padding nibble of 0.
+
+    Cells hold 0 for an empty cell and the value otherwise, so boards up to
+    15x15 fit in a nibble per cell, and larger ones take a byte.
+
+    Since every record has the same size, board i sits at a known offset.
+    CorpusReader maps the file into memory and copies out and decodes
+    only the records asked for, so a corpus can be indexed at random, sliced into shards
+    for several workers, or streamed from start to end without being read
+    into memory first. CorpusWriter produces the format from boards as
+    they come, with the same interface as PuzzleStream.PuzzleWriter.
+
+    Usage:
+        python3 BoardCorpus.py IN OUT
+
+    converts IN, a corpus or any file PuzzleReader reads, to OUT: a corpus
+    if OUT ends in .sdc, and one puzzle per line otherwise.
+"""
+
+MAGIC   = b"SDKC"
+VERSION = 1
+HEADER  = 8
+
+# File suffix Main and BoardGenerator write as a corpus
+SUFFIX = ".sdc"
+
+# High and low nibbles of every byte, for bytes.translate
+HIGH_NIBBLE = bytes( b >> 4 for b in range(256) )
+LOW_NIBBLE  = bytes( b & 0x0F for b in range(256) )
+
+# True if the file at path starts with a corpus header
+def isCorpus ( path ):
+    try:
+        with open( path, "rb" ) as f:
+            return f.read( len( MAGIC ) ) == MAGIC
+    except OSError:
+        return False
+
+# Reader of a puzzle file in whichever format it is in
+def openBoards ( path ):
+    if isCorpus( path ):
+        return CorpusReader( path )
+    return PuzzleStream.PuzzleReader( path )
+
+# Bits per cell used for N x N boards unless asked otherwise
+def cellBitsOf ( N ):
+    return 4 if N <= 15 else 8
+
+def recordSizeOf ( N, cellBits ):
+    if cellBits == 4:
+        return ( N*N + 1 ) // 2
+    return N*N
+
+class CorpusReader:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param path path of the corpus file; an empty file is an empty
+                    corpus
+    """
+    def __init__ ( self, path ):
+        self.path = path
+        self.file = open( path, "rb" )
+        self.data = None
+        self.p = None
+        self.q = None
+        self.N = 0
+        self.cellBits   = 8
+        self.recordSize = 0
+        self.count      = 0
+
+        size = os.fstat( self.file.fileno() ).st_size
+        if size == 0:
+            return
+
+        # the whole file is mapped, records are decoded only when asked for
+        self.data = mmap.mmap( self.file.fileno(), 0, access=mmap.ACCESS_READ )
+        header = self.data[:HEADER]
+        if len( header ) < HEADER or header[:4] != MAGIC:
+            self.close()
+            raise ValueError( path + " is not a board corpus" )
+        if header[4] != VERSION:
+            self.close()
+            raise ValueError( "Unsupported board corpus version " + str(header[4]) )
+
+        self.p = header[5]
+        self.q = header[6]
+        self.N = self.p*self.q
+        self.cellBits = header[7]
+        if self.cellBits not in [ 4, 8 ]:
+            self.close()
+            raise ValueError( "Unsupported cell size of " + str(self.cellBits) + " bits" )
+
+        self.recordSize = recordSizeOf( self.N, self.cellBits )
+        self.count, extra = divmod( size - HEADER, self.recordSize )
+        if extra != 0:
+            self.close()
+            raise ValueError( path + " ends inside a " + str(self.p) + "x" + str(self.q) + " board" )
+
+    def close ( self ):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def __enter__ ( self ):
+        return self
+
+    def __exit__ ( self, *exc ):
+        self.close()
+
+    # ==================================================================
+    # Accessors
+    # ==================================================================
+
+    def __len__ ( self ):
+        return self.count
+
+    """
+        @param i index of a board, negative from the end
+
+        Return: the board at i, or a list of boards for a slice
+    """
+    def __getitem__ ( self, i ):
+        if isinstance( i, slice ):
+            return [ self.board( j ) for j in range( *i.indices( self.count ) ) ]
+        if i < 0:
+            i += self.count
+        if i < 0 or i >= self.count:
+            raise IndexError( "Board index out of range" )
+        return self.board( i )
+
+    def board ( self, i ):
+        cells = self.cells( i )
+        N = self.N
+        return SudokuBoard.SudokuBoard( self.p, self.q, board=[ list( cells[r*N:(r+1)*N] ) for r in range(N) ] )
+
+    # Cells of board i in row-major order, one byte each. The record is
+    # copied out of the mapping, which stays free to be closed.
+    def cells ( self, i ):
+        start  = HEADER + i * self.recordSize
+        record = self.data[start:start + self.recordSize]
+        if self.cellBits == 8:
+            return record
+
+        cells = bytearray( 2 * len( record ) )
+        cells[0::2] = record.translate( HIGH_NIBBLE )
+        cells[1::2] = record.translate( LOW_NIBBLE )
+        del cells[self.N * self.N:]
+        return cells
+
+    # ==================================================================
+    # Iteration
+    # ==================================================================
+
+    def __iter__ ( self ):
+        return self.boards()
+
+    # Boards start to stop-1, like a slice but one at a time
+    def boards ( self, start = 0, stop = None ):
+        start, stop, _ = slice( start, stop ).indices( self.count )
+        for i in range(start, stop):
+            yield self.board( i )
+
+    """
+        Boards of one of count contiguous shards of nearly equal size,
+        so count workers can each open the corpus and take their part.
+
+        @param index shard to read, 0 to count-1
+    """
+    def shard ( self, index, count ):
+        return self.boards( self.count * index // count, self.count * (index + 1) // count )
+
+class CorpusWriter:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param f         open binary file to write to
+        @param p         block height, or None to take it from the first board
+        @param q         block width, or None to take it from the first board
+        @param cellBits  4 or 8 bits per cell, None for the smallest that fits
+    """
+    def __init__ ( self, f, p = None, q = None, cellBits = None ):
+        self.f = f
+        self.p = None
+        self.q = None
+        self.cellBits = cellBits
+        self.count    = 0
+        if p is not None and q is not None:
+            self.writeHeader( p, q )
+
+    def writeHeader ( self, p, q ):
+        N = p*q
+        if self.cellBits is None:
+            self.cellBits = cellBitsOf( N )
+        if self.cellBits not in [ 4, 8 ] or N >= 1 << self.cellBits:
+            raise ValueError( "A " + str(p) + "x" + str(q) + " board does not fit in " + str(self.cellBits) + " bits per cell" )
+
+        self.p = p
+        self.q = q
+        self.f.write( MAGIC + bytes( [ VERSION, p, q, self.cellBits ] ) )
+
+    # ==================================================================
+    # Modifiers
+    # ==================================================================
+
+    def write ( self, board ):
+        self.writeCells( board.p, board.q, bytes( v for row in board.board for v in row ) )
+
+    # An unsolved puzzle is a record of empty cells
+    def writeUnsolved ( self, board ):
+        self.writeCells( board.p, board.q, bytes( board.N * board.N ) )
+
+    def writeCells ( self, p, q, cells ):
+        if self.p is None:
+            self.writeHeader( p, q )
+        elif ( p, q ) != ( self.p, self.q ):
+            raise ValueError( "A corpus of " + str(self.p) + "x" + str(self.q) + " boards cannot hold a "
+                              + str(p) + "x" + str(q) + " board" )
+
+        if self.cellBits == 4:
+            if len( cells ) % 2 != 0:
+                cells += b"\0"
+            cells = bytes( ( hi << 4 ) | lo for hi, lo in zip( cells[0::2], cells[1::2] ) )
+        self.f.write( cells )
+        self.count += 1
+
+# Writer for path: a corpus if it ends in SUFFIX, one puzzle per line otherwise
+def openWriter ( path ):
+    if path.endswith( SUFFIX ):
+        f = open( path, "wb" )
+        return f, CorpusWriter( f )
+    f = open( path, "w" )
+    return f, PuzzleStream.PuzzleWriter( f )
+
+def main ( ):
+    if len( sys.argv ) != 3:
+        print ( "[ERROR] Usage: python3 BoardCorpus.py IN OUT" )
+        return 2
+
+    outFile, writer = openWriter( sys.argv[2] )
+    count = 0
+    try:
+        with openBoards( os.path.abspath( sys.argv[1] ) ) as source:
+            for board in source:
+                writer.write( board )
+                count += 1
+    finally:
+        outFile.close()
+
+    print ( "Boards: " + str(count) )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit( main() )
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import SudokuBoard
+import GridGenerator
+
+"""
+    Generates puzzles that are guaranteed to have a solution, as
+    SudokuBoards. The grids are filled and taken apart by GridGenerator,
+    see there for how; a seed reproduces the same sequence of puzzles.
+
+    Usage:
+        python3 BoardGenerator.py [P=3] [Q=3] [GIVENS=m] [COUNT=n] [SEED=s]
+                                  [UNIQUE] [OUT=puzzles.txt]
+
+    Puzzles are written one per line, the format PuzzleReader and Main's
+    STREAM mode read, to OUT or the standard output; boards larger than
+    35x35 do not fit one character a cell and take a "p q" header + rows
+    block each instead. An OUT ending in .sdc gets a binary BoardCorpus.
+"""
+
+class BoardGenerator( GridGenerator.GridGenerator ):
+
+    # ==================================================================
+    # Engine Functions
+    # ==================================================================
+
+    """
+        @param givens  number of givens to leave, at most N*N
+        Return: a SudokuBoard with a random puzzle
+    """
+    def puzzle ( self, givens ):
+        return self.toBoard( self.puzzleGrid( givens ) )
+
+    # Yields count puzzles, or puzzles forever if count is None
+    def puzzles ( self, givens, count = None ):
+        made = 0
+        while count is None or made < count:
+            yield self.puzzle( givens )
+            made += 1
+
+    def toBoard ( self, grid ):
+        N = self.N
+        return SudokuBoard.SudokuBoard( self.p, self.q, board=[ grid[i*N:(i+1)*N] for i in range( N ) ] )
+
+def main ( ):
+    # the writers reach into the solver modules, which the generator
+    # itself does not need
+    import PuzzleStream
+    import BoardCorpus
+
+    p       = 3
+    q       = 3
+    givens  = None
+    count   = 1
+    seed    = None
+    unique  = False
+    out     = ""
+
+    for arg in sys.argv[1:]:
+        if arg.startswith( "P=" ):
+            p = int( arg[len("P="):] )
+        elif arg.startswith( "Q=" ):
+            q = int( arg[len("Q="):] )
+        elif arg.startswith( "GIVENS=" ):
+            givens = int( arg[len("GIVENS="):] )
+        elif arg.startswith( "COUNT=" ):
+            count = int( arg[len("COUNT="):] )
+        elif arg.startswith( "SEED=" ):
+            seed = int( arg[len("SEED="):] )
+        elif arg == "UNIQUE":
+            unique = True
+        elif arg.startswith( "OUT=" ):
+            out = arg[len("OUT="):]
+        else:
+            print ( "[ERROR] Unknown argument: " + arg )
+            return 2
+
+    # without GIVENS, about a third of the cells
+    if givens is None:
+        givens = ( p*q ) * ( p*q ) // 3
+
+    generator = BoardGenerator( p, q, seed, unique )
+    if out != "":
+        outFile, writer = BoardCorpus.openWriter( out )
+    else:
+        outFile = sys.stdout
+        writer  = PuzzleStream.PuzzleWriter( outFile )
+
+    start = time.perf_counter()
+    try:
+        for board in generator.puzzles( givens, count ):
+            writer.write( board )
+    finally:
+        if outFile is not sys.stdout:
+            outFile.close()
+    elapsed = time.perf_counter() - start
+
+    sys.stderr.write( "Puzzles: " + str(count) + "\tSeconds: " + "{:.3f}".format( elapsed )
+                      + "\tRestarts: " + str(generator.numRestarts) + "\n" )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit( main() )
@@ -14,12 +14,30 @@ class Constraint:
     def __init__ ( self ):
         self.vars = []
 
+        # value -> number of assigned variables holding it, maintained by
+        # the owning ConstraintNetwork for incremental consistency checks
+        self.valueCounts = dict()
+
+        # value -> number of variables whose domain contains it, only kept
+        # while the network is tracking candidates
+        self.candidateCounts = dict()
+
+        # failures this constraint caused, plus one; raised by the
+        # weighted variable heuristics, see VariableQueue.constraintFailed
+        self.weight = 1
+
+        # Owning ConstraintNetwork, told when a variable is added so it
+        # rebuilds its neighbor and constraint tables
+        self.network = None
+
     # ==================================================================
     # Modifiers
     # ==================================================================
 
     def addVariable ( self, v ):
         self.vars.append( v )
+        if self.network is not None:
+            self.network.constraintChanged( self )
 
     # ==================================================================
     # Accessors
@@ -1,13 +1,61 @@
 import Variable
 import Constraint
 import SudokuBoard
-from math import floor
 
 """
     CSP representation of the problem. Contains the variables, constraints, and
     many helpful accessors.
 """
 
+# Peer tables only depend on the board geometry, so they are computed once
+# per (p, q) and shared by every network built for boards of that shape.
+# Cells are numbered row-major (i*N + j), matching the order of
+# ConstraintNetwork.variables.
+GEOMETRY_INDEX = dict()
+
+
+def getGeometryIndex(p, q):
+    """
+        @return (units, peers, unitsOf) for a p x q block geometry, where
+                units lists the cells of every row, col and block (in the
+                same order the network creates its constraints), peers[i]
+                holds the cells sharing a unit with cell i, and unitsOf[i]
+                holds the indices of the units containing cell i
+    """
+    key = (p, q)
+    if key in GEOMETRY_INDEX:
+        return GEOMETRY_INDEX[key]
+
+    n = p*q
+    rows = [[] for _ in range(n)]
+    cols = [[] for _ in range(n)]
+    blocks = [[] for _ in range(n)]
+
+    for i in range(n):
+        for j in range(n):
+            cell = i*n + j
+            rows[i].append(cell)
+            cols[j].append(cell)
+            blocks[(i // p) * p + j // q].append(cell)
+
+    units = tuple(tuple(u) for u in rows + cols + blocks)
+
+    unitsOf = [[] for _ in range(n*n)]
+    for u, unit in enumerate(units):
+        for cell in unit:
+            unitsOf[cell].append(u)
+
+    peers = []
+    for cell in range(n*n):
+        peerSet = set()
+        for u in unitsOf[cell]:
+            peerSet.update(units[u])
+        peerSet.discard(cell)
+        peers.append(tuple(sorted(peerSet)))
+
+    GEOMETRY_INDEX[key] = (units, tuple(peers), tuple(tuple(u) for u in unitsOf))
+    return GEOMETRY_INDEX[key]
+
 
 class ConstraintNetwork:
 
@@ -17,86 +65,279 @@ class ConstraintNetwork:
 
     def __init__(self, sboard=None):
         self.constraints = []
+        self.constraintSet = set()
+
+        # (N, units, peers, unitsOf) for board networks, see buildGeometryIndex
+        self.geometry = None
         self.variables = []
 
+        # variable -> tuple of neighbors / tuple of constraints, see buildIndex
+        self.neighborTable = None
+        self.constraintTable = None
+
+        # Number of surplus assignments of the same value within a
+        # constraint, summed over all constraints. Zero iff consistent.
+        self.conflicts = 0
+
+        # Number of assigned variables, kept alongside the value counts
+        self.assignedCount = 0
+
+        # Candidate counts for hidden-single detection, see trackCandidates
+        self.tracking = False
+        self.pendingSingles = []
+
+        # Objects notified of every domain and assignment change, through
+        # domainChanged(v) and assignmentChanged(v, assigned)
+        self.listeners = []
+
         if sboard != None:
-            board = sboard.board
-            temp = []
-            value = 0
-
-            for i in range(sboard.N):
-                for j in range(sboard.N):
-                    value = board[i][j]
-                    domain = []
-                    if value == 0:
-                        d = 1
-                        while d <= sboard.N:
-                            domain.append(d)
-                            d += 1
-                    else:
-                        domain.append(value)
-
-                    block = int(
-                        ((floor(i/sboard.p) * sboard.p) + floor(j/sboard.q)))
-                    temp.append(Variable.Variable(domain, i, j, block))
-
-            # Change this so that this class does not have to be modified
-            self.rows = dict()
-            self.cols = dict()
-            self.blocks = dict()
-
-            self.units = [self.rows,
-                          self.cols,
-                          self.blocks]
-
-            for v in temp:
-                row = v.row
-                col = v.col
-                block = v.block
-
-                if not (row in self.rows.keys()):
-                    self.rows[row] = []
-                if not (col in self.cols.keys()):
-                    self.cols[col] = []
-                if not (block in self.blocks.keys()):
-                    self.blocks[block] = []
-
-                self.rows[row].append(v)
-                self.cols[col].append(v)
-                self.blocks[block].append(v)
-
-            for v in temp:
-                self.addVariable(v)
-
-            for e in self.rows:
-                c = Constraint.Constraint()
-                for v in self.rows[e]:
-                    c.addVariable(v)
-                self.addConstraint(c)
-
-            for e in self.cols:
-                c = Constraint.Constraint()
-                for v in self.cols[e]:
-                    c.addVariable(v)
-                self.addConstraint(c)
-
-            for e in self.blocks:
-                c = Constraint.Constraint()
-                for v in self.blocks[e]:
-                    c.addVariable(v)
-                self.addConstraint(c)
+            self.buildFromBoard(sboard)
 
     # ==================================================================
     # Modifiers
     # ==================================================================
 
+    # A constraint belongs to at most one network, which it tells of every
+    # variable added to it later on, see constraintChanged
     def addConstraint(self, c):
-        if c not in self.constraints:
+        if c.network is not None and c.network is not self:
+            raise ValueError("Constraint " + str(c) + " already belongs to another network")
+        if c not in self.constraintSet:
+            self.constraintSet.add(c)
             self.constraints.append(c)
+            c.network = self
+            self.constraintChanged(c)
 
+    # A variable belongs to at most one network, so membership is its
+    # network field rather than a scan of the variable list. Its counters
+    # live in that network, so it cannot be moved to another one.
     def addVariable(self, v):
-        if v not in self.variables:
+        if v.network is not None and v.network is not self:
+            raise ValueError("Variable " + v.name + " already belongs to another network")
+        if v.network is not self:
             self.variables.append(v)
+            v.network = self
+            self.neighborTable = None
+            self.constraintTable = None
+
+    # Called when c was added or gained a variable: the tables are dropped
+    # and rebuilt from the constraints on their next use, see buildIndex
+    def constraintChanged(self, c):
+        self.neighborTable = None
+        self.constraintTable = None
+
+    """
+        Lays out the network of sboard from the template of its geometry:
+        every cell gets a copy of the full domain, or its given, and the
+        row, col and block constraints are filled straight from the
+        template's units, in that order.
+    """
+    def buildFromBoard(self, sboard):
+        p, q, n = sboard.p, sboard.q, sboard.N
+        units, peers, unitsOf = getGeometryIndex(p, q)
+        full = list(range(1, n + 1))
+
+        variables = []
+        for i, row in enumerate(sboard.board):
+            for j, value in enumerate(row):
+                v = Variable.Variable(list(full) if value == 0 else [value],
+                                      i, j, (i // p) * p + j // q)
+                v.network = self
+                variables.append(v)
+        self.variables = variables
+
+        for unit in units:
+            c = Constraint.Constraint()
+            c.vars = [variables[k] for k in unit]
+            c.network = self
+            self.constraints.append(c)
+        self.constraintSet = set(self.constraints)
+
+        self.buildGeometryIndex(p, q)
+
+    # Serves the neighbor and constraint tables from the shared geometry
+    # index. Only valid for networks laid out by the board constructor.
+    # Entries are filled on first use, so an easy board never pays for the
+    # tables of cells the search does not reach.
+    def buildGeometryIndex(self, p, q):
+        self.geometry = (p*q,) + getGeometryIndex(p, q)
+        self.neighborTable = dict()
+        self.constraintTable = dict()
+        self.countAssignments()
+
+    def geometryEntries(self, v):
+        n, units, peers, unitsOf = self.geometry
+        i = v.row * n + v.col
+        if self.variables[i] is not v:
+            raise KeyError(v)
+        variables = self.variables
+        constraints = self.constraints
+        neighbors = self.neighborTable[v] = tuple([variables[k] for k in peers[i]])
+        self.constraintTable[v] = tuple([constraints[u] for u in unitsOf[i]])
+        return neighbors
+
+    # Builds the neighbor and constraint tables by walking the constraints,
+    # for networks assembled by hand through addVariable / addConstraint
+    def buildIndex(self):
+        self.geometry = None
+        neighbors = {v: dict() for v in self.variables}
+        containing = {v: [] for v in self.variables}
+
+        for c in self.constraints:
+            for v in c.vars:
+                containing.setdefault(v, []).append(c)
+                peers = neighbors.setdefault(v, dict())
+                for x in c.vars:
+                    if x is not v:
+                        peers[x] = None
+
+        self.neighborTable = {v: tuple(peers)
+                              for v, peers in neighbors.items()}
+        self.constraintTable = {v: tuple(cs)
+                                for v, cs in containing.items()}
+        self.countAssignments()
+        if self.tracking:
+            self.countCandidates()
+
+    # Recomputes the per-constraint value counts from the current assignments
+    def countAssignments(self):
+        self.conflicts = 0
+        self.assignedCount = sum(1 for v in self.variables if v.isAssigned())
+        for c in self.constraints:
+            c.valueCounts = dict()
+            for v in c.vars:
+                if v.isAssigned():
+                    self.countValue(c, v.getAssignment())
+
+    def countValue(self, c, val):
+        n = c.valueCounts.get(val, 0)
+        if n:
+            self.conflicts += 1
+        c.valueCounts[val] = n + 1
+
+    """
+        Turns on candidate counting: every constraint keeps, per value, the
+        number of its variables whose domain still contains that value.
+        Counts are updated on each domain removal and restored when the
+        trail puts old domains back, and every (constraint, value) whose
+        count drops to 0 or 1 is queued on pendingSingles for
+        BTSolver.norvigCheck to examine.
+    """
+
+    def trackCandidates(self, on=True):
+        self.tracking = on
+        self.pendingSingles = []
+        if on:
+            if self.constraintTable is None:
+                self.buildIndex()
+            self.countCandidates()
+
+    def countCandidates(self):
+        for c in self.constraints:
+            counts = dict()
+            for v in c.vars:
+                for val in v.getDomain().values:
+                    counts[val] = counts.get(val, 0) + 1
+            c.candidateCounts = counts
+            for val, n in counts.items():
+                if n == 1:
+                    self.pendingSingles.append((c, val))
+
+    def uncountCandidate(self, c, val):
+        n = c.candidateCounts[val] - 1
+        c.candidateCounts[val] = n
+        if n <= 1:
+            self.pendingSingles.append((c, val))
+
+    # Returns the (constraint, value) pairs queued since the last call
+    def popPendingSingles(self):
+        pending = self.pendingSingles
+        self.pendingSingles = []
+        return pending
+
+    # ==================================================================
+    # Assignment Notifications
+    # ==================================================================
+
+    def addListener(self, listener):
+        self.listeners.append(listener)
+
+    # Called by Variable before v is assigned val. Only the constraints
+    # containing v (its row, col and block) are touched.
+    def variableAssigned(self, v, val):
+        self.assignedCount += 1
+        for c in self.getConstraintsContainingVariable(v):
+            self.countValue(c, val)
+        for listener in self.listeners:
+            listener.assignmentChanged(v, True)
+
+    # Called by Variable before v releases its assigned value val
+    def variableUnassigned(self, v, val):
+        self.assignedCount -= 1
+        for c in self.getConstraintsContainingVariable(v):
+            n = c.valueCounts[val] - 1
+            if n:
+                self.conflicts -= 1
+            c.valueCounts[val] = n
+        for listener in self.listeners:
+            listener.assignmentChanged(v, False)
+
+    # Called by Variable after val was removed from the domain of v
+    def valueRemoved(self, v, val):
+        for listener in self.listeners:
+            listener.domainChanged(v)
+        if not self.tracking:
+            return
+        for c in self.getConstraintsContainingVariable(v):
+            self.uncountCandidate(c, val)
+
+    # Called by Variable before the domain of v is replaced, either by an
+    # assignment or by the trail restoring a saved domain
+    def domainReplaced(self, v, old, new):
+        for listener in self.listeners:
+            listener.domainChanged(v)
+        if not self.tracking:
+            return
+        constraints = self.getConstraintsContainingVariable(v)
+        for val in old.values:
+            if not new.contains(val):
+                for c in constraints:
+                    self.uncountCandidate(c, val)
+        for val in new.values:
+            if not old.contains(val):
+                for c in constraints:
+                    c.candidateCounts[val] = c.candidateCounts.get(val, 0) + 1
+
+    # Called by Trail after it restored the domain of v in place; before
+    # holds the values it replaced, or None when candidates are not tracked
+    def domainRestored(self, v, before):
+        for listener in self.listeners:
+            listener.domainChanged(v)
+        if not self.tracking:
+            return
+        constraints = self.getConstraintsContainingVariable(v)
+        lost, gained = v.getDomain().changesSince(before)
+        for val in lost:
+            for c in constraints:
+                self.uncountCandidate(c, val)
+        for val in gained:
+            for c in constraints:
+                c.candidateCounts[val] = c.candidateCounts.get(val, 0) + 1
+
+    # Called by Variable before its domain is narrowed in place to val
+    def domainAssigned(self, v, val):
+        for listener in self.listeners:
+            listener.domainChanged(v)
+        if not self.tracking:
+            return
+        constraints = self.getConstraintsContainingVariable(v)
+        domain = v.getDomain()
+        for old in domain.others(val):
+            for c in constraints:
+                self.uncountCandidate(c, old)
+        if not domain.contains(val):
+            for c in constraints:
+                c.candidateCounts[val] = c.candidateCounts.get(val, 0) + 1
 
     # ==================================================================
     # Accessors
@@ -108,37 +349,41 @@ class ConstraintNetwork:
     def getVariables(self):
         return self.variables
 
-    # Returns all variables that share a constraint with v
+    # Returns all variables that share a constraint with v. The tuple is
+    # shared and must not be modified by callers.
     def getNeighborsOfVariable(self, v):
-        neighbors = set()
-
-        for c in self.constraints:
-            if c.contains(v):
-                for x in c.vars:
-                    neighbors.add(x)
-
-        neighbors.remove(v)
-        return list(neighbors)
-
-    # Returns true is every constraint is consistent
+        if self.neighborTable is None:
+            self.buildIndex()
+        neighbors = self.neighborTable.get(v)
+        if neighbors is None:
+            if self.geometry is None:
+                raise KeyError(v)
+            neighbors = self.geometryEntries(v)
+        return neighbors
+
+    # Returns true is every constraint is consistent. Answered in O(1) from
+    # the value counts kept up to date by variableAssigned / Unassigned;
+    # BTSolver.assignmentsCheck still walks every constraint.
     def isConsistent(self):
-        for c in self.constraints:
-            if not c.isConsistent():
-                return False
-
-        return True
+        if self.constraintTable is None:
+            self.buildIndex()
+        return self.conflicts == 0
 
     # Returns a list of constraints that contains v
     def getConstraintsContainingVariable(self, v):
         """
             @param v variable to check
-            @return list of constraints that contains v
+            @return tuple of constraints that contains v
         """
-        outList = []
-        for c in self.constraints:
-            if c.contains(v):
-                outList.append(c)
-        return outList
+        if self.constraintTable is None:
+            self.buildIndex()
+        constraints = self.constraintTable.get(v)
+        if constraints is None:
+            if self.geometry is None or v.network is not self:
+                return ()
+            self.geometryEntries(v)
+            constraints = self.constraintTable[v]
+        return constraints
 
     """
         Returns the constraints that contain variables whose domains were
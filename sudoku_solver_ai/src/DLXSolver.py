@@ -0,0 +1,316 @@
+import time
+import SudokuBoard
+import SolverStats
+import SolveResult
+
+"""
+    Exact-cover backend: Knuth's Algorithm X over Dancing Links.
+
+    A p x q board (N = p*q) is the exact-cover problem with N*N*N rows, one
+    per candidate (row, col, value), and 4*N*N columns: every cell holds
+    one value, and every row, col and block holds every value once.
+
+    The linked matrix only depends on the geometry, so it is built once
+    per (p, q) and shared: a solve covers the givens, searches, and then
+    uncovers everything again, leaving the skeleton exactly as it was for
+    the next board of the same shape.
+
+    The matrix lives in flat lists (left, right, up, down, column, size)
+    indexed by node number: node 0 is the root, nodes 1..4*N*N are the
+    column headers and the rest are the candidate nodes, four per row.
+"""
+
+class DLXMatrix:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    def __init__ ( self, p, q ):
+        self.p = p
+        self.q = q
+        N = self.N = p*q
+        nCols = 4 * N * N
+
+        L = self.L = list( range( -1, nCols ) )
+        R = self.R = list( range( 1, nCols + 2 ) )
+        L[0] = nCols
+        R[nCols] = 0
+        U = self.U = list( range( nCols + 1 ) )
+        D = self.D = list( range( nCols + 1 ) )
+        C = self.C = list( range( nCols + 1 ) )
+        S = self.S = [ 0 ] * ( nCols + 1 )
+
+        # candidate number of each node, and first node of each candidate
+        self.candidate = [ -1 ] * ( nCols + 1 )
+        self.rowStart  = []
+
+        for r in range( N ):
+            for c in range( N ):
+                b = ( r // p ) * p + c // q
+                for v in range( N ):
+                    cols = [ 1 + r*N + c,
+                             1 + N*N + r*N + v,
+                             1 + 2*N*N + c*N + v,
+                             1 + 3*N*N + b*N + v ]
+                    first = len( L )
+                    self.rowStart.append( first )
+                    for k, col in enumerate( cols ):
+                        node = first + k
+                        L.append( first + ( k - 1 ) % 4 )
+                        R.append( first + ( k + 1 ) % 4 )
+                        # append at the bottom of the column
+                        U.append( U[col] )
+                        D.append( col )
+                        D[U[col]] = node
+                        U[col] = node
+                        C.append( col )
+                        S[col] += 1
+                        self.candidate.append( ( r*N + c ) * N + v )
+
+    # ==================================================================
+    # Dancing Links
+    # ==================================================================
+
+    def cover ( self, c ):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        L[R[c]] = L[c]
+        R[L[c]] = R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                S[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover ( self, c ):
+        L, R, U, D, C, S = self.L, self.R, self.U, self.D, self.C, self.S
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                S[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = c
+        R[L[c]] = c
+
+    # Covers the other columns of the row containing node r
+    def select ( self, r ):
+        R, C = self.R, self.C
+        j = R[r]
+        while j != r:
+            self.cover( C[j] )
+            j = R[j]
+
+    def unselect ( self, r ):
+        L, C = self.L, self.C
+        j = L[r]
+        while j != r:
+            self.uncover( C[j] )
+            j = L[j]
+
+    # True if column c has not been covered
+    def isActive ( self, c ):
+        return self.R[self.L[c]] == c
+
+# (p, q) -> DLXMatrix, shared by every DLXSolver of that geometry
+MATRIX_CACHE = dict()
+
+def getMatrix ( p, q ):
+    key = ( p, q )
+    if key not in MATRIX_CACHE:
+        MATRIX_CACHE[key] = DLXMatrix( p, q )
+    return MATRIX_CACHE[key]
+
+class DLXSolver:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    def __init__ ( self, gb ):
+        self.gameboard   = gb
+        self.hassolution = False
+        self.stats       = SolverStats.SolverStats()
+        self.matrix      = getMatrix( gb.p, gb.q )
+        self.solution    = None
+        self.result      = None
+        self.best        = []
+
+    # ==================================================================
+    # Engine Functions
+    # ==================================================================
+
+    # Kept for interface parity with BTSolver; givens are applied in solve
+    def checkConsistency ( self ):
+        return True
+
+    """
+        Covers the givens, runs Algorithm X with the smallest-column rule
+        and restores the shared matrix before returning.
+
+        Return: 0 once the search finished (check hassolution)
+    """
+    def solve ( self ):
+        self.solveWithin()
+        return 0
+
+    """
+        Same as solve, under optional limits, each None for no limit; see
+        BTSolver.solveWithin.
+
+        Return: a SolveResult, also kept in self.result
+    """
+    def solveWithin ( self, timeLimit = None, maxNodes = None, maxBacktracks = None ):
+        stats = self.stats
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + timeLimit if timeLimit is not None else None
+        nodeLimit = stats.nodes + maxNodes if maxNodes is not None else None
+        backtrackLimit = stats.backtracks + maxBacktracks if maxBacktracks is not None else None
+        if stats.profiler is not None:
+            stats.profiler.enable()
+
+        m = self.matrix
+        N = m.N
+        givens = []
+        self.best = []
+        status = SolveResult.SolveResult.UNSAT
+        try:
+            # Select the row of every given, unless one of its columns is
+            # already taken, in which case the board has no solution
+            for r in range( N ):
+                for c in range( N ):
+                    v = self.gameboard.board[r][c]
+                    if v == 0:
+                        continue
+                    node = m.rowStart[( r*N + c ) * N + v - 1]
+                    cols = [ node, node + 1, node + 2, node + 3 ]
+                    if not all( m.isActive( m.C[j] ) for j in cols ):
+                        return self.finish( status, givens )
+                    m.cover( m.C[node] )
+                    m.select( node )
+                    givens.append( node )
+
+            chosen, status = self.search( deadline, nodeLimit, backtrackLimit )
+            if chosen is not None:
+                self.hassolution = True
+                self.solution = givens + chosen
+                if stats.hooks:
+                    stats.fire( "solution", self )
+            return self.finish( status, givens )
+        finally:
+            for node in reversed( givens ):
+                m.unselect( node )
+                m.uncover( m.C[node] )
+            if stats.profiler is not None:
+                stats.profiler.disable()
+            stats.timeTotal += time.perf_counter() - start_time
+
+    def finish ( self, status, givens ):
+        if status == SolveResult.SolveResult.SOLVED:
+            rows = self.solution
+        else:
+            rows = list( givens ) + self.best
+        self.result = SolveResult.SolveResult( status, self.boardOf( rows ), len( rows ), self.stats )
+        return self.result
+
+    """
+        Iterative Algorithm X. The matrix is fully restored whatever the
+        outcome, and the deepest partial selection is kept in self.best.
+
+        Return: a tuple of the chosen row nodes (None unless solved) and
+                the SolveResult status
+    """
+    def search ( self, deadline = None, nodeLimit = None, backtrackLimit = None ):
+        m = self.matrix
+        R, D, S = m.R, m.D, m.S
+        stats = self.stats
+
+        stack = []      # chosen row node at each level, its column is C[node]
+        found = None
+        status = SolveResult.SolveResult.UNSAT
+
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                status = SolveResult.SolveResult.TIMEOUT
+                break
+
+            # Descend: pick the active column with the fewest rows
+            if R[0] == 0:
+                found = list( stack )
+                status = SolveResult.SolveResult.SOLVED
+                break
+
+            c = R[0]
+            best = c
+            size = S[c]
+            while c != 0 and size > 0:
+                if S[c] < size:
+                    best = c
+                    size = S[c]
+                c = R[c]
+
+            if size > 0:
+                if nodeLimit is not None and stats.nodes >= nodeLimit:
+                    status = SolveResult.SolveResult.BUDGET
+                    break
+                m.cover( best )
+                r = D[best]
+                m.select( r )
+                stack.append( r )
+                stats.nodes += 1
+                if len( stack ) > stats.maxDepth:
+                    stats.maxDepth = len( stack )
+                if len( stack ) > len( self.best ):
+                    self.best = list( stack )
+                continue
+
+            # Dead end: move to the next row at the deepest level with one
+            if backtrackLimit is not None and stats.backtracks >= backtrackLimit:
+                status = SolveResult.SolveResult.BUDGET
+                break
+
+            advanced = False
+            while stack:
+                r = stack.pop()
+                col = m.C[r]
+                m.unselect( r )
+                stats.backtracks += 1
+                r = D[r]
+                if r != col:
+                    m.select( r )
+                    stack.append( r )
+                    stats.nodes += 1
+                    advanced = True
+                    break
+                m.uncover( col )
+
+            if not advanced:
+                break
+
+        # Restore the matrix
+        while stack:
+            r = stack.pop()
+            m.unselect( r )
+            m.uncover( m.C[r] )
+
+        return found, status
+
+    # SudokuBoard with the candidates of the given row nodes filled in
+    def boardOf ( self, rows ):
+        N = self.matrix.N
+        board = [ [ 0 for j in range( N ) ] for i in range( N ) ]
+        for node in rows:
+            k = self.matrix.candidate[node]
+            cell, v = divmod( k, N )
+            board[cell // N][cell % N] = v + 1
+        return SudokuBoard.SudokuBoard( self.gameboard.p, self.gameboard.q, board=board )
+
+    def getSolution ( self ):
+        return self.boardOf( self.solution or [] )
@@ -1,3 +1,5 @@
+from collections import Counter
+
 """
     Represents the domain of a variable, i.e. the possible values that each
     variable may assign.
@@ -5,6 +7,8 @@
 
 class Domain:
 
+    __slots__ = ( "values", "modified" )
+
     # ==================================================================
     # Constructors
     # ==================================================================
@@ -22,14 +26,61 @@ class Domain:
     def copy ( self, values ):
         self.values = values
 
+    # Returns an independent copy of this domain, used by the trail
+    def clone ( self ):
+        return Domain( list( self.values ) )
+
+    # Saved state for the trail: a copy of the value list
+    def snapshot ( self ):
+        return list( self.values )
+
+    # Takes back a snapshot; the trail hands each one over only once
+    def restore ( self, state ):
+        self.values = state
+        self.modified = False
+
+    # The current state for changesSince, without a copy; it stays valid
+    # until the domain next changes, which restore does not count as
+    def view ( self ):
+        return self.values
+
     # ==================================================================
     # Accessors
     # ==================================================================
 
+    # Returns the first value in the domain, or 0 if it is empty
+    def first ( self ):
+        return self.values[0] if self.values else 0
+
     # Checks if value exists within the domain
     def contains ( self, v ):
         return v in self.values
 
+    # Values lost, in order, and the set of values gained since the state
+    # before, from view. An undo only gives values back, so when all of
+    # before is still there the lost values are not looked for.
+    def changesSince ( self, before ):
+        values = self.values
+        gained = set( values ).difference( before )
+        if len( values ) - len( gained ) == len( before ):
+            return (), gained
+        return [ val for val in before if val not in values ], gained
+
+    # Values other than num
+    def others ( self, num ):
+        return [ val for val in self.values if val != num ]
+
+    # Counts for each value how many of the given domains hold it too,
+    # in the order the values are first met; used by the LCV heuristic
+    def countShared ( self, domains ):
+        values = set( self.values )
+        counts = Counter()
+        for other in domains:
+            for val in other.values:
+                if val in values:
+                    counts[val] += 1
+        return counts
+
     # Returns number of values in the domain
     def size ( self ):
         return len(self.values)
@@ -51,6 +102,14 @@ class Domain:
         if num not in self.values:
             self.values.append( num )
 
+    # Narrows the domain to the single value num, reusing the value list.
+    # Leaves the domain as Domain( num ) would be, including the flag.
+    def assign ( self, num ):
+        values = self.values
+        values.clear()
+        values.append( num )
+        self.modified = False
+
     # Remove a value from the domain
     def remove ( self, num ):
         if num in self.values:
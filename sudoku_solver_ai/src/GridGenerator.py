@@ -0,0 +1,396 @@
+import random
+
+# Number of set bits of a mask; int.bit_count needs Python 3.10
+if hasattr( int, "bit_count" ):
+    bitCount = int.bit_count
+else:
+    def bitCount ( mask ):
+        return bin( mask ).count( "1" )
+
+"""
+    Fills and takes apart grids for puzzles that are guaranteed to have a
+    solution. Grids are flat lists of N*N values, 0 for an empty cell.
+
+    A puzzle is made in two steps. A complete grid is filled in by a
+    randomized search that tracks the values used in every row, column
+    and block as bitmasks and branches on the cell with the fewest
+    candidates, starting over if a fill runs into too many dead ends.
+    The search costs more than the rest of a small puzzle together, so
+    each filled grid is handed out FILL_REUSE times, shuffled by the
+    row, column and value permutations that keep a grid valid. Past
+    25x25 fills take too many restarts, so larger grids are shuffled
+    from a fixed pattern grid instead. Then givens are taken out in
+    random order down to the requested count. With unique set, a given
+    is only taken out if no other value fits in its cell, so the puzzle
+    keeps exactly one solution. While the givens left still force the
+    value, as the only one its cell can take or the only place for it in
+    a row, column or block, that holds without a search. A check that
+    runs into too many dead ends keeps its given too, so this can stop
+    above the requested count.
+
+    Everything is drawn from one random.Random, so a seed reproduces the
+    same sequence of puzzles.
+
+    Nothing here builds boards, so SudokuBoard can make its random boards
+    with it; BoardGenerator hands the puzzles out as SudokuBoards.
+"""
+
+class GridGenerator:
+
+    # Dead ends a grid fill may hit before it starts over
+    FILL_BACKTRACKS = 200
+
+    # Largest N whose grids are filled by search
+    SEARCH_MAX_N = 25
+
+    # Grids shuffled from each grid filled by search
+    FILL_REUSE = 16
+
+    # Smallest N whose grid fills look for hidden singles; below it the
+    # scan costs more than the dead ends it saves
+    FILL_SINGLES_N = 20
+
+    # Dead ends a uniqueness check may hit before the given is kept as is
+    CHECK_BACKTRACKS = 500
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param p, q    block geometry, the board is N x N with N = p*q
+        @param seed    seed of the random number generator, None for a
+                       different sequence every time
+        @param unique  keep exactly one solution when taking out givens
+    """
+    def __init__ ( self, p = 3, q = 3, seed = None, unique = False ):
+        self.p      = p
+        self.q      = q
+        self.N      = p*q
+        self.unique = unique
+        self.random = random.Random( seed )
+
+        N = self.N
+        self.full    = ( 1 << N ) - 1
+        self.rowOf   = [ cell // N for cell in range( N*N ) ]
+        self.colOf   = [ cell % N for cell in range( N*N ) ]
+        self.blockOf = [ ( cell // N // p ) * p + cell % N // q for cell in range( N*N ) ]
+        self.units   = [ [ cell for cell in range( N*N ) if of[cell] == u ]
+                         for of in [ self.rowOf, self.colOf, self.blockOf ] for u in range( N ) ]
+
+        # candidate counts by table lookup where the table stays small
+        if N <= 16:
+            self.bitCount = [ bitCount( mask ) for mask in range( 1 << N ) ].__getitem__
+        else:
+            self.bitCount = bitCount
+
+        self.numFills    = 0
+        self.numRestarts = 0
+
+        self.base     = None    # the grid the next ones are shuffled from
+        self.numBased = 0       # grids shuffled from it so far
+
+    # ==================================================================
+    # Engine Functions
+    # ==================================================================
+
+    """
+        Return: a random complete grid, a flat list of N*N values
+    """
+    def fullGrid ( self ):
+        if self.N > GridGenerator.SEARCH_MAX_N:
+            self.numFills += 1
+            return self.shuffledGrid()
+
+        if self.base is not None and self.numBased < GridGenerator.FILL_REUSE:
+            self.numBased += 1
+            return self.shuffledGrid( self.base )
+
+        empty = [ 0 ] * ( self.N * self.N )
+        while True:
+            count, solution = self.search( empty, 1, self.random, GridGenerator.FILL_BACKTRACKS,
+                                           singles=self.N >= GridGenerator.FILL_SINGLES_N )
+            if solution is not None:
+                self.numFills += 1
+                self.base     = solution
+                self.numBased = 1
+                return list( solution )
+            self.numRestarts += 1
+
+    """
+        base, by default the pattern grid where row r is the first row
+        shifted by ( r % p ) * q + r // p, with its bands, the rows within
+        each band, its stacks, the columns within each stack and the
+        values put in a random order.
+
+        @param base  a complete grid, a flat list of N*N values
+        Return: a complete grid, a flat list of N*N values
+    """
+    def shuffledGrid ( self, base = None ):
+        p, q, N = self.p, self.q, self.N
+        rng = self.random
+
+        # p-row bands, q of them, and q-column stacks, p of them
+        rows  = []
+        bands = list( range( q ) )
+        rng.shuffle( bands )
+        for band in bands:
+            inBand = list( range( p ) )
+            rng.shuffle( inBand )
+            rows += [ band*p + r for r in inBand ]
+
+        cols   = []
+        stacks = list( range( p ) )
+        rng.shuffle( stacks )
+        for stack in stacks:
+            inStack = list( range( q ) )
+            rng.shuffle( inStack )
+            cols += [ stack*q + c for c in inStack ]
+
+        values = list( range( 1, N+1 ) )
+        rng.shuffle( values )
+
+        grid = [ 0 ] * ( N*N )
+        if base is None:
+            for i, r in enumerate( rows ):
+                shift = ( r % p ) * q + r // p
+                for j, c in enumerate( cols ):
+                    grid[i*N + j] = values[( shift + c ) % N]
+            return grid
+
+        values = [ 0 ] + values
+        for i, r in enumerate( rows ):
+            row = r*N
+            for j, c in enumerate( cols ):
+                grid[i*N + j] = values[base[row + c]]
+        return grid
+
+    """
+        @param givens  number of givens to leave, at most N*N
+        Return: a random puzzle, a flat list of N*N values with 0 for an
+                empty cell
+    """
+    def puzzleGrid ( self, givens ):
+        N     = self.N
+        grid  = self.fullGrid()
+        cells = list( range( N*N ) )
+        self.random.shuffle( cells )
+
+        if not self.unique:
+            for cell in cells[max( 0, givens ):]:
+                grid[cell] = 0
+            return grid
+
+        # Taking a given out keeps the solution unique exactly when none
+        # of the other values fits in its cell
+        rowOf, colOf, blockOf = self.rowOf, self.colOf, self.blockOf
+        rows   = [ self.full ] * N
+        cols   = [ self.full ] * N
+        blocks = [ self.full ] * N
+        bans = [ 0 ] * ( N*N )
+        left = N*N
+        for cell in cells:
+            if left <= givens:
+                break
+            v   = grid[cell]
+            bit = 1 << ( v - 1 )
+            r, c, b = rowOf[cell], colOf[cell], blockOf[cell]
+            grid[cell] = 0
+            rows[r]   ^= bit
+            cols[c]   ^= bit
+            blocks[b] ^= bit
+
+            if not self.isForced( grid, cell, bit, rows, cols, blocks ):
+                bans[cell] = bit
+                count, solution = self.search( grid, 1, None, GridGenerator.CHECK_BACKTRACKS, bans )
+                bans[cell] = 0
+                if count != 0:
+                    grid[cell] = v
+                    rows[r]   |= bit
+                    cols[c]   |= bit
+                    blocks[b] |= bit
+                    continue
+            left -= 1
+        return grid
+
+    """
+        Whether the givens of grid alone put the value bit in the empty
+        cell: no other value fits there, or no other empty cell of one of
+        its units takes it.
+
+        @param rows, cols, blocks  bitmasks of the values given in each unit
+    """
+    def isForced ( self, grid, cell, bit, rows, cols, blocks ):
+        rowOf, colOf, blockOf = self.rowOf, self.colOf, self.blockOf
+        r, c, b = rowOf[cell], colOf[cell], blockOf[cell]
+        if self.full & ~( rows[r] | cols[c] | blocks[b] ) == bit:
+            return True
+
+        N = self.N
+        for unit in [ self.units[r], self.units[N + c], self.units[2*N + b] ]:
+            for other in unit:
+                if other != cell and grid[other] == 0 and not ( rows[rowOf[other]] | cols[colOf[other]] | blocks[blockOf[other]] ) & bit:
+                    break
+            else:
+                return True
+        return False
+
+    """
+        Counts the solutions of grid, a flat list with 0 for empty cells.
+
+        Return: the number of solutions, at most limit
+    """
+    def countSolutions ( self, grid, limit = 2 ):
+        return self.search( grid, limit )[0]
+
+    """
+        Depth-first search over the empty cells of grid, smallest number
+        of candidates first, with the values of each row, column and block
+        kept as bitmasks.
+
+        @param limit          stop once this many solutions were found
+        @param rng            random.Random to shuffle cells and values with
+        @param maxBacktracks  give up after this many dead ends
+        @param bans           per-cell bitmask of values the cell may not take
+        @param singles        also branch on hidden singles first
+        Return: a tuple of the number of solutions found, -1 if the search
+                gave up, and the first solution, None if there was none
+    """
+    def search ( self, grid, limit, rng = None, maxBacktracks = None, bans = None, singles = True ):
+        N       = self.N
+        full    = self.full
+        rowOf   = self.rowOf
+        colOf   = self.colOf
+        blockOf = self.blockOf
+        count1  = self.bitCount
+        units   = self.units
+        masks   = [ 0 ] * ( N*N )
+        rows    = [ 0 ] * N
+        cols    = [ 0 ] * N
+        blocks  = [ 0 ] * N
+        if bans is None:
+            bans = [ 0 ] * ( N*N )
+
+        grid  = list( grid )
+        empty = []
+        for cell in range( N*N ):
+            v = grid[cell]
+            if v == 0:
+                empty.append( cell )
+                continue
+            bit = 1 << ( v - 1 )
+            r, c, b = rowOf[cell], colOf[cell], blockOf[cell]
+            if ( rows[r] | cols[c] | blocks[b] ) & bit:
+                return 0, None
+            rows[r]   |= bit
+            cols[c]   |= bit
+            blocks[b] |= bit
+        if rng is not None:
+            rng.shuffle( empty )
+
+        count      = 0
+        solution   = None
+        backtracks = 0
+        stack      = []     # [ cell, candidate values, index of the one placed ]
+
+        while True:
+            if not empty:
+                count += 1
+                if solution is None:
+                    solution = list( grid )
+                if count >= limit:
+                    return count, solution
+            else:
+                # Branch on the empty cell with the fewest candidates
+                best      = 0
+                bestMask  = 0
+                bestCount = N + 1
+                for i in range( len( empty ) ):
+                    cell = empty[i]
+                    mask = full & ~( rows[rowOf[cell]] | cols[colOf[cell]] | blocks[blockOf[cell]] | bans[cell] )
+                    masks[cell] = mask
+                    n = count1( mask )
+                    if n < bestCount:
+                        best      = i
+                        bestMask  = mask
+                        bestCount = n
+                        if n <= 1:
+                            break
+
+                # Without a naked single, look for a value with one place
+                # left in a unit, which is forced there, or with none,
+                # which is a dead end
+                if bestCount > 1 and singles:
+                    for unit in units:
+                        once   = 0
+                        twice  = 0
+                        placed = 0
+                        for cell in unit:
+                            v = grid[cell]
+                            if v:
+                                placed |= 1 << ( v - 1 )
+                            else:
+                                twice |= once & masks[cell]
+                                once  |= masks[cell]
+                        if full & ~( placed | once ):
+                            bestCount = 0
+                            break
+                        single = once & ~twice
+                        if single:
+                            bit = single & -single
+                            for cell in unit:
+                                if grid[cell] == 0 and masks[cell] & bit:
+                                    break
+                            best      = empty.index( cell )
+                            bestMask  = bit
+                            bestCount = 1
+                            break
+
+                if bestCount > 0:
+                    cell = empty[best]
+                    empty[best] = empty[-1]
+                    empty.pop()
+
+                    values = [ v for v in range( N ) if bestMask >> v & 1 ]
+                    if rng is not None:
+                        rng.shuffle( values )
+                    stack.append( [ cell, values, 0 ] )
+
+                    bit = 1 << values[0]
+                    rows[rowOf[cell]]     |= bit
+                    cols[colOf[cell]]     |= bit
+                    blocks[blockOf[cell]] |= bit
+                    grid[cell] = values[0] + 1
+                    continue
+
+            # Dead end, or a solution to move past: try the next value at
+            # the deepest level that has one
+            backtracks += 1
+            if maxBacktracks is not None and backtracks > maxBacktracks:
+                return -1, None
+
+            while stack:
+                entry = stack[-1]
+                cell, values, k = entry
+                r, c, b = rowOf[cell], colOf[cell], blockOf[cell]
+
+                bit = 1 << values[k]
+                rows[r]   ^= bit
+                cols[c]   ^= bit
+                blocks[b] ^= bit
+
+                k += 1
+                if k < len( values ):
+                    entry[2] = k
+                    bit = 1 << values[k]
+                    rows[r]   |= bit
+                    cols[c]   |= bit
+                    blocks[b] |= bit
+                    grid[cell] = values[k] + 1
+                    break
+
+                grid[cell] = 0
+                stack.pop()
+                empty.append( cell )
+            else:
+                return count, solution
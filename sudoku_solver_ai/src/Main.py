@@ -8,6 +8,18 @@ import Constraint
 import ConstraintNetwork
 import BTSolver
 import Trail
+import BatchSolver
+import ParallelSolver
+import PuzzleStream
+import BoardCorpus
+import SolverStats
+import VectorPropagator
+import VectorBatch
+import SolutionCache
+import SolveResult
+import cProfile
+import json
+import atexit
 import time
 
 """
@@ -15,6 +27,68 @@ import time
     command line and properly starting the backtrack solver.
 """
 
+# Writes per-board statistics and their totals as JSON
+def writeStats ( path, records ):
+    total = SolverStats.SolverStats()
+    for r in records:
+        total.merge( SolverStats.SolverStats.fromDict( r["stats"] ) )
+
+    with open( path, "w" ) as f:
+        json.dump( { "boards" : records, "total" : total.toDict() }, f, indent=2 )
+
+# Saves the STATS= and PROFILE= outputs requested on the command line
+def saveRun ( statsFile, records, profileFile, profiler ):
+    if statsFile != "":
+        writeStats( statsFile, records )
+    if profileFile != "" and profiler is not None:
+        profiler.dump_stats( profileFile )
+
+def statsRecord ( name, solver, pushes, backtracks, counted = False ):
+    record = {
+        "board"      : name,
+        "solved"     : solver.hassolution,
+        "status"     : solver.result.status,
+        "pushes"     : pushes,
+        "backtracks" : backtracks,
+        "stats"      : solver.stats.toDict(),
+    }
+    if counted:
+        record["solutions"] = solver.numSolutions
+    return record
+
+# Record of a board answered from the solution cache
+def cachedRecord ( name ):
+    return {
+        "board"      : name,
+        "solved"     : True,
+        "status"     : SolveResult.SolveResult.SOLVED,
+        "cached"     : True,
+        "pushes"     : 0,
+        "backtracks" : 0,
+        "stats"      : SolverStats.SolverStats().toDict(),
+    }
+
+# Reports a board that was not solved, with how far a limited run got
+def printFailure ( result ):
+    if not result.isLimited():
+        print( "Failed to find a solution" )
+        return
+    print( "Failed to find a solution (" + result.status + ")" )
+    print( "Best partial assignment, " + str(result.assigned) + " cells:" )
+    print( result.board )
+
+# Solution count of a COUNT= run, marked when the cap or a limit cut it short
+def countText ( solver, countLimit ):
+    text = str(solver.numSolutions)
+    if solver.result.isLimited() or ( countLimit and solver.numSolutions >= countLimit ):
+        text = "at least " + text
+    return text
+
+# The solution to print and cache; a COUNT= run has unwound the search,
+# so only its result still holds the first solution it found
+def solutionOf ( solver, countLimit ):
+    return solver.result.board if countLimit is not None else solver.getSolution()
+
 def main ( ):
     args = sys.argv
 
@@ -23,6 +97,18 @@ def main ( ):
     var_sh = "";
     val_sh = "";
     cc     = "";
+    jobs   = None;
+    chunk  = 1;
+    stream = False;
+    out    = "";
+    statsFile   = "";
+    profileFile = "";
+    backend     = "BT";
+    presolve    = False;
+    cache       = None;
+    limits      = dict();
+    countLimit  = None;
+    options     = dict();
 
     for arg in [args[i] for i in range(1, len(args))]:
         if arg == "MRV":
@@ -31,6 +117,12 @@ def main ( ):
         elif arg == "MAD":
             var_sh = "MRVwithTieBreaker"
 
+        elif arg == "WDEG":
+            var_sh = "DomOverWeightedDegree"
+
+        elif arg == "ACT":
+            var_sh = "ActivityDecay"
+
         elif arg == "LCV":
             val_sh = "LeastConstrainingValue"
 
@@ -40,6 +132,69 @@ def main ( ):
         elif arg == "NOR":
             cc = "norvigCheck"
 
+        elif arg == "DLX":
+            backend = "DLX"
+
+        elif arg == "VEC":
+            presolve = True
+
+        elif arg == "CACHE":
+            cache = SolutionCache.SolutionCache()
+
+        elif arg.startswith( "CACHE=" ):
+            cache = SolutionCache.SolutionCache( path=arg[len("CACHE="):] )
+
+        elif arg == "BIT":
+            options["bitDomains"] = True
+
+        elif arg.startswith( "TIME=" ):
+            limits["timeLimit"] = float( arg[len("TIME="):] )
+
+        elif arg.startswith( "NODES=" ):
+            limits["maxNodes"] = int( arg[len("NODES="):] )
+
+        elif arg.startswith( "BACKTRACKS=" ):
+            limits["maxBacktracks"] = int( arg[len("BACKTRACKS="):] )
+
+        elif arg == "CBJ":
+            options["backjump"] = True
+
+        elif arg.startswith( "NOGOODS=" ):
+            options["nogoods"] = int( arg[len("NOGOODS="):] )
+
+        elif arg.startswith( "RESTARTS=" ):
+            options["restarts"] = arg[len("RESTARTS="):]
+
+        elif arg.startswith( "RESTARTBASE=" ):
+            options["restartBase"] = int( arg[len("RESTARTBASE="):] )
+
+        elif arg.startswith( "MAXRESTARTS=" ):
+            options["maxRestarts"] = int( arg[len("MAXRESTARTS="):] )
+
+        elif arg.startswith( "SEED=" ):
+            options["seed"] = int( arg[len("SEED="):] )
+
+        elif arg.startswith( "COUNT=" ):
+            countLimit = int( arg[len("COUNT="):] )
+
+        elif arg.startswith( "JOBS=" ):
+            jobs = int( arg[len("JOBS="):] )
+
+        elif arg.startswith( "CHUNK=" ):
+            chunk = int( arg[len("CHUNK="):] )
+
+        elif arg == "STREAM":
+            stream = True
+
+        elif arg.startswith( "OUT=" ):
+            out = arg[len("OUT="):]
+
+        elif arg.startswith( "STATS=" ):
+            statsFile = arg[len("STATS="):]
+
+        elif arg.startswith( "PROFILE=" ):
+            profileFile = arg[len("PROFILE="):]
+
         elif arg == "TOURN":
             var_sh = "tournVar"
             val_sh = "tournVal"
@@ -48,25 +203,60 @@ def main ( ):
         else:
             file = arg;
 
+    if presolve and not VectorPropagator.HAVE_NUMPY:
+        print ( "[ERROR] VEC needs numpy, which could not be imported." )
+        return
+
+    if "restarts" in options and options["restarts"] not in BTSolver.BTSolver.RESTARTS:
+        print ( "[ERROR] RESTARTS must be one of " + ", ".join( BTSolver.BTSolver.RESTARTS ) + "." )
+        return
+
+    if options.get( "restartBase", BTSolver.BTSolver.MIN_RESTART_BASE ) < BTSolver.BTSolver.MIN_RESTART_BASE:
+        print ( "[ERROR] RESTARTBASE must be at least " + str(BTSolver.BTSolver.MIN_RESTART_BASE) + "." )
+        return
+
+    if countLimit is not None and ( backend == "DLX" or presolve ):
+        print ( "[ERROR] COUNT needs the backtracking solver, without DLX or VEC." )
+        return
+
+    # VEC streams solve boards in batches, with no place to answer one early
+    if cache is not None and stream and presolve:
+        print ( "[ERROR] CACHE does not apply to STREAM with VEC." )
+        return
+
     trail = Trail.Trail();
 
+    # the on-disk store is only complete once closed
+    if cache is not None:
+        atexit.register( cache.close )
+
+    # One profiler shared by every solver of this run
+    profiler = cProfile.Profile() if profileFile != "" else None
+    records  = []
+
     if file == "":
         sudokudata = SudokuBoard.SudokuBoard( 3, 3, 7 )
         print(sudokudata)
 
-        solver = BTSolver.BTSolver( sudokudata, trail, val_sh, var_sh, cc )
+        solver = BatchSolver.makeSolver( sudokudata, trail, val_sh, var_sh, cc, backend, presolve, options )
+        solver.stats.profiler = profiler
         if cc in ["forwardChecking","norvigCheck","tournCC"]:
             solver.checkConsistency()
-        solver.solve()
+        BatchSolver.runSearch( solver, limits, countLimit )
+        records.append( statsRecord( "random", solver, trail.getPushCount(), trail.getUndoCount(), countLimit is not None ) )
+
+        if countLimit is not None:
+            print( "Solutions: " + countText( solver, countLimit ) )
 
         if solver.hassolution:
-            print( solver.getSolution() )
+            print( solutionOf( solver, countLimit ) )
             print( "Trail Pushes: " + str(trail.getPushCount()) )
             print( "Backtracks: " + str(trail.getUndoCount()) )
 
         else:
-            print( "Failed to find a solution" )
+            printFailure( solver.result )
 
+        saveRun( statsFile, records, profileFile, profiler )
         return
 
     if os.path.isdir(file):
@@ -78,39 +268,250 @@ def main ( ):
             print ( "[ERROR] Failed to open directory." )
             return
 
+        # Fan the boards out across a process pool, one solver per board;
+        # boards the cache knows are answered here and never sent out
+        if jobs is not None:
+            files  = sorted( listOfBoards )
+            boards = dict()
+            cached = set()
+            if cache is not None and countLimit is None:
+                for f in files:
+                    boards[f] = SudokuBoard.SudokuBoard( filepath=os.path.join( file, f ) )
+                    if cache.get( boards[f] ) is not None:
+                        cached.add( f )
+
+            batch   = BatchSolver.BatchSolver( val_sh, var_sh, cc, jobs, chunk, backend, presolve, limits, countLimit, options )
+            results = batch.solveFiles( [ os.path.join( file, f ) for f in files if f not in cached ] )
+            for f in files:
+                if f in cached:
+                    print ( f + ": solved (cached)" )
+                    records.append( cachedRecord( f ) )
+                    continue
+
+                result = next( results )
+                solution = result.pop( "solution" )
+                if f in boards and solution is not None:
+                    board = boards[f]
+                    cache.put( board, SudokuBoard.SudokuBoard( board.p, board.q, board=solution ) )
+                print ( result["board"] + ": " + ( "solved" if result["solved"] else "no solution (" + result["status"] + ")" )
+                        + ( "\tsolutions=" + str(result["solutions"]) if countLimit is not None else "" )
+                        + "\tpushes=" + str(result["pushes"]) + "\tbacktracks=" + str(result["backtracks"]) )
+
+                records.append( result )
+
+            print ( "Solutions Found: " + str(batch.numSolutions + len( cached )) )
+            if cache is not None:
+                print ( "Cache Hits: " + str(cache.hits) )
+            print ( "Trail Pushes: " + str(batch.numPushes) )
+            print ( "Backtracks: "  + str(batch.numBacktracks) )
+
+            # profiling does not reach into the worker processes
+            saveRun( statsFile, records, "", None )
+            return
+
         numSolutions = 0
         for f in listOfBoards:
             print ( "Running board: " + str(f) )
             sudokudata = SudokuBoard.SudokuBoard( filepath=os.path.join( file, f ) )
 
-            solver = BTSolver.BTSolver( sudokudata, trail, val_sh, var_sh, cc )
+            if cache is not None and countLimit is None and cache.get( sudokudata ) is not None:
+                numSolutions += 1;
+                records.append( cachedRecord( f ) )
+                continue
+
+            # the trail is shared, so record this board's share of its
+            # counts, and drop the last board's entries so its network goes
+            trail.clear()
+            pushes = trail.getPushCount()
+            undos  = trail.getUndoCount()
+
+            solver = BatchSolver.makeSolver( sudokudata, trail, val_sh, var_sh, cc, backend, presolve, options )
+            solver.stats.profiler = profiler
             if cc in ["forwardChecking","norvigCheck","tournCC"]:
                 solver.checkConsistency()
-            solver.solve()
+            BatchSolver.runSearch( solver, limits, countLimit )
+
+            if countLimit is not None:
+                print ( "Solutions: " + countText( solver, countLimit ) )
 
             if solver.hassolution:
                 numSolutions += 1;
+                if cache is not None:
+                    cache.put( sudokudata, solutionOf( solver, countLimit ) )
+
+            records.append( statsRecord( f, solver, trail.getPushCount() - pushes, trail.getUndoCount() - undos,
+                                         countLimit is not None ) )
 
         print ( "Solutions Found: " + str(numSolutions) )
+        if cache is not None:
+            print ( "Cache Hits: " + str(cache.hits) )
         print ( "Trail Pushes: " + str(trail.getPushCount()) )
         print ( "Backtracks: "  + str(trail.getUndoCount()) )
 
+        saveRun( statsFile, records, profileFile, profiler )
+        return
+
+    # Many puzzles with VEC: propagate them in batches, search only leftovers
+    if stream and presolve:
+        if out != "":
+            outFile, writer = BoardCorpus.openWriter( out )
+        else:
+            outFile = sys.stdout
+            writer  = PuzzleStream.PuzzleWriter( outFile )
+        batch   = VectorBatch.VectorBatch( 3, 3, val_sh, var_sh, cc, chunk if chunk > 1 else 4096, backend, limits, options )
+
+        try:
+            with BoardCorpus.openBoards( os.path.abspath( file ) ) as boards:
+                for board, solution in batch.solveBoards( boards ):
+                    if solution is not None:
+                        writer.write( solution )
+                    else:
+                        writer.writeUnsolved( board )
+        finally:
+            if outFile is not sys.stdout:
+                outFile.close()
+
+        print ( "Puzzles: " + str(batch.numBoards) )
+        print ( "Solutions Found: " + str(batch.numSolutions) )
+        print ( "Solved by Propagation: " + str(batch.numPropagated) )
+        print ( "Searched: " + str(batch.numSearched) )
+        print ( "Trail Pushes: " + str(batch.numPushes) )
+        print ( "Backtracks: "  + str(batch.numBacktracks) )
+
+        records.append( {
+            "board"      : os.path.basename( file ),
+            "solved"     : batch.numSolutions,
+            "pushes"     : batch.numPushes,
+            "backtracks" : batch.numBacktracks,
+            "stats"      : batch.stats.toDict(),
+        } )
+        saveRun( statsFile, records, "", None )
+        return
+
+    # Many puzzles in one file: read, solve and write them one at a time
+    if stream:
+        if out != "":
+            outFile, writer = BoardCorpus.openWriter( out )
+        else:
+            outFile = sys.stdout
+            writer  = PuzzleStream.PuzzleWriter( outFile )
+        numPuzzles    = 0
+        numSolutions  = 0
+        numUnique     = 0
+        numPushes     = 0
+        numBacktracks = 0
+
+        try:
+            with BoardCorpus.openBoards( os.path.abspath( file ) ) as boards:
+                for board in boards:
+                    numPuzzles += 1
+                    # the cache knows a solution, not how many there are
+                    solution = cache.get( board ) if cache is not None and countLimit is None else None
+                    if solution is not None:
+                        numSolutions += 1
+                        writer.write( solution )
+                        if statsFile != "":
+                            records.append( cachedRecord( numPuzzles ) )
+                        continue
+
+                    solver, trail = BatchSolver.runSolver( board, val_sh, var_sh, cc, profiler, backend, presolve, limits, countLimit, options )
+                    numPushes     += trail.getPushCount()
+                    numBacktracks += trail.getUndoCount()
+
+                    # when counting, only boards with exactly one solution get it written
+                    if countLimit is not None:
+                        unique = solver.numSolutions == 1 and not solver.result.isLimited()
+                        if unique:
+                            numUnique += 1
+                        if solver.hassolution:
+                            numSolutions += 1
+                        if unique:
+                            writer.write( solver.result.board )
+                        else:
+                            writer.writeUnsolved( board )
+                    elif solver.hassolution:
+                        numSolutions += 1
+                        solution = solver.getSolution()
+                        writer.write( solution )
+                        if cache is not None:
+                            cache.put( board, solution )
+                    else:
+                        writer.writeUnsolved( board )
+                    if statsFile != "":
+                        records.append( statsRecord( numPuzzles, solver, trail.getPushCount(), trail.getUndoCount(),
+                                                     countLimit is not None ) )
+        finally:
+            if outFile is not sys.stdout:
+                outFile.close()
+
+        print ( "Puzzles: " + str(numPuzzles) )
+        print ( "Solutions Found: " + str(numSolutions) )
+        if countLimit is not None:
+            print ( "Unique: " + str(numUnique) )
+        if cache is not None:
+            print ( "Cache Hits: " + str(cache.hits) )
+        print ( "Trail Pushes: " + str(numPushes) )
+        print ( "Backtracks: "  + str(numBacktracks) )
+
+        saveRun( statsFile, records, profileFile, profiler )
         return
 
     sudokudata =  SudokuBoard.SudokuBoard( filepath=os.path.abspath( file ) )
     print(sudokudata)
 
-    solver = BTSolver.BTSolver( sudokudata, trail, val_sh, var_sh, cc )
+    solution = cache.get( sudokudata ) if cache is not None and countLimit is None else None
+    if solution is not None:
+        print( solution )
+        print( "Cached solution, no search" )
+        records.append( cachedRecord( os.path.basename( file ) ) )
+        saveRun( statsFile, records, profileFile, profiler )
+        return
+
+    # One board with JOBS=: split its search tree across a process pool,
+    # after VEC has reduced it
+    if jobs is not None and backend == "BT" and countLimit is None:
+        board  = BatchSolver.presolveBoard( sudokudata ) if presolve else sudokudata
+        solver = ParallelSolver.ParallelSolver( board, val_sh, var_sh, cc, jobs, options=options )
+        BatchSolver.runSearch( solver, limits )
+        records.append( statsRecord( os.path.basename( file ), solver, solver.numPushes, solver.numBacktracks ) )
+
+        if solver.hassolution:
+            print( solver.getSolution() )
+            print( "Subtrees: " + str(solver.numSubtrees) )
+            print( "Trail Pushes: " + str(solver.numPushes) )
+            print( "Backtracks: " + str(solver.numBacktracks) )
+            if cache is not None:
+                cache.put( sudokudata, solver.getSolution() )
+
+        else:
+            printFailure( solver.result )
+
+        saveRun( statsFile, records, "", None )
+        return
+
+    solver = BatchSolver.makeSolver( sudokudata, trail, val_sh, var_sh, cc, backend, presolve, options )
+    solver.stats.profiler = profiler
     if cc in ["forwardChecking","norvigCheck","tournCC"]:
         solver.checkConsistency()
-    solver.solve()
+    BatchSolver.runSearch( solver, limits, countLimit )
+    records.append( statsRecord( os.path.basename( file ), solver, trail.getPushCount(), trail.getUndoCount(),
+                                 countLimit is not None ) )
+
+    if countLimit is not None:
+        print( "Solutions: " + countText( solver, countLimit ) )
 
     if solver.hassolution:
-        print( solver.getSolution() )
+        solution = solutionOf( solver, countLimit )
+        print( solution )
         print( "Trail Pushes: " + str(trail.getPushCount()) )
         print( "Backtracks: " + str(trail.getUndoCount()) )
+        if cache is not None:
+            cache.put( sudokudata, solution )
 
     else:
-        print( "Failed to find a solution" )
+        printFailure( solver.result )
+
+    saveRun( statsFile, records, profileFile, profiler )
 
-main()
+if __name__ == "__main__":
+    main()
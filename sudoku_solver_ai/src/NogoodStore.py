@@ -0,0 +1,105 @@
+from collections import OrderedDict
+
+"""
+    Bounded store of nogoods learned by BTSolver's backjumping search.
+
+    A nogood is a set of (variable, value) assignments that together with
+    the givens admit no solution. Before a value is tried, the search
+    looks up the nogoods containing that assignment; if all their other
+    assignments currently hold, the value is skipped without being
+    propagated.
+
+    Nogoods are indexed by each of their assignments, so a nogood is found
+    whichever of its assignments is made last. The store keeps at most
+    capacity nogoods and evicts the least recently used one when full;
+    long nogoods rarely match again and are not stored at all.
+"""
+
+class NogoodStore:
+
+    # Longest nogood worth keeping
+    MAX_SIZE = 8
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param capacity  most nogoods kept at once
+    """
+    def __init__ ( self, capacity ):
+        self.capacity = capacity
+        self.nogoods  = OrderedDict()   # frozenset of assignments -> None, oldest first
+        self.index    = dict()          # (variable, value) -> set of nogoods containing it
+
+        self.numAdded   = 0
+        self.numEvicted = 0
+        self.numHits    = 0
+
+    # ==================================================================
+    # Accessors
+    # ==================================================================
+
+    def __len__ ( self ):
+        return len( self.nogoods )
+
+    """
+        @param v    variable about to be assigned
+        @param val  value about to be assigned to v
+
+        Return: a stored nogood that v = val would complete, given the
+                current assignments of the other variables, or None
+    """
+    def find ( self, v, val ):
+        candidates = self.index.get( ( v, val ) )
+        if not candidates:
+            return None
+
+        for nogood in candidates:
+            for x, a in nogood:
+                if x is not v and ( not x.isAssigned() or x.getAssignment() != a ):
+                    break
+            else:
+                self.numHits += 1
+                self.nogoods.move_to_end( nogood )
+                return nogood
+        return None
+
+    # ==================================================================
+    # Modifiers
+    # ==================================================================
+
+    """
+        @param assignments iterable of (variable, value) pairs
+        Return: True if the nogood was stored
+    """
+    def add ( self, assignments ):
+        nogood = frozenset( assignments )
+        if not nogood or len( nogood ) > NogoodStore.MAX_SIZE:
+            return False
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end( nogood )
+            return False
+
+        while len( self.nogoods ) >= self.capacity:
+            self.evict()
+
+        self.nogoods[nogood] = None
+        for literal in nogood:
+            self.index.setdefault( literal, set() ).add( nogood )
+        self.numAdded += 1
+        return True
+
+    # Drops the least recently used nogood
+    def evict ( self ):
+        nogood, _ = self.nogoods.popitem( last=False )
+        for literal in nogood:
+            entries = self.index[literal]
+            entries.discard( nogood )
+            if not entries:
+                del self.index[literal]
+        self.numEvicted += 1
+
+    def clear ( self ):
+        self.nogoods = OrderedDict()
+        self.index   = dict()
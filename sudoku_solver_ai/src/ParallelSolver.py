@@ -0,0 +1,297 @@
+import os
+import time
+import queue
+import multiprocessing
+import SudokuBoard
+import BTSolver
+import Trail
+import SolverStats
+import SolveResult
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+"""
+    Solves one hard board on several cores by splitting its search tree.
+
+    The board is first expanded breadth-first with the solver's own
+    variable and value heuristics until there are a few subtrees per
+    worker. Each subtree is searched by a BTSolver, with the usual
+    propagation, in a worker process. Workers search in slices of
+    sliceNodes nodes; between slices a worker that sees idle workers
+    gives away the untried values of its shallowest open level
+    (BTSolver.splitOff), so the pool stays busy when the initial split
+    was uneven. Once any subtree is solved the others stop at the end of
+    their current slice.
+"""
+
+# Status of a subtree given up because another one was solved
+CANCELLED = "cancelled"
+
+# Shared state of a worker process, set by initWorker
+WORKER = dict()
+
+def initWorker ( cancelled, hungry, donations, nodes, backtracks ):
+    WORKER["cancelled"]  = cancelled
+    WORKER["hungry"]     = hungry
+    WORKER["donations"]  = donations
+    WORKER["nodes"]      = nodes
+    WORKER["backtracks"] = backtracks
+
+# Takes one of the requests for work posted by the master, if any is left
+def claimRequest ( hungry ):
+    with hungry.get_lock():
+        if hungry.value > 0:
+            hungry.value -= 1
+            return True
+    return False
+
+# Worker entry point, searches one subtree in slices of sliceNodes nodes
+def solveSubtree ( task ):
+    grid, p, q, val_sh, var_sh, cc, options, sliceNodes, deadline, maxNodes, maxBacktracks = task
+    shared = WORKER
+
+    trail  = Trail.Trail()
+    solver = BTSolver.BTSolver( SudokuBoard.SudokuBoard( p, q, board=grid ), trail, val_sh, var_sh, cc, **( options or {} ) )
+
+    # a subtree's first decision may already contradict its givens
+    if solver.checkConsistency():
+        status = SolveResult.SolveResult.BUDGET
+    else:
+        status = SolveResult.SolveResult.UNSAT
+    donated = 0
+    while status == SolveResult.SolveResult.BUDGET:
+        if shared["cancelled"].is_set():
+            status = CANCELLED
+            break
+        if maxNodes is not None and shared["nodes"].value >= maxNodes:
+            break
+        if maxBacktracks is not None and shared["backtracks"].value >= maxBacktracks:
+            break
+
+        if claimRequest( shared["hungry"] ):
+            grids = solver.splitOff()
+            if grids:
+                shared["donations"].put( grids )
+                donated += 1
+
+        nodes      = solver.stats.nodes
+        backtracks = solver.stats.backtracks
+        timeLeft   = deadline - time.monotonic() if deadline is not None else None
+        budget     = sliceNodes
+        if maxNodes is not None:
+            budget = min( budget, maxNodes - shared["nodes"].value )
+        status = solver.solveWithin( timeLeft, budget, None ).status
+
+        with shared["nodes"].get_lock():
+            shared["nodes"].value += solver.stats.nodes - nodes
+        with shared["backtracks"].get_lock():
+            shared["backtracks"].value += solver.stats.backtracks - backtracks
+
+    return {
+        "status"     : status,
+        "solution"   : solver.getSolution().board if solver.hassolution else None,
+        "assigned"   : solver.bestAssigned,
+        "best"       : solver.bestBoard.board if solver.bestBoard is not None else None,
+        "donated"    : donated,
+        "pushes"     : trail.getPushCount(),
+        "backtracks" : trail.getUndoCount(),
+        "stats"      : solver.stats.toDict(),
+    }
+
+class ParallelSolver:
+
+    # Nodes a worker searches between checks for cancellation and requests
+    SLICE_NODES = 256
+
+    # Subtrees per worker made by the initial split
+    SPLIT_FACTOR = 4
+
+    # Seconds the master waits for a worker before it looks again
+    POLL = 0.05
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param jobs        number of worker processes, None or 0 for one per core
+        @param sliceNodes  nodes a worker searches between checks
+        @param options     search options of the workers' solvers, see
+                           BatchSolver.makeSolver
+    """
+    def __init__ ( self, gb, val_sh, var_sh, cc, jobs = None, sliceNodes = SLICE_NODES, options = None ):
+        self.gameboard  = gb
+        self.val_sh     = val_sh
+        self.var_sh     = var_sh
+        self.cc         = cc
+        self.jobs       = jobs or os.cpu_count()
+        self.sliceNodes = max( 1, sliceNodes )
+        self.options    = options
+
+        self.hassolution = False
+        self.solution    = None
+        self.result      = None
+        self.bestAssigned = -1
+        self.bestBoard    = None
+
+        self.numSubtrees   = 0     # subtrees handed to workers, donations included
+        self.numPushes     = 0
+        self.numBacktracks = 0
+        self.stats         = SolverStats.SolverStats()
+
+    # ==================================================================
+    # Engine Functions
+    # ==================================================================
+
+    """
+        Return: 0 once the search finished (check hassolution)
+    """
+    def solve ( self ):
+        self.solveWithin()
+        return 0
+
+    """
+        Same as solve, under optional limits, each None for no limit; the
+        node and backtrack budgets count the work of all workers together.
+
+        Return: a SolveResult, also kept in self.result
+    """
+    def solveWithin ( self, timeLimit = None, maxNodes = None, maxBacktracks = None ):
+        start_time = time.perf_counter()
+        deadline   = time.monotonic() + timeLimit if timeLimit is not None else None
+
+        frontier = self.split()
+        if self.hassolution or not frontier:
+            status = SolveResult.SolveResult.SOLVED if self.hassolution else SolveResult.SolveResult.UNSAT
+        else:
+            status = self.runPool( frontier, deadline, maxNodes, maxBacktracks )
+
+        self.stats.timeTotal = time.perf_counter() - start_time
+        if status == SolveResult.SolveResult.SOLVED:
+            board    = self.getSolution()
+            assigned = self.gameboard.N * self.gameboard.N
+        else:
+            board    = self.bestBoard
+            assigned = self.bestAssigned
+        self.result = SolveResult.SolveResult( status, board, assigned, self.stats )
+        return self.result
+
+    # Expands the board breadth-first until every worker has a few
+    # subtrees, and returns their grids. Solves the board if propagation
+    # alone gets there.
+    def split ( self ):
+        p, q     = self.gameboard.p, self.gameboard.q
+        frontier = deque( [ self.gameboard.board ] )
+        target   = self.jobs * ParallelSolver.SPLIT_FACTOR
+
+        while frontier and len( frontier ) < target:
+            grid   = frontier.popleft()
+            solver = BTSolver.BTSolver( SudokuBoard.SudokuBoard( p, q, board=grid ), Trail.Trail(),
+                                        self.val_sh, self.var_sh, self.cc, **( self.options or {} ) )
+            consistent = solver.checkConsistency()
+            self.stats.merge( solver.stats )
+            if not consistent:
+                continue
+
+            base = solver.getSolution()
+            self.keepBest( solver.network.assignedCount, base.board )
+
+            v = solver.selectNextVariable()
+            if v is None:
+                self.hassolution = True
+                self.solution    = base.board
+                return []
+
+            self.stats.nodes += 1
+            for val in solver.getNextValues( v ):
+                child = [ row[:] for row in base.board ]
+                child[v.row][v.col] = val
+                frontier.append( child )
+
+        return list( frontier )
+
+    # Searches the subtrees in a process pool and returns the status
+    def runPool ( self, frontier, deadline, maxNodes, maxBacktracks ):
+        p, q = self.gameboard.p, self.gameboard.q
+        ctx  = multiprocessing.get_context()
+
+        cancelled  = ctx.Event()
+        hungry     = ctx.Value( "i", 0 )
+        donations  = ctx.Queue()
+        nodes      = ctx.Value( "q", 0 )
+        backtracks = ctx.Value( "q", 0 )
+
+        pending  = deque( frontier )
+        running  = set()
+        stopped  = None     # status that ended the search early
+        expected = 0        # donations announced by finished workers
+        received = 0
+
+        with ProcessPoolExecutor( max_workers=self.jobs, mp_context=ctx, initializer=initWorker,
+                                  initargs=( cancelled, hungry, donations, nodes, backtracks ) ) as pool:
+            while running or ( pending and stopped is None ):
+                while True:
+                    try:
+                        pending.extend( donations.get_nowait() )
+                        received += 1
+                    except queue.Empty:
+                        break
+
+                while stopped is None and pending and len( running ) < self.jobs:
+                    task = ( pending.popleft(), p, q, self.val_sh, self.var_sh, self.cc,
+                             self.options, self.sliceNodes, deadline, maxNodes, maxBacktracks )
+                    running.add( pool.submit( solveSubtree, task ) )
+                    self.numSubtrees += 1
+
+                hungry.value = self.jobs - len( running ) if stopped is None and not pending else 0
+
+                if stopped is None and deadline is not None and time.monotonic() >= deadline:
+                    stopped = SolveResult.SolveResult.TIMEOUT
+                    cancelled.set()
+
+                done, running = wait( running, timeout=ParallelSolver.POLL, return_when=FIRST_COMPLETED )
+                for future in done:
+                    result = future.result()
+                    expected += result["donated"]
+                    self.merge( result )
+
+                    status = result["status"]
+                    if status == SolveResult.SolveResult.SOLVED and not self.hassolution:
+                        self.hassolution = True
+                        self.solution    = result["solution"]
+                        stopped = status
+                        cancelled.set()
+                    elif status in [ SolveResult.SolveResult.TIMEOUT, SolveResult.SolveResult.BUDGET ] and stopped is None:
+                        stopped = status
+                        cancelled.set()
+
+                # every announced donation is on its way, wait for the rest
+                if not running and stopped is None and not pending:
+                    while received < expected:
+                        pending.extend( donations.get() )
+                        received += 1
+
+            # leave nothing behind in the queue's pipe
+            while received < expected:
+                donations.get()
+                received += 1
+
+        if stopped is not None:
+            return stopped
+        return SolveResult.SolveResult.UNSAT
+
+    # Adds the counters of a worker result
+    def merge ( self, result ):
+        self.numPushes     += result["pushes"]
+        self.numBacktracks += result["backtracks"]
+        self.stats.merge( SolverStats.SolverStats.fromDict( result["stats"] ) )
+        if result["best"] is not None:
+            self.keepBest( result["assigned"], result["best"] )
+
+    def keepBest ( self, assigned, grid ):
+        if assigned > self.bestAssigned:
+            self.bestAssigned = assigned
+            self.bestBoard    = SudokuBoard.SudokuBoard( self.gameboard.p, self.gameboard.q, board=grid )
+
+    def getSolution ( self ):
+        return SudokuBoard.SudokuBoard( self.gameboard.p, self.gameboard.q, board=self.solution )
@@ -0,0 +1,162 @@
+import math
+import SudokuBoard
+import BatchSolver
+
+"""
+    Streaming input and output for files holding many puzzles.
+
+    PuzzleReader yields SudokuBoards one at a time from a single file, so
+    memory use stays flat however many puzzles it holds. Two formats are
+    understood, and may be mixed within a file:
+
+      * the single-board file format: a "p q" header line followed by N
+        lines of N base-36 tokens (0 for an empty cell)
+      * one puzzle per line: N*N characters, '0' or '.' for an empty cell,
+        e.g. the common 81-character 9x9 format
+
+    Blank lines and lines starting with '#' are skipped.
+
+    PuzzleWriter writes boards back out as they are produced, in either
+    format, and solvePuzzles ties the two together through BTSolver.
+    One character per cell only holds values up to MAX_ONE_LINE_N, so
+    larger boards are always written in the header + rows format.
+"""
+
+# Largest N whose values fit the single base-36 character of a one-line cell
+MAX_ONE_LINE_N = 35
+
+# Returns (p, q) for an N x N board given in one-line form, with blocks as
+# close to square as possible and p <= q, e.g. 12 -> (3, 4)
+def geometryOf ( N ):
+    p = math.isqrt( N )
+    while N % p != 0:
+        p -= 1
+    return p, N // p
+
+def cellToInt ( c ):
+    if c == '.':
+        return 0
+    try:
+        return int( c, 36 )
+    except ValueError:
+        return 0
+
+class PuzzleReader:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param source path of the puzzle file, or an open text file
+    """
+    def __init__ ( self, source ):
+        self.source = source
+
+    # Nothing to release: a path is opened for each pass over it, and an
+    # open file belongs to the caller. Kept so a reader from
+    # BoardCorpus.openBoards can be closed whichever format it reads.
+    def close ( self ):
+        pass
+
+    def __enter__ ( self ):
+        return self
+
+    def __exit__ ( self, *exc ):
+        self.close()
+
+    # ==================================================================
+    # Iteration
+    # ==================================================================
+
+    def __iter__ ( self ):
+        if isinstance( self.source, str ):
+            with open( self.source ) as f:
+                yield from self.readBoards( f )
+        else:
+            yield from self.readBoards( self.source )
+
+    def readBoards ( self, f ):
+        lines = ( line.strip() for line in f )
+        for line in lines:
+            if line == "" or line.startswith( "#" ):
+                continue
+
+            tokens = line.split()
+            if len( tokens ) == 2:
+                yield self.readBlock( tokens, lines )
+            else:
+                yield self.readLine( line )
+
+    # "p q" header followed by N rows of tokens
+    def readBlock ( self, header, lines ):
+        p = int( float( header[0] ) )
+        q = int( float( header[1] ) )
+        N = p*q
+
+        board = []
+        for line in lines:
+            if line == "" or line.startswith( "#" ):
+                continue
+            board.append( [ cellToInt( t ) for t in line.split() ] )
+            if len( board ) == N:
+                break
+
+        if len( board ) != N:
+            raise ValueError( "Puzzle stream ended inside a " + str(p) + "x" + str(q) + " board" )
+
+        return SudokuBoard.SudokuBoard( p, q, board=board )
+
+    # N*N characters on a single line
+    def readLine ( self, line ):
+        N = math.isqrt( len( line ) )
+        if N * N != len( line ):
+            raise ValueError( "Puzzle line of length " + str(len( line )) + " is not a square board" )
+
+        p, q = geometryOf( N )
+        cells = [ cellToInt( c ) for c in line ]
+        board = [ cells[i*N:(i+1)*N] for i in range(N) ]
+        return SudokuBoard.SudokuBoard( p, q, board=board )
+
+class PuzzleWriter:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param f        open text file to write to
+        @param oneLine  write each board as a single line of N*N characters
+                        instead of the "p q" header + rows format, for
+                        boards up to MAX_ONE_LINE_N
+    """
+    def __init__ ( self, f, oneLine = True ):
+        self.f = f
+        self.oneLine = oneLine
+
+    # ==================================================================
+    # Modifiers
+    # ==================================================================
+
+    def write ( self, board ):
+        if self.oneLine and board.N <= MAX_ONE_LINE_N:
+            self.f.write( "".join( board.intToOdometer( v ) for row in board.board for v in row ) + "\n" )
+        else:
+            self.f.write( str(board.p) + " " + str(board.q) + "\n" )
+            for row in board.board:
+                self.f.write( " ".join( board.intToOdometer( v ) for v in row ) + "\n" )
+
+    # Marks a puzzle without a solution, keeping output aligned with input
+    def writeUnsolved ( self, board ):
+        if self.oneLine and board.N <= MAX_ONE_LINE_N:
+            self.f.write( "." * (board.N * board.N) + "\n" )
+        else:
+            self.f.write( str(board.p) + " " + str(board.q) + "\n" )
+            for i in range(board.N):
+                self.f.write( " ".join( "0" for _ in range(board.N) ) + "\n" )
+
+# Lazily solves every board from boards, yielding (board, solver, trail)
+def solvePuzzles ( boards, val_sh, var_sh, cc, profiler = None, backend = "BT", presolve = False, limits = None, countLimit = None, options = None ):
+    for board in boards:
+        solver, trail = BatchSolver.runSolver( board, val_sh, var_sh, cc, profiler, backend, presolve, limits, countLimit, options )
+        yield board, solver, trail
@@ -0,0 +1,207 @@
+import dbm
+from collections import OrderedDict
+import SudokuBoard
+
+"""
+    Solution cache keyed by the canonical form of a board.
+
+    Boards that differ only by a symmetry of the puzzle have the same
+    solutions up to that symmetry. The symmetries used here are:
+
+      * relabelling the digits
+      * permuting the rows within a band, and the bands
+      * permuting the columns within a stack, and the stacks
+      * transposing, when the blocks are square (p == q)
+
+    canonicalForm maps a board to a representative of its class together
+    with the transform that got it there. Rows and columns are ordered by
+    invariants of the givens (digit frequencies, refined over the rows and
+    columns the givens share) and digits are relabelled by first
+    appearance, so it is cheap to compute. Equivalent boards whose rows or
+    columns tie on those invariants can still end up with different keys.
+    That only costs a cache miss: a key is always a genuine transform of
+    its board, so a hit is always a valid solution.
+
+    SolutionCache keeps the most recently used entries in memory and, when
+    given a path, every entry in a dbm file so later runs can reuse them.
+"""
+
+# Replaces each key by its rank among the distinct keys
+def ranks ( keys ):
+    index = { k : r for r, k in enumerate( sorted( set( keys ) ) ) }
+    return [ index[k] for k in keys ]
+
+"""
+    Orders the rows of g by band and within each band, and the columns by
+    stack and within each stack, using invariants of the givens: how often
+    each digit is given, refined a few rounds over which rows and columns
+    the givens share.
+"""
+def orderLines ( g, p, q ):
+    N = p*q
+    freq = dict()
+    for row in g:
+        for v in row:
+            freq[v] = freq.get( v, 0 ) + 1
+
+    rowKey = [ 0 ] * N
+    colKey = [ 0 ] * N
+    for _ in range( 3 ):
+        rows = [ ( rowKey[i], tuple( sorted( ( colKey[j], freq[g[i][j]] ) for j in range(N) if g[i][j] != 0 ) ) ) for i in range(N) ]
+        cols = [ ( colKey[j], tuple( sorted( ( rowKey[i], freq[g[i][j]] ) for i in range(N) if g[i][j] != 0 ) ) ) for j in range(N) ]
+        rowKey, colKey = ranks( rows ), ranks( cols )
+
+    # q bands of p rows, and p stacks of q columns
+    bands  = [ sorted( range( b*p, (b+1)*p ), key=lambda i: ( rowKey[i], i ) ) for b in range(q) ]
+    bands.sort( key=lambda rows: ( [ rowKey[i] for i in rows ], rows[0] ) )
+    stacks = [ sorted( range( s*q, (s+1)*q ), key=lambda j: ( colKey[j], j ) ) for s in range(p) ]
+    stacks.sort( key=lambda cols: ( [ colKey[j] for j in cols ], cols[0] ) )
+
+    return [ i for band in bands for i in band ], [ j for stack in stacks for j in stack ]
+
+# Relabels digits by order of first appearance in row-major order, and
+# digits that never appear after those, in increasing order
+def relabelling ( cells, N ):
+    relabel = dict()
+    for v in cells:
+        if v != 0 and v not in relabel:
+            relabel[v] = len( relabel ) + 1
+    for v in range( 1, N + 1 ):
+        if v not in relabel:
+            relabel[v] = len( relabel ) + 1
+    relabel[0] = 0
+    return relabel
+
+"""
+    A transform is a tuple (transposed, rowOrder, colOrder, relabel): cell
+    (i, j) of the transformed grid is relabel[g'[rowOrder[i]][colOrder[j]]],
+    with g' the transpose of g when transposed is True.
+"""
+def applyTransform ( transform, g ):
+    transposed, rowOrder, colOrder, relabel = transform
+    if transposed:
+        return [ [ relabel[g[c][r]] for c in colOrder ] for r in rowOrder ]
+    return [ [ relabel[g[r][c]] for c in colOrder ] for r in rowOrder ]
+
+def invertTransform ( transform, g ):
+    transposed, rowOrder, colOrder, relabel = transform
+    inverse = { c : o for o, c in relabel.items() }
+    N = len( g )
+    out = [ [ 0 for j in range(N) ] for i in range(N) ]
+    for i, r in enumerate( rowOrder ):
+        for j, c in enumerate( colOrder ):
+            if transposed:
+                out[c][r] = inverse[g[i][j]]
+            else:
+                out[r][c] = inverse[g[i][j]]
+    return out
+
+def gridToString ( board, g ):
+    return "".join( board.intToOdometer( v ) if v < 36 else "(" + str(v) + ")" for row in g for v in row )
+
+"""
+    Return: a tuple of the canonical key of board, a string, and the
+            transform from board to its canonical grid
+"""
+def canonicalForm ( board ):
+    p, q, N = board.p, board.q, board.N
+    best = None
+
+    orientations = [ False, True ] if p == q else [ False ]
+    for transposed in orientations:
+        g = [ list( col ) for col in zip( *board.board ) ] if transposed else board.board
+        rowOrder, colOrder = orderLines( g, p, q )
+        cells   = [ g[r][c] for r in rowOrder for c in colOrder ]
+        relabel = relabelling( cells, N )
+        # the transform is expressed against the original board
+        transform = ( transposed, rowOrder, colOrder, relabel )
+        key = str(p) + "x" + str(q) + ":" + gridToString( board, applyTransform( transform, board.board ) )
+
+        if best is None or key < best[0]:
+            best = ( key, transform )
+
+    return best
+
+class SolutionCache:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param capacity  entries kept in memory, least recently used first out
+        @param path      dbm file holding every entry across runs, or None
+    """
+    def __init__ ( self, capacity = 10000, path = None ):
+        self.capacity = max( 1, capacity )
+        self.entries  = OrderedDict()
+        self.store    = dbm.open( path, "c" ) if path is not None else None
+
+        self.hits   = 0
+        self.misses = 0
+
+    def close ( self ):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    # ==================================================================
+    # Accessors
+    # ==================================================================
+
+    # Returns the solution of board in board's orientation, or None
+    def get ( self, board ):
+        key, transform = canonicalForm( board )
+
+        solution = self.entries.get( key )
+        if solution is not None:
+            self.entries.move_to_end( key )
+        elif self.store is not None and key in self.store:
+            solution = self.store[key].decode()
+            self.remember( key, solution )
+
+        if solution is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        N = board.N
+        cells = self.parseCells( solution )
+        grid  = [ cells[i*N:(i+1)*N] for i in range(N) ]
+        return SudokuBoard.SudokuBoard( board.p, board.q, board=invertTransform( transform, grid ) )
+
+    # ==================================================================
+    # Modifiers
+    # ==================================================================
+
+    def put ( self, board, solution ):
+        key, transform = canonicalForm( board )
+        value = gridToString( board, applyTransform( transform, solution.board ) )
+
+        self.remember( key, value )
+        if self.store is not None:
+            self.store[key] = value
+
+    def remember ( self, key, value ):
+        self.entries[key] = value
+        self.entries.move_to_end( key )
+        while len( self.entries ) > self.capacity:
+            self.entries.popitem( last=False )
+
+    # ==================================================================
+    # Helpers
+    # ==================================================================
+
+    # Inverse of gridToString
+    def parseCells ( self, s ):
+        cells = []
+        i = 0
+        while i < len( s ):
+            if s[i] == "(":
+                end = s.index( ")", i )
+                cells.append( int( s[i+1:end] ) )
+                i = end + 1
+            else:
+                cells.append( int( s[i], 36 ) )
+                i += 1
+        return cells
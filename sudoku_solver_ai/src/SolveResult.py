@@ -0,0 +1,58 @@
+"""
+    Outcome of a solve run under limits, see BTSolver.solveWithin.
+
+    status is one of:
+      * SOLVED   a solution was found, board holds it
+      * UNSAT    the search space was exhausted without a solution
+      * TIMEOUT  the wall-clock limit ran out
+      * BUDGET   the node or backtrack budget ran out
+
+    Unless solved, board holds the best partial assignment reached: the
+    consistent state with the most assigned cells (0 for the rest), so a
+    caller that gave up on a board still gets the progress made on it.
+"""
+
+class SolveResult:
+
+    SOLVED  = "solved"
+    UNSAT   = "unsat"
+    TIMEOUT = "timeout"
+    BUDGET  = "budget"
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param status    one of the constants above
+        @param board     SudokuBoard with the solution or best partial assignment
+        @param assigned  number of assigned cells on board
+        @param stats     SolverStats of the run
+    """
+    def __init__ ( self, status, board, assigned, stats ):
+        self.status   = status
+        self.board    = board
+        self.assigned = assigned
+        self.stats    = stats
+
+    # ==================================================================
+    # Accessors
+    # ==================================================================
+
+    def isSolved ( self ):
+        return self.status == SolveResult.SOLVED
+
+    # True if the run stopped on a limit rather than finishing the search
+    def isLimited ( self ):
+        return self.status in [ SolveResult.TIMEOUT, SolveResult.BUDGET ]
+
+    def toDict ( self ):
+        return {
+            "status"   : self.status,
+            "assigned" : self.assigned,
+            "board"    : self.board.board if self.board is not None else None,
+            "stats"    : self.stats.toDict(),
+        }
+
+    def __str__ ( self ):
+        return "status: " + self.status + "\tassigned: " + str(self.assigned)
@@ -0,0 +1,95 @@
+import json
+import cProfile
+
+"""
+    Per-solve statistics collected by BTSolver.
+
+    Besides the counters and timers below, callers can observe a solve
+    without patching the solver:
+
+      * hooks: callables invoked as hook(event, solver) on the "node",
+        "backtrack" and "solution" events
+      * profiler: when enableProfiling() was called, a cProfile.Profile
+        that is active for the duration of BTSolver.solve
+"""
+
+class SolverStats:
+
+    COUNTERS = [ "nodes", "maxDepth", "propagations", "domainRemovals", "hiddenSingles",
+                 "backtracks", "backjumps", "nogoodPrunes", "restarts", "timeVariableSelection",
+                 "timeValueOrdering", "timeConsistency", "timeTotal" ]
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    def __init__ ( self ):
+        self.nodes          = 0     # nodes expanded, i.e. variables selected for branching
+        self.maxDepth       = 0     # deepest level of the search tree reached
+        self.propagations   = 0     # variables assigned by constraint propagation
+        self.domainRemovals = 0     # values pruned from domains by propagation
+        self.hiddenSingles  = 0     # assignments made by norvigCheck hidden-single detection
+        self.backtracks     = 0     # assignments undone
+        self.backjumps      = 0     # levels skipped by backjumping
+        self.nogoodPrunes   = 0     # values skipped because they completed a stored nogood
+        self.restarts       = 0     # runs of the search cut off and started over
+
+        # seconds spent in each phase of the search
+        self.timeVariableSelection = 0.0
+        self.timeValueOrdering     = 0.0
+        self.timeConsistency       = 0.0
+        self.timeTotal             = 0.0
+
+        self.hooks    = []
+        self.profiler = None
+
+    # ==================================================================
+    # Hooks and Profiling
+    # ==================================================================
+
+    def addHook ( self, hook ):
+        self.hooks.append( hook )
+
+    def fire ( self, event, solver ):
+        for hook in self.hooks:
+            hook( event, solver )
+
+    def enableProfiling ( self ):
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+        return self.profiler
+
+    # Writes the collected profile in pstats format
+    def dumpProfile ( self, path ):
+        if self.profiler is not None:
+            self.profiler.dump_stats( path )
+
+    # ==================================================================
+    # Aggregation and Export
+    # ==================================================================
+
+    # Adds the counters of other into this object; maxDepth keeps the max
+    def merge ( self, other ):
+        for name in SolverStats.COUNTERS:
+            if name == "maxDepth":
+                self.maxDepth = max( self.maxDepth, other.maxDepth )
+            else:
+                setattr( self, name, getattr( self, name ) + getattr( other, name ) )
+        return self
+
+    def toDict ( self ):
+        return { name : getattr( self, name ) for name in SolverStats.COUNTERS }
+
+    @staticmethod
+    def fromDict ( d ):
+        stats = SolverStats()
+        for name in SolverStats.COUNTERS:
+            if name in d:
+                setattr( stats, name, d[name] )
+        return stats
+
+    def toJSON ( self ):
+        return json.dumps( self.toDict(), indent=2 )
+
+    def __str__ ( self ):
+        return "\n".join( name + ": " + str(getattr( self, name )) for name in SolverStats.COUNTERS )
@@ -2,6 +2,7 @@ import itertools
 import random
 import Constraint
 import Variable
+import GridGenerator
 
 """
     Represents a Sudoku Board. This is converted to a constraint network,
@@ -53,19 +54,13 @@ class SudokuBoard:
                 self.p = 3
             if q == None:
                 self.q = 3
-            self.N = p*q
-            self.board = [[0 for j in range(self.N)] for i in range(self.N)]
-
-            while True:
-                if m <= 0:
-                    break
-
-                randomRow = random.randint(0, self.N-1)
-                randomCol = random.randint(0, self.N-1)
-                randomAssignment = random.randint(1, self.N)
-                if self.board[randomRow][randomCol] == 0 and self.isValidValue( randomRow, randomCol, randomAssignment ):
-                    self.board[randomRow][randomCol] = randomAssignment
-                    m -= 1
+            self.N = self.p*self.q
+
+            # m cells of a random complete grid, so the board always has a
+            # solution; seeded from random, so random.seed still fixes it
+            generator = GridGenerator.GridGenerator( self.p, self.q, random.getrandbits(64) )
+            grid = generator.puzzleGrid( m )
+            self.board = [ grid[i*self.N:(i+1)*self.N] for i in range(self.N) ]
 
     # ==================================================================
     # String representation
@@ -1,40 +1,54 @@
-# import copy
 import Variable
-import Domain
-import copy
 
 """
     Represents the trail of changes made. This allows backtracking to occur.
+
+    Entries live in parallel arrays (variable, domain snapshot, assigned
+    flag) that grow to the deepest point of the search and are then reused
+    in place. Snapshots come from Domain.snapshot, a copy of the value
+    list, rather than full Domain copies.
+
+    Only the first push of a variable after a marker is recorded: undo
+    restores entries newest first, so that entry already restores the
+    state any later push at the same level would have saved.
 """
 
 class Trail:
 
-    # ==================================================================
-    # Properties
-    # ==================================================================
-    numPush = 0
-    numUndo = 0
-
     # ==================================================================
     # Constructor
     # ==================================================================
 
     def __init__ ( self ):
-        self.trailStack  = []
+        self.variables = []
+        self.snapshots = []
+        self.assigned  = []
+        self.top       = 0      # entries in use; the arrays beyond are spare
+
         self.trailMarker = []
 
+        # variable -> level of its last recorded push; the level changes
+        # with every marker placed or undone, and undo drops the entries
+        # of the variables it pops
+        self.pushedAt = dict()
+        self.level    = 0
+
+        # Counters belong to this trail, so solvers do not leak into each other
+        self.numPush = 0
+        self.numUndo = 0
+
     # ==================================================================
     # Accessors
     # ==================================================================
 
     def size ( self ):
-        return len( self.trailStack )
+        return self.top
 
     def getPushCount ( self ):
-        return Trail.numPush
+        return self.numPush
 
     def getUndoCount ( self ):
-        return Trail.numUndo
+        return self.numUndo
 
     # ==================================================================
     # Modifiers
@@ -42,7 +56,8 @@ class Trail:
 
     # Places a marker in the trail
     def placeTrailMarker ( self ):
-        self.trailMarker.append( len( self.trailStack ) )
+        self.trailMarker.append( self.top )
+        self.level += 1
 
     """
         Before you assign a variable in constraint propagation,
@@ -51,25 +66,62 @@ class Trail:
         you can restore propagated domains correctly.
     """
     def push ( self, v ):
-        Trail.numPush += 1
-        domainCopy = Domain.Domain( [i for i in v.getValues()] )
-        vPair = [v, domainCopy]
-        self.trailStack.append(vPair)
+        if self.pushedAt.get( v ) == self.level:
+            return
+        self.pushedAt[v] = self.level
+        self.numPush += 1
+
+        top = self.top
+        if top == len( self.variables ):
+            self.variables.append( v )
+            self.snapshots.append( v.domain.snapshot() )
+            self.assigned.append( v.assigned )
+        else:
+            self.variables[top] = v
+            self.snapshots[top] = v.domain.snapshot()
+            self.assigned[top]  = v.assigned
+        self.top = top + 1
 
     # Pops and restores variables on the trail until the last trail marker
     def undo ( self ):
-        Trail.numUndo += 1
+        self.numUndo += 1
+        self.level += 1
         targetSize = self.trailMarker.pop() # targetSize target position on the trail to backtrack to
-        size = len(self.trailStack)
-        while size > targetSize:
-            vPair = self.trailStack.pop()
-            v = vPair[0]
-            v.setDomain( vPair[1] )
-            v.setModified( False )
-            v.unassign()
-            size -= 1
-
-    # Clears the trail
+        variables, snapshots, assigned = self.variables, self.snapshots, self.assigned
+
+        pushedAt = self.pushedAt
+        i = self.top
+        while i > targetSize:
+            i -= 1
+            v = variables[i]
+            # the level moved on, so its entry could only go stale
+            pushedAt.pop( v, None )
+            if not v.changeable:
+                continue
+            network = v.network
+            domain  = v.domain
+
+            # release the value first, so the network sees it go
+            if v.assigned and network is not None:
+                network.variableUnassigned( v, domain.first() )
+
+            before = domain.view() if network is not None and network.tracking else None
+            domain.restore( snapshots[i] )
+            v.modified = False
+            v.assigned = assigned[i]
+
+            if network is not None:
+                network.domainRestored( v, before )
+                if v.assigned:
+                    network.variableAssigned( v, domain.first() )
+
+        self.top = targetSize
+
+    # Clears the trail and lets go of its variables, keeping the counters
     def clear ( self ):
-        self.trailStack = []
+        self.variables = []
+        self.snapshots = []
+        self.assigned  = []
+        self.top = 0
         self.trailMarker = []
+        self.pushedAt = dict()
@@ -5,24 +5,34 @@ import Domain
     Represents a variable in a CSP
 """
 
-STATIC_NAMING_COUNTER = 1
+# (row, col, block) -> the one tuple shared by every variable on that cell,
+# in every network, so boards of one geometry hold their metadata once
+CELLS = dict()
+
+def cellOf(row, col, block):
+    key = (row, col, block)
+    cell = CELLS.get(key)
+    if cell is None:
+        cell = CELLS[key] = key
+    return cell
 
 
 class Variable:
 
+    # No per-instance __dict__: a 25x25 network holds 625 of these
+    __slots__ = ("domain", "network", "cell", "assigned", "modified", "changeable")
+
     # ==================================================================
     # Constructors
     # ==================================================================
 
     def __init__(self, possible_Values, row, col, block):
-        global STATIC_NAMING_COUNTER
-        self.name = "v" + str(STATIC_NAMING_COUNTER)
-        STATIC_NAMING_COUNTER += 1
-
         self.domain = Domain.Domain(possible_Values)
-        self.row = row
-        self.col = col
-        self.block = block
+
+        # Owning ConstraintNetwork, notified of assignment changes so it can
+        # keep its consistency counters up to date
+        self.network = None
+        self.cell = cellOf(row, col, block)
         if self.size() == 1:
             self.assigned = True
             self.modified = True
@@ -34,16 +44,30 @@ class Variable:
 
     def copy(self, v):
         self.domain = v.domain
-        self.row = v.row
-        self.col = v.col
-        self.block = v.block
+        self.cell = v.cell
         self.modified = v.modified
-        self.name = v.name
 
     # ==================================================================
     # Accessors
     # ==================================================================
 
+    @property
+    def row(self):
+        return self.cell[0]
+
+    @property
+    def col(self):
+        return self.cell[1]
+
+    @property
+    def block(self):
+        return self.cell[2]
+
+    # Built on demand from the cell instead of a global counter
+    @property
+    def name(self):
+        return "v" + str(self.cell[0]) + "_" + str(self.cell[1])
+
     def isChangeable(self):
         return self.changeable
 
@@ -58,10 +82,10 @@ class Variable:
 
     # Returns the assigned value or 0 if unassigned
     def getAssignment(self):
-        if not self.isAssigned():
+        if not self.assigned:
             return 0
         else:
-            return self.domain.values[0]
+            return self.domain.first()
 
     def getDomain(self):
         return self.domain
@@ -81,15 +105,25 @@ class Variable:
         self.domain.modified = mod
 
     def unassign(self):
+        if self.assigned and self.network is not None:
+            self.network.variableUnassigned(self, self.getAssignment())
         self.assigned = False
 
-    # Assign a value to the variable
+    # Assign a value to the variable, narrowing the domain in place. The
+    # trail holds its own copy of the old domain, so nothing is allocated.
     def assignValue(self, val):
         if not self.changeable:
             return
 
+        if self.network is not None:
+            if self.assigned:
+                self.network.variableUnassigned(self, self.getAssignment())
+            self.network.variableAssigned(self, val)
+            self.network.domainAssigned(self, val)
+
         self.assigned = True
-        self.setDomain(Domain.Domain(val))
+        self.domain.assign(val)
+        self.modified = True
 
     # Sets the domain of the variable
     def setDomain(self, d):
@@ -97,6 +131,8 @@ class Variable:
             return
 
         if self.domain != d:
+            if self.network is not None:
+                self.network.domainReplaced(self, self.domain, d)
             self.domain = d
             self.modified = True
 
@@ -105,7 +141,8 @@ class Variable:
         if not self.changeable:
             return
 
-        self.domain.remove(val)
+        if self.domain.remove(val) and self.network is not None:
+            self.network.valueRemoved(self, val)
         self.modified = self.domain.isModified()
 
     # ==================================================================
@@ -0,0 +1,180 @@
+import heapq
+
+"""
+    Priority queue of unassigned variables for the MRV and MRV + degree
+    heuristics, replacing a full scan of the network on every selection.
+
+    Entries are (domain size, [-degree,] position, variable) tuples in a
+    binary heap with lazy invalidation: the queue listens to its network,
+    marks variables dirty as their domains or assignments change (including
+    changes made by Trail.undo), and pushes a fresh entry for each dirty
+    variable at the next selection. Entries whose key no longer matches the
+    variable are discarded when they reach the top.
+
+    Ties break on network order, which gives the same choices as
+    BTSolver.getMRV and BTSolver.MRVwithTieBreaker()[0], unless shuffle
+    gave the variables a random order to break them on instead.
+
+    With weighting the queue learns from failures instead, through
+    constraintFailed, and ranks variables by domain size over a score:
+
+      * "wdeg": dom/wdeg, the score of a variable is the sum of the
+        weights of its constraints, and a constraint's weight goes up by
+        one every time it fails
+      * "activity": the score of a variable goes up every time one of
+        its constraints fails, by an amount that grows by 1/ACTIVITY_DECAY
+        with each failure, so older failures count for less and less
+
+    A failure only marks the variables of the failed constraint dirty, so
+    the scores are kept up to date without rescanning the network.
+"""
+
+class VariableQueue:
+
+    # Learning heuristics, see constraintFailed
+    WEIGHTINGS = [ "wdeg", "activity" ]
+
+    # Share of its activity a variable keeps with every later failure
+    ACTIVITY_DECAY = 0.95
+
+    # Activities are scaled back down once a bump grows past this, but
+    # never below the floor, so a domain size can always be divided by them
+    ACTIVITY_LIMIT = 1e100
+    ACTIVITY_FLOOR = 1e-300
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param useDegree  break domain size ties on the most unassigned
+                          neighbors first
+        @param weighting  None, or one of WEIGHTINGS to rank by domain
+                          size over the learned score instead
+    """
+    def __init__ ( self, network, useDegree = False, weighting = None ):
+        if weighting is not None and weighting not in VariableQueue.WEIGHTINGS:
+            raise ValueError( "Unknown weighting " + str(weighting) )
+
+        self.network   = network
+        self.useDegree = useDegree
+        self.weighting = weighting
+        self.variables = network.getVariables()
+        self.position  = { v : i for i, v in enumerate( self.variables ) }
+
+        # score of every variable, and the next activity bump; only
+        # maintained with the activity weighting
+        self.activity = dict()
+        self.bump     = 1.0
+        if weighting == "activity":
+            self.activity = { v : 1.0 for v in self.variables }
+
+        # number of unassigned neighbors, only maintained with useDegree
+        self.degree = dict()
+        if useDegree:
+            for v in self.variables:
+                self.degree[v] = sum( 1 for n in network.getNeighborsOfVariable( v ) if not n.isAssigned() )
+
+        self.dirty = dict()
+        self.heap  = []
+        self.rebuild()
+
+        network.addListener( self )
+
+    # ==================================================================
+    # Accessors
+    # ==================================================================
+
+    def key ( self, v ):
+        if self.weighting == "wdeg":
+            return ( v.size() / self.weightedDegree( v ), self.position[v] )
+        if self.weighting == "activity":
+            return ( v.size() / self.activity[v], self.position[v] )
+        if self.useDegree:
+            return ( v.size(), -self.degree[v], self.position[v] )
+        return ( v.size(), self.position[v] )
+
+    # Sum of the weights of the constraints containing v
+    def weightedDegree ( self, v ):
+        return sum( c.weight for c in self.network.getConstraintsContainingVariable( v ) )
+
+    # Returns the best unassigned variable, or None if all are assigned
+    def select ( self ):
+        if self.dirty:
+            if len( self.heap ) > 4 * len( self.variables ):
+                self.rebuild()
+            else:
+                for v in self.dirty:
+                    if not v.isAssigned():
+                        heapq.heappush( self.heap, self.key( v ) + ( v, ) )
+                self.dirty.clear()
+
+        heap = self.heap
+
+        while heap:
+            entry = heap[0]
+            v = entry[-1]
+            if not v.isAssigned() and entry[:-1] == self.key( v ):
+                return v
+            heapq.heappop( heap )
+
+        return None
+
+    # ==================================================================
+    # Modifiers
+    # ==================================================================
+
+    """
+        Learns from a failure of constraint c, the one found to hold two
+        equal values or no place left for a value: raises its weight, or
+        the activity of its variables, and marks them for re-ranking.
+    """
+    def constraintFailed ( self, c ):
+        if self.weighting == "wdeg":
+            c.weight += 1
+            for v in c.vars:
+                self.dirty[v] = None
+
+        elif self.weighting == "activity":
+            activity = self.activity
+            bump = self.bump
+            for v in c.vars:
+                activity[v] += bump
+                self.dirty[v] = None
+
+            # rather than decaying every activity, make later bumps larger
+            self.bump = bump / VariableQueue.ACTIVITY_DECAY
+            if self.bump > VariableQueue.ACTIVITY_LIMIT:
+                scale = 1.0 / VariableQueue.ACTIVITY_LIMIT
+                for v in self.variables:
+                    activity[v] = max( activity[v] * scale, VariableQueue.ACTIVITY_FLOOR )
+                self.bump *= scale
+                self.rebuild()
+
+    # Breaks ties on a random order of the variables, drawn from rng
+    def shuffle ( self, rng ):
+        order = list( range( len( self.variables ) ) )
+        rng.shuffle( order )
+        self.position = { v : order[i] for i, v in enumerate( self.variables ) }
+        self.rebuild()
+
+    # Rebuilds the heap from the current state of every variable
+    def rebuild ( self ):
+        self.heap = [ self.key( v ) + ( v, ) for v in self.variables if not v.isAssigned() ]
+        heapq.heapify( self.heap )
+        self.dirty.clear()
+
+    # ==================================================================
+    # Network Notifications
+    # ==================================================================
+
+    def domainChanged ( self, v ):
+        self.dirty[v] = None
+
+    def assignmentChanged ( self, v, assigned ):
+        self.dirty[v] = None
+        if self.useDegree:
+            delta = -1 if assigned else 1
+            for n in self.network.getNeighborsOfVariable( v ):
+                self.degree[n] += delta
+                self.dirty[n] = None
@@ -0,0 +1,128 @@
+import SudokuBoard
+import BatchSolver
+import SolverStats
+import VectorPropagator
+from VectorPropagator import np
+
+"""
+    Solves many boards of one geometry together.
+
+    A stack of boards is given as a (B, N, N) array and propagated as a
+    whole by VectorPropagator, so no ConstraintNetwork, Variable or
+    Constraint objects are built for the boards that propagation alone
+    solves, which for easy puzzles is most of them. Only the leftover
+    boards are sent to the per-board search, starting from their reduced
+    grids.
+
+    Requires numpy (VectorPropagator.HAVE_NUMPY).
+"""
+
+class VectorBatch:
+
+    # ==================================================================
+    # Constructors
+    # ==================================================================
+
+    """
+        @param p, q       geometry shared by every board of the batch
+        @param chunkSize  boards propagated together, bounding the
+                          (chunkSize, N, N, N) candidate tensor
+        @param backend    search used for leftovers, see BatchSolver.makeSolver
+        @param limits     limits of each leftover search, see BatchSolver.runSearch
+        @param options    search options of each leftover search, see BatchSolver.makeSolver
+    """
+    def __init__ ( self, p, q, val_sh, var_sh, cc, chunkSize = 4096, backend = "BT", limits = None, options = None ):
+        self.p          = p
+        self.q          = q
+        self.N          = p*q
+        self.val_sh     = val_sh
+        self.var_sh     = var_sh
+        self.cc         = cc
+        self.chunkSize  = max( 1, chunkSize )
+        self.backend    = backend
+        self.limits     = limits
+        self.options    = options
+
+        self.numBoards     = 0
+        self.numPropagated = 0     # solved by propagation alone
+        self.numSearched   = 0     # handed to the per-board search
+        self.numSolutions  = 0
+        self.numPushes     = 0
+        self.numBacktracks = 0
+        self.stats         = SolverStats.SolverStats()
+
+    # ==================================================================
+    # Engine Functions
+    # ==================================================================
+
+    """
+        Solves grids, an array-like of shape (B, N, N) with 0 for empty cells.
+
+        Return: a tuple of the (B, N, N) solution grids, all 0 for boards
+                without a solution, and a (B,) bool array of solved boards
+    """
+    def solve ( self, grids ):
+        grids     = np.asarray( grids )
+        solutions = np.zeros( grids.shape, dtype=np.int16 )
+        solved    = np.zeros( grids.shape[0], dtype=bool )
+
+        for start in range( 0, grids.shape[0], self.chunkSize ):
+            end = min( start + self.chunkSize, grids.shape[0] )
+            solutions[start:end], solved[start:end] = self.solveChunk( grids[start:end] )
+
+        return solutions, solved
+
+    def solveChunk ( self, grids ):
+        p, q  = self.p, self.q
+        grids = np.asarray( grids )
+        cand, ok = VectorPropagator.propagate( VectorPropagator.candidateTensor( grids, p, q ), p, q )
+        reduced  = VectorPropagator.toGrids( cand )
+
+        complete = ok & ( reduced != 0 ).all( axis=( 1, 2 ) )
+        solved   = complete.copy()
+        self.numBoards     += grids.shape[0]
+        self.numPropagated += int( complete.sum() )
+
+        for i in np.flatnonzero( ok & ~complete ):
+            board = SudokuBoard.SudokuBoard( p, q, board=reduced[i].tolist() )
+            solver, trail = BatchSolver.runSolver( board, self.val_sh, self.var_sh, self.cc,
+                                                   backend=self.backend, limits=self.limits,
+                                                   options=self.options )
+            self.numSearched   += 1
+            self.numPushes     += trail.getPushCount()
+            self.numBacktracks += trail.getUndoCount()
+            self.stats.merge( solver.stats )
+
+            if solver.hassolution:
+                reduced[i] = solver.getSolution().board
+                solved[i]  = True
+
+        self.numSolutions += int( solved.sum() )
+        reduced[~solved] = 0
+        return reduced, solved
+
+    """
+        Solves a stream of SudokuBoards chunk by chunk, yielding
+        (board, solution) in input order, where solution is a SudokuBoard
+        or None. Boards of another geometry than (p, q) start a new chunk
+        solved with their own geometry.
+    """
+    def solveBoards ( self, boards ):
+        chunk = []
+        for board in boards:
+            if chunk and ( ( board.p, board.q ) != ( chunk[0].p, chunk[0].q ) or len( chunk ) == self.chunkSize ):
+                yield from self.flush( chunk )
+                chunk = []
+            chunk.append( board )
+
+        if chunk:
+            yield from self.flush( chunk )
+
+    def flush ( self, chunk ):
+        self.p, self.q = chunk[0].p, chunk[0].q
+        self.N = self.p * self.q
+
+        solutions, solved = self.solveChunk( [ b.board for b in chunk ] )
+        for board, grid, ok in zip( chunk, solutions, solved ):
+            solution = SudokuBoard.SudokuBoard( board.p, board.q, board=grid.tolist() ) if ok else None
+            yield board, solution
@@ -0,0 +1,109 @@
+import SudokuBoard
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    np = None
+    HAVE_NUMPY = False
+
+"""
+    Whole-board constraint propagation with NumPy.
+
+    Instead of walking Variable, Domain and neighbor objects, a stack of B
+    boards of one p x q geometry is held as a (B, N, N, N) boolean
+    candidate tensor: cand[b, i, j, v-1] is True while value v is still
+    possible for cell (i, j) of board b. One propagation round is a
+    handful of array operations over every row, column and block at once:
+
+      * naked singles: a cell with one candidate removes that value from
+        every other cell of its row, column and block
+      * hidden singles: a value with one possible cell in some row, column
+        or block is forced into that cell
+
+    Rounds repeat until nothing changes. The reduced board is handed back
+    to the object-based search (BTSolver or DLXSolver) as a SudokuBoard
+    with the singles filled in.
+
+    NumPy is optional: HAVE_NUMPY is False when it cannot be imported, and
+    the rest of the solver does not depend on this module.
+"""
+
+# Builds the candidate tensor of grids, an array-like of shape (B, N, N)
+# holding values 1..N and 0 for an empty cell
+def candidateTensor ( grids, p, q ):
+    grids  = np.asarray( grids )
+    values = np.arange( 1, p*q + 1 )
+    return ( grids[..., None] == values ) | ( grids == 0 )[..., None]
+
+"""
+    For a (B, N, N, N) tensor x, returns the number of True entries for
+    each value in the row, the column and the block of every cell, each
+    broadcastable against x.
+"""
+def unitCounts ( x, p, q ):
+    B, N = x.shape[0], p*q
+    rows   = x.sum( axis=2, keepdims=True, dtype=np.int16 )
+    cols   = x.sum( axis=1, keepdims=True, dtype=np.int16 )
+
+    # row i = a*p + b and column j = c*q + d lie in block (a, c)
+    blocks = x.reshape( B, q, p, p, q, N ).sum( axis=( 2, 4 ), keepdims=True, dtype=np.int16 )
+    blocks = np.broadcast_to( blocks, ( B, q, p, p, q, N ) ).reshape( B, N, N, N )
+    return rows, cols, blocks
+
+"""
+    Runs naked and hidden single elimination on cand to a fixpoint.
+
+    Return: a tuple of the reduced tensor and a (B,) bool array that is
+            False for every board found to have no solution. The
+            candidates of those boards are cleared.
+"""
+def propagate ( cand, p, q ):
+    ok = np.ones( cand.shape[0], dtype=bool )
+
+    while True:
+        counts = cand.sum( axis=-1 )
+        ok &= ( counts > 0 ).all( axis=( 1, 2 ) )
+
+        # Naked singles
+        single = cand & ( counts == 1 )[..., None]
+        rows, cols, blocks = unitCounts( single, p, q )
+        ok &= ( ( rows <= 1 ).all( axis=( 1, 2, 3 ) )
+              & ( cols <= 1 ).all( axis=( 1, 2, 3 ) )
+              & ( blocks <= 1 ).all( axis=( 1, 2, 3 ) ) )
+        placed  = ( rows > 0 ) | ( cols > 0 ) | ( blocks > 0 )
+        reduced = cand & ( single | ~placed )
+
+        # Hidden singles
+        rows, cols, blocks = unitCounts( reduced, p, q )
+        ok &= ( ( rows > 0 ).all( axis=( 1, 2, 3 ) )
+              & ( cols > 0 ).all( axis=( 1, 2, 3 ) )
+              & ( blocks > 0 ).all( axis=( 1, 2, 3 ) ) )
+        hidden = reduced & ( ( rows == 1 ) | ( cols == 1 ) | ( blocks == 1 ) )
+        ok &= ( hidden.sum( axis=-1 ) <= 1 ).all( axis=( 1, 2 ) )
+        reduced = np.where( hidden.any( axis=-1 )[..., None], hidden, reduced )
+
+        # Failed boards are cleared so they stop changing
+        reduced[~ok] = False
+
+        if np.array_equal( reduced, cand ):
+            return cand, ok
+        cand = reduced
+
+# Returns the (B, N, N) grids of cand, with 0 where a cell is undecided
+def toGrids ( cand ):
+    decided = cand.sum( axis=-1 ) == 1
+    return np.where( decided, cand.argmax( axis=-1 ) + 1, 0 )
+
+"""
+    Propagates a single SudokuBoard.
+
+    Return: a new SudokuBoard with every cell fixed by propagation filled
+            in, or None if propagation proves the board has no solution
+"""
+def reduceBoard ( board ):
+    p, q = board.p, board.q
+    cand, ok = propagate( candidateTensor( [ board.board ], p, q ), p, q )
+    if not ok[0]:
+        return None
+    return SudokuBoard.SudokuBoard( p, q, board=toGrids( cand )[0].tolist() )
@@ -0,0 +1,76 @@
+import os
+import sys
+
+# The solver modules import each other by bare name, as Main does when
+# run from src, so the tests put src on the path the same way
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), os.pardir, "src" ) )
+
+import BoardGenerator
+import BTSolver
+import SudokuBoard
+import Trail
+
+# ======================================================================
+# Helpers shared by the test modules, which import them from here
+# ======================================================================
+
+def flat ( board ):
+    return [ v for row in board.board for v in row ]
+
+def copyOf ( board ):
+    return SudokuBoard.SudokuBoard( board.p, board.q, board=[ row[:] for row in board.board ] )
+
+# The counts of a constraint that are not zero
+def nonzero ( counts ):
+    return { val : n for val, n in counts.items() if n }
+
+# A solver for a copy of board, propagated once as Main does
+def makeSolver ( board, val_sh = "", var_sh = "MinimumRemainingValue", cc = "forwardChecking", **options ):
+    solver = BTSolver.BTSolver( copyOf( board ), Trail.Trail(), val_sh, var_sh, cc, **options )
+    solver.checkConsistency()
+    return solver
+
+# A solution is a full valid grid that keeps the givens
+def isSolutionOf ( generator, solution, board ):
+    grid = flat( solution )
+    return generator.countSolutions( grid, 2 ) == 1 and all( g in ( 0, v ) for g, v in zip( flat( board ), grid ) )
+
+# Boards with one solution and boards with many, small enough to count,
+# with their generators
+def boards ( ):
+    out = []
+    for p, q, givens, unique in [ ( 2, 3, 8, False ), ( 2, 3, 12, False ), ( 3, 3, 26, True ) ]:
+        generator = BoardGenerator.BoardGenerator( p, q, 11, unique )
+        out += [ ( generator, board ) for board in generator.puzzles( givens, 3 ) ]
+    return out
+
+# A unique board with one more given that clashes with no other given
+# but with the solution, so it has no solution left
+def unsolvable ( generator, board ):
+    _, solution = generator.search( flat( board ), 1 )
+    N = board.N
+    bad = copyOf( board )
+    for k, v in enumerate( flat( board ) ):
+        r, c = divmod( k, N )
+        for val in range( 1, N + 1 ):
+            if v == 0 and val != solution[k] and bad.isValidValue( r, c, val ):
+                bad.board[r][c] = val
+                return bad
+
+# Boards without a solution: one whose first propagation clashes, one
+# whose givens clash, and unique boards given one value off the solution
+def unsatBoards ( ):
+    out = [ SudokuBoard.SudokuBoard( 2, 2, board=[ [ 2, 0, 0, 4 ], [ 0, 4, 2, 0 ], [ 4, 2, 0, 1 ], [ 1, 3, 0, 0 ] ] ),
+            SudokuBoard.SudokuBoard( 2, 3, board=[ [ 5, 0, 0, 0, 0, 5 ] ] + [ [ 0 ] * 6 for _ in range( 5 ) ] ) ]
+    generator = BoardGenerator.BoardGenerator( 3, 3, 11, unique=True )
+    return out + [ unsolvable( generator, board ) for board in generator.puzzles( 26, 2 ) ]
+
+# Writes board to path in the file format Main reads
+def writeBoard ( path, board ):
+    with open( str( path ), "w" ) as f:
+        f.write( "%d %d\n" % ( board.p, board.q ) + "\n".join( " ".join( map( str, row ) ) for row in board.board ) + "\n" )
+
+# Writes boards to directory as board00.txt, board01.txt, ...
+def writeBoards ( directory, boards ):
+    for i, board in enumerate( boards ):
+        writeBoard( os.path.join( str( directory ), "board%02d.txt" % i ), board )
@@ -0,0 +1,207 @@
+import inspect
+import sys
+import pytest
+import BoardGenerator
+import BTSolver
+import SolveResult
+import SudokuBoard
+from conftest import boards, flat, isSolutionOf, makeSolver, unsatBoards
+
+# Backjumping and nogoods only skip subtrees without solutions
+def test_backjumping_keeps_every_solution ( ):
+    learned = 0
+    for generator, board in boards():
+        expected = generator.countSolutions( flat( board ), 1000 )
+        for cc in [ "forwardChecking", "norvigCheck" ]:
+            for options in [ {}, { "backjump" : True }, { "nogoods" : 100 } ]:
+                solver = makeSolver( board, cc=cc, **options )
+                assert solver.countSolutions( 1000 ) == expected
+                if solver.nogoods is not None:
+                    learned += solver.nogoods.numAdded
+
+                solver = makeSolver( board, cc=cc, **options )
+                solver.solve()
+                assert solver.hassolution and isSolutionOf( generator, solver.getSolution(), board )
+    assert learned > 0
+
+# Counting stops at the limit, and a budget leaves a lower bound
+def test_count_solutions_up_to_limit ( ):
+    for generator, board in boards():
+        expected = generator.countSolutions( flat( board ), 1000 )
+        for limit in [ 1, 2, 10 ]:
+            solver = makeSolver( board, cc="norvigCheck" )
+            assert solver.countSolutions( limit ) == min( limit, expected )
+            assert solver.result.status == SolveResult.SolveResult.SOLVED
+            assert isSolutionOf( generator, solver.result.board, board )
+
+        if expected > 10:
+            solver = makeSolver( board )
+            count = solver.countSolutions( None, maxNodes=10 )
+            assert solver.result.status == SolveResult.SolveResult.BUDGET and count < expected
+
+def test_luby_sequence ( ):
+    assert [ BTSolver.luby( i ) for i in range( 1, 16 ) ] == [ 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8 ]
+
+def test_rejects_bad_restart_options ( ):
+    board = boards()[0][1]
+    with pytest.raises( ValueError ):
+        makeSolver( board, restarts="luby", restartBase=BTSolver.BTSolver.MIN_RESTART_BASE - 1 )
+    with pytest.raises( ValueError ):
+        makeSolver( board, restarts="often" )
+
+# Restarts change the order of the search, never its outcome
+def test_restarts_keep_solutions ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 11, unique=True )
+    hard = [ ( generator, board ) for board in generator.puzzles( 24, 4 ) ]
+    for restarts in BTSolver.BTSolver.RESTARTS:
+        restarted = 0
+        for generator, board in hard:
+            solver = makeSolver( board, restarts=restarts, restartBase=10, seed=3 )
+            solver.solve()
+            assert solver.hassolution and isSolutionOf( generator, solver.getSolution(), board )
+            restarted += solver.stats.restarts
+
+            solver = makeSolver( board, restarts=restarts, restartBase=10, seed=3, maxRestarts=1 )
+            solver.solve()
+            assert solver.hassolution and solver.stats.restarts <= 1
+        assert restarted > 0
+
+        for generator, board in boards():
+            solver = makeSolver( board, cc="norvigCheck", restarts=restarts, restartBase=10, seed=5 )
+            assert solver.countSolutions( 1000 ) == generator.countSolutions( flat( board ), 1000 )
+
+# The learned heuristics only reorder the variables; each failure
+# raises a constraint weight or the next activity bump
+def test_weighted_heuristics_keep_solutions ( ):
+    for var_sh in [ "DomOverWeightedDegree", "ActivityDecay" ]:
+        learned = False
+        for generator, board in boards():
+            for cc in [ "forwardChecking", "norvigCheck" ]:
+                solver = makeSolver( board, var_sh=var_sh, cc=cc )
+                assert solver.countSolutions( 1000 ) == generator.countSolutions( flat( board ), 1000 )
+                weights = sum( c.weight - 1 for c in solver.network.getConstraints() )
+                learned = learned or weights > 0 or solver.weightedQueue.bump > 1
+        assert learned
+
+# Restarts are left to the propagating checks, plain backtracking
+# takes too long to refute the 9x9 boards over and over
+def test_count_unsatisfiable_boards ( ):
+    runs = [ ( cc, options ) for cc in [ "forwardChecking", "norvigCheck" ]
+             for options in [ {}, { "backjump" : True }, { "restarts" : "luby", "restartBase" : 10 } ] ]
+    for board in unsatBoards():
+        assert BoardGenerator.BoardGenerator( board.p, board.q, 0 ).countSolutions( flat( board ), 10 ) == 0
+        for cc, options in runs + [ ( "", {} ) ]:
+            solver = makeSolver( board, cc=cc, **options )
+            assert solver.countSolutions( 10 ) == 0
+            assert not solver.hassolution and solver.result.status == SolveResult.SolveResult.UNSAT
+
+            solver = makeSolver( board, cc=cc, **options )
+            solver.solve()
+            assert not solver.hassolution
+
+# Values given away by splitOff are gone for good: the solver stops
+# restarting, so it never gets back to them, and the solver taking a
+# grid finds what this one no longer can
+def test_split_off_ends_restarts ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 11, unique=True )
+    split = 0
+    for board in generator.puzzles( 24, 4 ):
+        solver = makeSolver( board, restarts="luby", restartBase=10, seed=3 )
+        if solver.solveWithin( maxNodes=20 ).status != SolveResult.SolveResult.BUDGET:
+            continue
+        grids = solver.splitOff()
+        restarts = solver.stats.restarts
+        solver.solve()
+        assert solver.stats.restarts == restarts
+
+        found = [ solver.hassolution ]
+        for grid in grids:
+            other = makeSolver( SudokuBoard.SudokuBoard( board.p, board.q, board=grid ) )
+            other.solve()
+            found.append( other.hassolution )
+        assert found.count( True ) == 1
+        split += 1
+    assert split > 0
+
+# The search keeps its levels on a stack of frames, so it goes deeper
+# than the interpreter would let a recursive one
+def test_search_deeper_than_recursion_limit ( ):
+    board = BoardGenerator.BoardGenerator( 2, 3, 5 ).puzzle( 2 )
+    solver = makeSolver( board, var_sh="", cc="" )
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit( len( inspect.stack() ) + 30 )
+    try:
+        solver.solve()
+    finally:
+        sys.setrecursionlimit( limit )
+    assert solver.hassolution and solver.stats.maxDepth > 30
+    assert BoardGenerator.BoardGenerator( 2, 3, 0 ).countSolutions( flat( solver.getSolution() ), 2 ) == 1
+
+# Every heuristic combination finds a valid solution; plain backtracking
+# is left to the boards smaller than 9x9
+def test_heuristics_find_solutions ( ):
+    for generator, board in boards():
+        checks = [ "forwardChecking", "norvigCheck" ] + ( [ "" ] if board.N < 9 else [] )
+        for var_sh in [ "", "MinimumRemainingValue", "MRVwithTieBreaker" ]:
+            for val_sh in [ "", "LeastConstrainingValue" ]:
+                for cc in checks:
+                    solver = makeSolver( board, val_sh, var_sh, cc )
+                    assert solver.solve() == 0
+                    assert solver.hassolution and isSolutionOf( generator, solver.getSolution(), board )
+                    assert solver.stats.nodes >= solver.stats.maxDepth
+
+# A board without givens has nothing to propagate from but still solves
+def test_empty_board ( ):
+    for p, q in [ ( 2, 2 ), ( 2, 3 ), ( 3, 3 ) ]:
+        board = SudokuBoard.SudokuBoard( p, q, board=[ [ 0 ] * ( p*q ) for _ in range( p*q ) ] )
+        generator = BoardGenerator.BoardGenerator( p, q, 0 )
+        for cc in [ "forwardChecking", "norvigCheck", "tournCC" ] + ( [ "" ] if p*q < 9 else [] ):
+            solver = makeSolver( board, cc=cc )
+            assert solver.solve() == 0
+            assert solver.hassolution and isSolutionOf( generator, solver.getSolution(), board )
+
+# A partial board keeps the givens and holds no two equal values in a unit
+def isPartialOf ( partial, board ):
+    for i, row in enumerate( partial.board ):
+        for j, val in enumerate( row ):
+            if board.board[i][j] not in ( 0, val ):
+                return False
+            if val:
+                row[j] = 0
+                valid = partial.isValidValue( i, j, val )
+                row[j] = val
+                if not valid:
+                    return False
+    return True
+
+# A limit stops the search with its best partial board, and the next call
+# resumes it, so a sliced search ends where a whole one does
+def test_limits_resume_the_search ( ):
+    limited = 0
+    for generator, board in boards():
+        whole = makeSolver( board )
+        assert whole.solveWithin().status == SolveResult.SolveResult.SOLVED
+
+        for limits in [ { "maxNodes" : 3 }, { "maxBacktracks" : 1 } ]:
+            solver = makeSolver( board )
+            result = solver.solveWithin( **limits )
+            while result.isLimited():
+                limited += 1
+                assert result.status == SolveResult.SolveResult.BUDGET
+                assert isPartialOf( result.board, board )
+                assert result.assigned == sum( 1 for v in flat( result.board ) if v )
+                result = solver.solveWithin( **limits )
+
+            assert result.status == SolveResult.SolveResult.SOLVED
+            assert flat( result.board ) == flat( whole.result.board )
+            assert ( solver.stats.nodes, solver.stats.backtracks ) == ( whole.stats.nodes, whole.stats.backtracks )
+    assert limited > 0
+
+def test_time_limit ( ):
+    generator, board = boards()[-1]
+    solver = makeSolver( board )
+    result = solver.solveWithin( timeLimit=0 )
+    assert result.status == SolveResult.SolveResult.TIMEOUT and result.isLimited()
+    assert isPartialOf( result.board, board ) and result.assigned >= sum( 1 for v in flat( board ) if v )
+    assert solver.solveWithin().isSolved()
+    assert isSolutionOf( generator, solver.result.board, board )
@@ -0,0 +1,40 @@
+import os
+import BatchSolver
+import BoardGenerator
+import SudokuBoard
+from conftest import unsatBoards, writeBoards
+
+# Boards with one solution, with many and with none
+def mixedBoards ( ):
+    out = []
+    for p, q, givens, unique in [ ( 2, 3, 8, False ), ( 3, 3, 26, True ), ( 3, 3, 22, False ) ]:
+        out += BoardGenerator.BoardGenerator( p, q, 7, unique ).puzzles( givens, 2 )
+    return out + unsatBoards()
+
+# The pool gives every board the result and totals a sequential run
+# over the same files gives
+def test_jobs_match_sequential_run ( tmp_path ):
+    writeBoards( tmp_path, mixedBoards() )
+    files = [ os.path.join( str( tmp_path ), f ) for f in sorted( os.listdir( str( tmp_path ) ) ) ]
+    for countLimit in [ None, 50 ]:
+        batch   = BatchSolver.BatchSolver( "", "MinimumRemainingValue", "forwardChecking", jobs=2, countLimit=countLimit )
+        results = list( batch.solveDirectory( str( tmp_path ) ) )
+        assert [ r["board"] for r in results ] == [ os.path.basename( f ) for f in files ]
+
+        nodes = backtracks = solutions = 0
+        for result, f in zip( results, files ):
+            solver, trail = BatchSolver.runSolver( SudokuBoard.SudokuBoard( filepath=f ), "", "MinimumRemainingValue", "forwardChecking", countLimit=countLimit )
+            assert result["status"] == solver.result.status and result["solved"] == solver.hassolution
+            assert ( result["pushes"], result["backtracks"] ) == ( trail.getPushCount(), trail.getUndoCount() )
+            assert all( result["stats"][name] == value for name, value in solver.stats.toDict().items() if not name.startswith( "time" ) )
+            if countLimit is not None:
+                assert result["solutions"] == solver.numSolutions
+                solutions += solver.numSolutions
+            nodes      += solver.stats.nodes
+            backtracks += solver.stats.backtracks
+
+        assert batch.numSolutions == sum( 1 for r in results if r["solved"] )
+        assert ( batch.stats.nodes, batch.stats.backtracks ) == ( nodes, backtracks )
+        assert batch.numBacktracks == sum( r["backtracks"] for r in results )
+        if countLimit is not None:
+            assert solutions > len( files ) and sum( r["solutions"] for r in results ) == solutions
@@ -0,0 +1,66 @@
+import copy
+import Benchmark
+import SolveResult
+
+def runSmall ( ):
+    bench = Benchmark.Benchmark( [ "9x9" ], seeds=2, repeats=3 )
+    bench.run()
+    return bench
+
+def test_unchanged_rerun_reports_nothing ( ):
+    baseline = runSmall().toDict()
+    assert runSmall().compare( baseline ) == []
+
+def test_repeats_keep_fastest_and_spread ( ):
+    bench = runSmall()
+    assert len( bench.runs ) == 2 * len( Benchmark.COMBINATIONS )
+    assert all( r["time"] > 0 and r["timeSpread"] >= 0 for r in bench.runs )
+
+def test_slowdown_past_noise_is_reported ( ):
+    bench = runSmall()
+    baseline = copy.deepcopy( bench.toDict() )
+    for entry in baseline["summary"].values():
+        entry["time"]["p50"] = 0.0
+        entry["timeSpread"]["p50"] = 0.0
+    for r in bench.runs:
+        r["time"] += 1.0
+    assert any( "median time" in r for r in bench.compare( baseline ) )
+
+def test_slowdown_within_noise_is_ignored ( ):
+    bench = runSmall()
+    baseline = copy.deepcopy( bench.toDict() )
+    for r in bench.runs:
+        r["time"] += 1.0
+        r["timeSpread"] = 1.0
+    assert not any( "median time" in r for r in bench.compare( baseline ) )
+
+def test_baseline_without_spread ( ):
+    bench = runSmall()
+    baseline = copy.deepcopy( bench.toDict() )
+    for entry in baseline["summary"].values():
+        del entry["timeSpread"]
+    assert bench.compare( baseline ) == []
+
+def test_search_metric_increase_is_reported ( ):
+    bench = runSmall()
+    baseline = copy.deepcopy( bench.toDict() )
+    for entry in baseline["summary"].values():
+        entry["nodes"]["mean"] -= 1
+    assert any( "mean nodes" in r for r in bench.compare( baseline ) )
+
+# A board cut off by the limit is told apart from one the search failed
+def test_timeout_is_recorded ( ):
+    bench = Benchmark.Benchmark( [ "9x9" ], seeds=1, limit=0, repeats=1 )
+    bench.run()
+    assert all( r["status"] == SolveResult.SolveResult.TIMEOUT and r["timedOut"] and not r["solved"] for r in bench.runs )
+    assert all( e["timeouts"] == 1 for e in bench.summary().values() )
+    assert all( r["status"] == SolveResult.SolveResult.SOLVED for r in runSmall().runs )
+
+# The network is held through the whole solve, so it fits in the peak,
+# and every node allocates at least the trail snapshot it pushes
+def test_memory_metrics ( ):
+    bench = Benchmark.Benchmark( [ "9x9" ], seeds=1, repeats=1, memory=True )
+    bench.run()
+    assert all( 0 < r["networkKB"] <= r["peakKB"] for r in bench.runs )
+    assert all( r["nodeBytes"] > 0 for r in bench.runs if r["nodes"] > 0 )
+    assert "node bytes" in bench.memoryReport()
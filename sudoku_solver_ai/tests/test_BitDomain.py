@@ -0,0 +1,52 @@
+import BitDomain
+import Domain
+import BoardGenerator
+import SudokuBoard
+import BTSolver
+import Trail
+
+# Every operation the solver uses, on both domains side by side
+def test_matches_domain ( ):
+    for dt in ( Domain.Domain, BitDomain.BitDomain ):
+        d = dt( [ 1, 3, 5, 9, 36 ] )
+        state = d.snapshot()
+        assert d.remove( 5 ) and not d.remove( 5 )
+        assert d.values == [ 1, 3, 9, 36 ] and d.size() == 4 and d.first() == 1
+        assert d.others( 9 ) == [ 1, 3, 36 ]
+        counts = d.countShared( [ dt( [ 3, 4, 36 ] ), dt( [ 3 ] ) ] )
+        assert counts == { 3 : 2, 36 : 1 } and list( counts ) == [ 3, 36 ]
+
+        # the trail takes the view just before it restores
+        before = d.view()
+        d.restore( state )
+        assert d.values == [ 1, 3, 5, 9, 36 ] and d.size() == 5
+        lost, gained = d.changesSince( before )
+        assert list( lost ) == [] and list( gained ) == [ 5 ]
+
+        before = d.view()
+        d.restore( dt( [ 2, 3 ] ).snapshot() )
+        lost, gained = d.changesSince( before )
+        assert list( lost ) == [ 1, 5, 9, 36 ] and list( gained ) == [ 2 ]
+
+        d.assign( 9 )
+        assert d.values == [ 9 ] and d.first() == 9
+
+def test_values_past_the_first_bytes ( ):
+    values = [ 0, 7, 8, 63, 64, 100 ]
+    assert BitDomain.valuesOf( sum( 1 << v for v in values ) ) == values
+    assert BitDomain.BitDomain( values ).size() == len( values )
+
+# The search must not depend on how the domains are stored
+def test_same_search_as_domain ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 4, 7 )
+    for _ in range( 3 ):
+        board = generator.puzzle( 60 )
+        for val_sh, cc in [ ( "", "forwardChecking" ), ( "LeastConstrainingValue", "norvigCheck" ) ]:
+            runs = []
+            for bitDomains in [ False, True ]:
+                grid   = SudokuBoard.SudokuBoard( 3, 4, board=[ row[:] for row in board.board ] )
+                solver = BTSolver.BTSolver( grid, Trail.Trail(), val_sh, "MinimumRemainingValue", cc, bitDomains=bitDomains )
+                solver.checkConsistency()
+                solver.solve()
+                runs.append( ( solver.stats.nodes, solver.getSolution().board ) )
+            assert runs[0] == runs[1]
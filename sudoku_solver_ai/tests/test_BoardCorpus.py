@@ -0,0 +1,94 @@
+import sys
+import pytest
+import BoardCorpus
+import BoardGenerator
+import PuzzleStream
+
+def grids ( boards ):
+    return [ ( b.p, b.q, b.board ) for b in boards ]
+
+def writeCorpus ( path, boards, cellBits = None ):
+    with open( path, "wb" ) as f:
+        writer = BoardCorpus.CorpusWriter( f, cellBits=cellBits )
+        for board in boards:
+            writer.write( board )
+
+# 9x9 records have an odd number of cells, so a nibble of padding
+def test_round_trip_both_cell_sizes ( tmp_path ):
+    for p, q, cellBits, givens in [ ( 3, 3, None, 30 ), ( 3, 3, 8, 30 ), ( 4, 4, None, 100 ), ( 5, 5, None, 300 ) ]:
+        boards = list( BoardGenerator.BoardGenerator( p, q, 1 ).puzzles( givens, 5 ) )
+        path = str( tmp_path / "boards.sdc" )
+        writeCorpus( path, boards, cellBits )
+
+        with BoardCorpus.CorpusReader( path ) as corpus:
+            assert corpus.cellBits == ( cellBits or ( 4 if p*q < 16 else 8 ) )
+            assert len( corpus ) == 5 and grids( corpus ) == grids( boards )
+
+def test_index_slice_and_shards ( tmp_path ):
+    boards = list( BoardGenerator.BoardGenerator( 2, 3, 1 ).puzzles( 10, 7 ) )
+    path = str( tmp_path / "boards.sdc" )
+    writeCorpus( path, boards )
+
+    with BoardCorpus.CorpusReader( path ) as corpus:
+        assert grids( [ corpus[-1] ] ) == grids( boards[-1:] )
+        assert grids( corpus[2:6:2] ) == grids( boards[2:6:2] )
+        with pytest.raises( IndexError ):
+            corpus[7]
+
+        shards = [ list( corpus.shard( i, 3 ) ) for i in range( 3 ) ]
+        assert [ len( s ) for s in shards ] == [ 2, 2, 3 ]
+        assert grids( [ b for s in shards for b in s ] ) == grids( boards )
+
+def test_unsolved_is_empty_board ( tmp_path ):
+    board = BoardGenerator.BoardGenerator( 3, 3, 1 ).puzzle( 30 )
+    path = str( tmp_path / "boards.sdc" )
+    with open( path, "wb" ) as f:
+        writer = BoardCorpus.CorpusWriter( f )
+        writer.writeUnsolved( board )
+        writer.write( board )
+
+    with BoardCorpus.CorpusReader( path ) as corpus:
+        assert corpus[0].board == [ [ 0 ] * 9 for _ in range( 9 ) ]
+        assert corpus[1].board == board.board
+
+def test_rejects_bad_input ( tmp_path ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 1 )
+    with open( str( tmp_path / "mixed.sdc" ), "wb" ) as f:
+        writer = BoardCorpus.CorpusWriter( f )
+        writer.write( generator.puzzle( 30 ) )
+        with pytest.raises( ValueError ):
+            writer.write( BoardGenerator.BoardGenerator( 2, 3, 1 ).puzzle( 10 ) )
+    with open( str( tmp_path / "big.sdc" ), "wb" ) as f:
+        with pytest.raises( ValueError ):
+            BoardCorpus.CorpusWriter( f, 4, 4, cellBits=4 )
+
+    path = str( tmp_path / "cut.sdc" )
+    writeCorpus( path, [ generator.puzzle( 30 ) ] )
+    with open( path, "ab" ) as f:
+        f.write( b"\x12" )
+    with pytest.raises( ValueError ):
+        BoardCorpus.CorpusReader( path )
+
+    path = str( tmp_path / "empty.sdc" )
+    open( path, "wb" ).close()
+    with BoardCorpus.CorpusReader( path ) as corpus:
+        assert len( corpus ) == 0 and list( corpus ) == []
+
+# Text to corpus and back again through the command line
+def test_main_converts_both_ways ( tmp_path, monkeypatch ):
+    boards = list( BoardGenerator.BoardGenerator( 3, 3, 1 ).puzzles( 30, 4 ) )
+    text = str( tmp_path / "boards.txt" )
+    with open( text, "w" ) as f:
+        writer = PuzzleStream.PuzzleWriter( f )
+        for board in boards:
+            writer.write( board )
+
+    corpus = str( tmp_path / "boards.sdc" )
+    back   = str( tmp_path / "back.txt" )
+    for source, target in [ ( text, corpus ), ( corpus, back ) ]:
+        monkeypatch.setattr( sys, "argv", [ "BoardCorpus.py", source, target ] )
+        assert BoardCorpus.main() == 0
+
+    assert BoardCorpus.isCorpus( corpus ) and not BoardCorpus.isCorpus( back )
+    with open( back ) as f:
+        assert grids( PuzzleStream.PuzzleReader( f ) ) == grids( boards )
@@ -0,0 +1,71 @@
+import os
+import sys
+import subprocess
+import BoardGenerator
+import BoardCorpus
+
+# True if grid, a flat list, is a complete valid p x q grid
+def isSolved ( grid, p, q ):
+    N = p*q
+    full = set( range( 1, N + 1 ) )
+    rows = [ grid[i*N:(i+1)*N] for i in range(N) ]
+    cols = [ [ rows[i][j] for i in range(N) ] for j in range(N) ]
+    blocks = [ [ rows[i][j] for i in range(N) for j in range(N) if (i // p) * p + j // q == b ] for b in range(N) ]
+    return all( set( unit ) == full for unit in rows + cols + blocks )
+
+def test_grids_are_valid ( ):
+    for p, q in [ ( 2, 3 ), ( 3, 3 ), ( 3, 4 ), ( 6, 6 ) ]:
+        generator = BoardGenerator.BoardGenerator( p, q, 7 )
+        assert isSolved( generator.shuffledGrid(), p, q )
+
+# Grids shuffled from a filled one are valid and differ from it
+def test_reused_fills_are_valid ( ):
+    for p, q in [ ( 2, 3 ), ( 3, 3 ), ( 3, 4 ) ]:
+        generator = BoardGenerator.BoardGenerator( p, q, 7 )
+        grids = [ generator.fullGrid() for _ in range( 2 * BoardGenerator.BoardGenerator.FILL_REUSE ) ]
+        assert generator.numFills == 2
+        assert all( isSolved( grid, p, q ) for grid in grids )
+        assert len( set( map( tuple, grids ) ) ) > len( grids ) // 2
+
+def test_seed_reproduces_puzzles ( ):
+    first  = [ b.board for b in BoardGenerator.BoardGenerator( 3, 3, 42 ).puzzles( 30, 3 ) ]
+    second = [ b.board for b in BoardGenerator.BoardGenerator( 3, 3, 42 ).puzzles( 30, 3 ) ]
+    assert first == second
+
+def test_unique_puzzles_have_one_solution ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 3, unique=True )
+    for board in generator.puzzles( 30, 3 ):
+        grid = [ v for row in board.board for v in row ]
+        assert generator.countSolutions( grid, 2 ) == 1
+
+# Givens the others force are taken out as the search would take them out
+def test_forced_givens_skip_the_search ( monkeypatch ):
+    for p, q, givens in [ ( 2, 3, 10 ), ( 3, 3, 26 ) ]:
+        fast = [ b.board for b in BoardGenerator.BoardGenerator( p, q, 5, unique=True ).puzzles( givens, 4 ) ]
+        with monkeypatch.context() as m:
+            m.setattr( BoardGenerator.BoardGenerator, "isForced", lambda self, *args : False )
+            slow = [ b.board for b in BoardGenerator.BoardGenerator( p, q, 5, unique=True ).puzzles( givens, 4 ) ]
+        assert fast == slow
+
+# The command line output of large boards must read back
+def test_main_output_reads_back ( tmp_path, monkeypatch ):
+    for name in [ "puzzles.txt", "puzzles.sdc" ]:
+        path = str( tmp_path / name )
+        monkeypatch.setattr( sys, "argv", [ "BoardGenerator.py", "P=6", "Q=6", "COUNT=2", "SEED=1", "OUT=" + path ] )
+        assert BoardGenerator.main() == 0
+
+        reader = BoardCorpus.openBoards( path )
+        boards = list( reader )
+        if isinstance( reader, BoardCorpus.CorpusReader ):
+            reader.close()
+        assert len( boards ) == 2
+        assert all( ( b.p, b.q ) == ( 6, 6 ) for b in boards )
+        assert sum( 1 for row in boards[0].board for v in row if v != 0 ) == 36 * 36 // 3
+
+# SudokuBoard makes random boards without loading the solvers or the I/O
+def test_board_imports_no_solvers ( ):
+    src = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), os.pardir, "src" )
+    out = subprocess.run( [ sys.executable, "-c", "import sys, SudokuBoard; print( ' '.join( sys.modules ) )" ],
+                          cwd=src, capture_output=True, text=True, check=True ).stdout.split()
+    assert "GridGenerator" in out
+    assert not set( out ) & { "BoardGenerator", "BTSolver", "PuzzleStream", "BoardCorpus", "BatchSolver" }
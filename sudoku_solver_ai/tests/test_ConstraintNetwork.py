@@ -0,0 +1,204 @@
+import random
+import pytest
+import BoardGenerator
+import Constraint
+import ConstraintNetwork
+import Trail
+import Variable
+from conftest import nonzero
+
+SHAPES = [ ( 2, 2 ), ( 2, 3 ), ( 3, 3 ), ( 3, 4 ) ]
+
+def makeBoard ( p, q, seed = 3 ):
+    return BoardGenerator.BoardGenerator( p, q, seed ).puzzle( p*q*p*q // 3 )
+
+# The network of board laid out by hand, one variable per cell and a
+# constraint per row, col and block, indexed by walking the constraints
+def handBuilt ( board ):
+    p, q, n = board.p, board.q, board.N
+    network = ConstraintNetwork.ConstraintNetwork()
+    units = [ [] for _ in range( 3*n ) ]
+    for i, row in enumerate( board.board ):
+        for j, value in enumerate( row ):
+            v = Variable.Variable( list( range( 1, n + 1 ) ) if value == 0 else [ value ], i, j, (i // p) * p + j // q )
+            network.addVariable( v )
+            units[i].append( v )
+            units[n + j].append( v )
+            units[2*n + v.block].append( v )
+    for unit in units:
+        c = Constraint.Constraint()
+        for v in unit:
+            c.addVariable( v )
+        network.addConstraint( c )
+    network.buildIndex()
+    return network
+
+# The constraints holding v and the variables sharing one with it, found by
+# scanning every constraint of the network
+def scan ( network, v ):
+    constraints = [ c for c in network.getConstraints() if any( x is v for x in c.vars ) ]
+    return constraints, { x for c in constraints for x in c.vars if x is not v }
+
+# The indexed tables hold what a scan of the constraints finds, once each
+def test_index_matches_a_scan ( ):
+    for p, q in SHAPES:
+        board = makeBoard( p, q )
+        for network in [ ConstraintNetwork.ConstraintNetwork( board ), handBuilt( board ) ]:
+            for v in network.getVariables():
+                constraints, neighbors = scan( network, v )
+                assert list( network.getConstraintsContainingVariable( v ) ) == constraints
+                assert len( network.getNeighborsOfVariable( v ) ) == len( neighbors )
+                assert set( network.getNeighborsOfVariable( v ) ) == neighbors
+
+def test_geometry_index_is_shared ( ):
+    units, peers, unitsOf = ConstraintNetwork.getGeometryIndex( 2, 3 )
+    assert ConstraintNetwork.getGeometryIndex( 2, 3 ) is ConstraintNetwork.GEOMETRY_INDEX[ ( 2, 3 ) ]
+    assert len( units ) == 3 * 6 and len( peers ) == len( unitsOf ) == 6 * 6
+    # a cell shares a unit with the rest of its row, col and block
+    assert all( len( peers[i] ) == 3 * 5 - ( 2 - 1 ) - ( 3 - 1 ) for i in range( 6 * 6 ) )
+
+# A variable of another network has no neighbors or constraints here
+def test_foreign_variable ( ):
+    board = makeBoard( 2, 3 )
+    network = ConstraintNetwork.ConstraintNetwork( board )
+    other = ConstraintNetwork.ConstraintNetwork( board ).getVariables()[0]
+    assert network.getConstraintsContainingVariable( other ) == ()
+    with pytest.raises( KeyError ):
+        network.getNeighborsOfVariable( other )
+
+# The assigned values of every constraint, counted from scratch
+def recountValues ( network ):
+    counts = []
+    for c in network.getConstraints():
+        values = [ v.getAssignment() for v in c.vars if v.isAssigned() ]
+        counts.append( { val : values.count( val ) for val in values } )
+    return counts
+
+# Value counts follow assignments, clashing ones included, and unassignments
+def test_value_counts_match_a_recount ( ):
+    rng = random.Random( 5 )
+    for p, q in SHAPES:
+        board = makeBoard( p, q )
+        for network in [ ConstraintNetwork.ConstraintNetwork( board ), handBuilt( board ) ]:
+            free = [ v for v in network.getVariables() if v.isChangeable() ]
+            for _ in range( 200 ):
+                v = rng.choice( free )
+                if v.isAssigned() and rng.random() < 0.4:
+                    v.unassign()
+                else:
+                    v.assignValue( rng.randint( 1, board.N ) )
+
+                counts = recountValues( network )
+                assert [ nonzero( c.valueCounts ) for c in network.getConstraints() ] == counts
+                assert network.conflicts == sum( n - 1 for unit in counts for n in unit.values() )
+                assert network.isConsistent() == all( c.isConsistent() for c in network.getConstraints() )
+                assert network.assignedCount == sum( 1 for v in network.getVariables() if v.isAssigned() )
+
+# The candidates of every constraint, counted from the domains
+def recountCandidates ( network ):
+    counts = []
+    for c in network.getConstraints():
+        values = [ val for v in c.vars for val in v.getDomain().values ]
+        counts.append( { val : values.count( val ) for val in values } )
+    return counts
+
+# Candidate counts follow removals, assignments and the trail undoing them,
+# and every count dropping to 0 or 1 is queued for norvigCheck
+def test_candidate_counts_match_a_recount ( ):
+    rng = random.Random( 7 )
+    for p, q in SHAPES[:3]:
+        board = makeBoard( p, q )
+        for network in [ ConstraintNetwork.ConstraintNetwork( board ), handBuilt( board ) ]:
+            network.trackCandidates()
+            network.popPendingSingles()
+            trail = Trail.Trail()
+            levels = 0
+            for _ in range( 300 ):
+                before = recountCandidates( network )
+                free = [ v for v in network.getVariables() if not v.isAssigned() ]
+                step = rng.random()
+                if levels and ( step < 0.2 or not free ):
+                    trail.undo()
+                    levels -= 1
+                elif step < 0.4 or not levels:
+                    trail.placeTrailMarker()
+                    levels += 1
+                else:
+                    v = rng.choice( free )
+                    trail.push( v )
+                    val = rng.choice( v.getDomain().values )
+                    if v.size() > 1 and step < 0.8:
+                        v.removeValueFromDomain( val )
+                    else:
+                        v.assignValue( val )
+
+                after = recountCandidates( network )
+                pending = set( network.popPendingSingles() )
+                assert [ nonzero( c.candidateCounts ) for c in network.getConstraints() ] == after
+                for c, was, now in zip( network.getConstraints(), before, after ):
+                    for val, n in was.items():
+                        if now.get( val, 0 ) < n and now.get( val, 0 ) <= 1:
+                            assert ( c, val ) in pending
+
+def names ( variables ):
+    return [ v.name for v in variables ]
+
+# The template lays out the network the hand-built one has: the same
+# domains, constraints in the same order, and the same neighbors
+def test_template_matches_hand_built ( ):
+    for p, q in SHAPES + [ ( 4, 4 ) ]:
+        board = makeBoard( p, q )
+        template, hand = ConstraintNetwork.ConstraintNetwork( board ), handBuilt( board )
+        assert [ ( v.name, list( v.getDomain().values ), v.isAssigned() ) for v in template.getVariables() ] == \
+               [ ( v.name, list( v.getDomain().values ), v.isAssigned() ) for v in hand.getVariables() ]
+        assert [ names( c.vars ) for c in template.getConstraints() ] == [ names( c.vars ) for c in hand.getConstraints() ]
+        assert ( template.conflicts, template.assignedCount ) == ( hand.conflicts, hand.assignedCount )
+        for v, w in zip( template.getVariables(), hand.getVariables() ):
+            assert sorted( names( template.getNeighborsOfVariable( v ) ) ) == sorted( names( hand.getNeighborsOfVariable( w ) ) )
+
+# A constraint added to a template network is indexed like the rest
+def test_added_constraint_is_indexed ( ):
+    network = ConstraintNetwork.ConstraintNetwork( makeBoard( 3, 3 ) )
+    variables = network.getVariables()
+    diagonal = Constraint.Constraint()
+    for i in range( 9 ):
+        diagonal.addVariable( variables[i*9 + i] )
+    network.addConstraint( diagonal )
+
+    corner = variables[0]
+    assert diagonal in network.getConstraintsContainingVariable( corner )
+    assert variables[80] in network.getNeighborsOfVariable( corner )
+    for v in variables:
+        constraints, neighbors = scan( network, v )
+        assert list( network.getConstraintsContainingVariable( v ) ) == constraints
+        assert set( network.getNeighborsOfVariable( v ) ) == neighbors
+
+# Variables and constraints keep the network they were added to
+def test_owner_is_kept ( ):
+    board = makeBoard( 2, 3 )
+    network, other = ConstraintNetwork.ConstraintNetwork( board ), ConstraintNetwork.ConstraintNetwork( board )
+    with pytest.raises( ValueError ):
+        network.addVariable( other.getVariables()[0] )
+    with pytest.raises( ValueError ):
+        network.addConstraint( other.getConstraints()[0] )
+    assert other.getVariables()[0].network is other
+
+# A variable added to a constraint after the tables were built shows up
+# in them, whichever order the network was put together in
+def test_late_variable_is_indexed ( ):
+    network = ConstraintNetwork.ConstraintNetwork()
+    a, b, c = [ Variable.Variable( [ 1, 2 ], 0, j, 0 ) for j in range( 3 ) ]
+    for v in ( a, b, c ):
+        network.addVariable( v )
+    pair = Constraint.Constraint()
+    network.addConstraint( pair )
+    pair.addVariable( a )
+    pair.addVariable( b )
+    assert network.getNeighborsOfVariable( a ) == ( b, )
+
+    pair.addVariable( c )
+    c.assignValue( 1 )
+    a.assignValue( 1 )
+    assert set( network.getNeighborsOfVariable( a ) ) == { b, c }
+    assert network.getConstraintsContainingVariable( c ) == ( pair, )
+    assert not network.isConsistent()
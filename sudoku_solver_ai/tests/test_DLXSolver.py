@@ -0,0 +1,51 @@
+import BoardGenerator
+import BTSolver
+import DLXSolver
+import SolveResult
+import Trail
+from conftest import copyOf, flat, isSolutionOf, unsolvable
+
+def btSolves ( board ):
+    solver = BTSolver.BTSolver( copyOf( board ), Trail.Trail(), "", "MinimumRemainingValue", "forwardChecking" )
+    return solver.checkConsistency() and solver.solve() == 0 and solver.hassolution
+
+def test_solves_every_shape ( ):
+    for p, q, givens in [ ( 2, 3, 8 ), ( 3, 3, 24 ), ( 3, 4, 50 ), ( 4, 4, 110 ) ]:
+        generator = BoardGenerator.BoardGenerator( p, q, 2 )
+        for board in generator.puzzles( givens, 2 ):
+            solver = DLXSolver.DLXSolver( copyOf( board ) )
+            solver.solve()
+            assert solver.hassolution and isSolutionOf( generator, solver.getSolution(), board )
+
+# DLX and the backtracking search agree on boards without a solution,
+# whether the givens clash outright or only deep in the search
+def test_agrees_on_unsolvable_boards ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 5, unique=True )
+    for board in generator.puzzles( 28, 3 ):
+        bad = unsolvable( generator, board )
+        clash = copyOf( board )
+        r, c = next( divmod( k, 9 ) for k, v in enumerate( flat( board ) ) if v == 0 )
+        clash.board[r][c] = next( v for v in clash.board[r] if v )
+
+        for b in [ bad, clash ]:
+            solver = DLXSolver.DLXSolver( b )
+            assert solver.solveWithin().status == SolveResult.SolveResult.UNSAT
+            assert not solver.hassolution and not btSolves( b )
+
+# The matrix of a shape is shared, so whatever way a search ends it must
+# leave the matrix as it found it
+def test_shared_matrix_is_restored ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 9, unique=True )
+    boards = list( generator.puzzles( 26, 2 ) )
+    m = DLXSolver.getMatrix( 3, 3 )
+    def links ( ):
+        return ( list( m.L ), list( m.R ), list( m.U ), list( m.D ), list( m.S ) )
+    before = links()
+    expected = [ flat( DLXSolver.DLXSolver( copyOf( b ) ).solveWithin().board ) for b in boards ]
+
+    cut = DLXSolver.DLXSolver( copyOf( boards[0] ) ).solveWithin( maxNodes=5 )
+    assert cut.status == SolveResult.SolveResult.BUDGET
+    DLXSolver.DLXSolver( unsolvable( generator, boards[1] ) ).solve()
+    assert links() == before
+
+    assert [ flat( DLXSolver.DLXSolver( copyOf( b ) ).solveWithin().board ) for b in boards ] == expected
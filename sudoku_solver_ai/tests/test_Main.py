@@ -0,0 +1,83 @@
+import json
+import os
+import pstats
+import sys
+import BoardCorpus
+import BoardGenerator
+import Main
+import SolutionCache
+import SolverStats
+import SudokuBoard
+from conftest import boards, makeSolver, writeBoard, writeBoards
+
+# A COUNT= run that used up the search prints, and caches, the
+# solution it counted rather than the board it unwound to
+def test_count_keeps_first_solution ( tmp_path, monkeypatch, capsys ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 5, unique=True )
+    board = generator.puzzle( 25 )
+    path = str( tmp_path / "board.txt" )
+    writeBoard( path, board )
+
+    cachePath = str( tmp_path / "cache" )
+    monkeypatch.setattr( sys, "argv", [ "Main.py", "MRV", "FC", "COUNT=5", "CACHE=" + cachePath, path ] )
+    Main.main()
+    out = capsys.readouterr().out
+    assert "Solutions: 1\n" in out
+
+    cache = SolutionCache.SolutionCache( path=cachePath )
+    solution = cache.get( SudokuBoard.SudokuBoard( filepath=path ) )
+    cache.close()
+    grid = [ v for row in solution.board for v in row ]
+    assert 0 not in grid and generator.countSolutions( grid, 2 ) == 1
+    assert str( solution ) in out
+
+# A STREAM run over a corpus releases the file and its mapping
+def test_stream_closes_corpus ( tmp_path, monkeypatch, capsys ):
+    boards = list( BoardGenerator.BoardGenerator( 3, 3, 5 ).puzzles( 30, 3 ) )
+    path = str( tmp_path / "boards.sdc" )
+    with open( path, "wb" ) as f:
+        writer = BoardCorpus.CorpusWriter( f )
+        for board in boards:
+            writer.write( board )
+
+    closed = []
+    close = BoardCorpus.CorpusReader.close
+    def recordClose ( reader ):
+        closed.append( reader.data is not None )
+        close( reader )
+    monkeypatch.setattr( BoardCorpus.CorpusReader, "close", recordClose )
+
+    monkeypatch.setattr( sys, "argv", [ "Main.py", "MRV", "FC", "STREAM", "OUT=" + str( tmp_path / "out.txt" ), path ] )
+    Main.main()
+    assert "Solutions Found: 3\n" in capsys.readouterr().out
+    assert closed == [ True ]
+
+# STATS= writes a record per board and their merged total, and PROFILE=
+# a profile pstats can load
+def test_stats_and_profile ( tmp_path, monkeypatch, capsys ):
+    puzzles = [ b for _, b in boards()[-3:] ]
+    directory = tmp_path / "boards"
+    directory.mkdir()
+    writeBoards( directory, puzzles )
+
+    statsPath, profilePath = str( tmp_path / "stats.json" ), str( tmp_path / "run.prof" )
+    monkeypatch.setattr( sys, "argv", [ "Main.py", "MRV", "FC", "STATS=" + statsPath, "PROFILE=" + profilePath, str( directory ) ] )
+    Main.main()
+    out = capsys.readouterr().out
+
+    with open( statsPath ) as f:
+        run = json.load( f )
+    assert sorted( r["board"] for r in run["boards"] ) == sorted( os.listdir( str( directory ) ) )
+    total = SolverStats.SolverStats()
+    for record in run["boards"]:
+        board = puzzles[int( record["board"][len( "board" ):-len( ".txt" )] )]
+        solver = makeSolver( board )
+        solver.solve()
+        assert record["solved"] and record["stats"]["nodes"] == solver.stats.nodes
+        assert record["backtracks"] == record["stats"]["backtracks"] == solver.stats.backtracks
+        total.merge( SolverStats.SolverStats.fromDict( record["stats"] ) )
+    assert run["total"] == total.toDict()
+    assert "Backtracks: " + str( total.backtracks ) + "\n" in out
+
+    profile = pstats.Stats( profilePath )
+    assert any( name == "searchLoop" for _, _, name in profile.stats )
@@ -0,0 +1,45 @@
+import NogoodStore
+import Variable
+
+def variables ( count ):
+    return [ Variable.Variable( [ 1, 2, 3, 4 ], 0, j, 0 ) for j in range( count ) ]
+
+def test_find_needs_the_other_assignments ( ):
+    a, b, c = variables( 3 )
+    store = NogoodStore.NogoodStore( 10 )
+    assert store.add( [ ( a, 1 ), ( b, 2 ) ] )
+
+    # found whichever of its assignments comes last
+    assert store.find( b, 2 ) is None
+    a.assignValue( 1 )
+    assert store.find( b, 2 ) == frozenset( [ ( a, 1 ), ( b, 2 ) ] )
+    assert store.find( b, 3 ) is None and store.find( c, 2 ) is None
+
+    b.assignValue( 2 )
+    a.unassign()
+    assert store.find( a, 1 ) is not None and store.find( a, 2 ) is None
+    assert store.numHits == 2
+
+def test_evicts_least_recently_used ( ):
+    a, b, c, d = variables( 4 )
+    d.assignValue( 4 )
+    store = NogoodStore.NogoodStore( 2 )
+    store.add( [ ( a, 1 ), ( d, 4 ) ] )
+    store.add( [ ( b, 1 ), ( d, 4 ) ] )
+
+    # a hit makes the first one the most recently used
+    assert store.find( a, 1 ) is not None
+    store.add( [ ( c, 1 ), ( d, 4 ) ] )
+    assert len( store ) == 2 and store.numEvicted == 1
+    assert store.find( b, 1 ) is None
+    assert store.find( a, 1 ) is not None and store.find( c, 1 ) is not None
+    assert ( b, 1 ) not in store.index
+
+def test_skips_duplicates_and_long_nogoods ( ):
+    vs = variables( NogoodStore.NogoodStore.MAX_SIZE + 1 )
+    store = NogoodStore.NogoodStore( 10 )
+    assert not store.add( [] )
+    assert not store.add( [ ( v, 1 ) for v in vs ] )
+    assert store.add( [ ( vs[0], 1 ), ( vs[1], 2 ) ] )
+    assert not store.add( [ ( vs[1], 2 ), ( vs[0], 1 ) ] )
+    assert len( store ) == 1 and store.numAdded == 1
@@ -0,0 +1,39 @@
+import BoardGenerator
+import ParallelSolver
+import SolveResult
+from conftest import flat, isSolutionOf, unsolvable
+
+def solve ( board, cc = "forwardChecking", jobs = 2, **limits ):
+    solver = ParallelSolver.ParallelSolver( board, "", "MinimumRemainingValue", cc, jobs=jobs, sliceNodes=16 )
+    return solver, solver.solveWithin( **limits )
+
+# Propagation alone finishes an easy board, so no worker is started
+def test_solved_by_split ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 11, unique=True )
+    board = generator.puzzle( 40 )
+    solver, result = solve( board, cc="norvigCheck" )
+    assert result.status == SolveResult.SolveResult.SOLVED and solver.numSubtrees == 0
+    assert isSolutionOf( generator, result.board, board )
+
+# Unique boards given one value off their solution; some are refuted by
+# the split, the others only once the workers ran out of subtrees
+def test_unsatisfiable_board ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 11, unique=True )
+    pooled = 0
+    for board in generator.puzzles( 24, 3 ):
+        board = unsolvable( generator, board )
+        for jobs in [ 1, 2 ]:
+            solver, result = solve( board, jobs=jobs )
+            assert result.status == SolveResult.SolveResult.UNSAT and not solver.hassolution
+            pooled += solver.numSubtrees > 0
+    assert pooled > 0
+
+# The node budget counts the split and every worker, and a cut search
+# still reports how far it got
+def test_budget ( ):
+    board = BoardGenerator.BoardGenerator( 4, 4, 11 ).puzzle( 20 )
+    solver, result = solve( board, maxNodes=10 )
+    assert result.status == SolveResult.SolveResult.BUDGET and not solver.hassolution
+    assert solver.numSubtrees > 0
+    assert result.board is not None and result.assigned > 0
+    assert all( g in ( 0, v ) for g, v in zip( flat( board ), flat( result.board ) ) )
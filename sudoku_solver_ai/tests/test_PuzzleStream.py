@@ -0,0 +1,51 @@
+import io
+import BoardGenerator
+import PuzzleStream
+
+# Writes boards through PuzzleWriter and reads them back with PuzzleReader
+def roundTrip ( boards, oneLine = True ):
+    f = io.StringIO()
+    writer = PuzzleStream.PuzzleWriter( f, oneLine )
+    for board in boards:
+        writer.write( board )
+    f.seek( 0 )
+    return list( PuzzleStream.PuzzleReader( f ) )
+
+def check ( p, q, oneLine = True ):
+    generator = BoardGenerator.BoardGenerator( p, q, 1 )
+    boards = [ generator.toBoard( generator.shuffledGrid() ), generator.puzzle( p*q*2 ) ]
+    read = roundTrip( boards, oneLine )
+    assert [ ( b.p, b.q, b.board ) for b in read ] == [ ( b.p, b.q, b.board ) for b in boards ]
+
+def test_one_line_9x9 ( ):
+    check( 3, 3 )
+
+def test_block_format_12x12 ( ):
+    check( 3, 4, oneLine=False )
+
+def test_one_line_largest ( ):
+    check( 5, 7 )
+
+# 36 and up need two characters a cell, so they go out in block form
+def test_one_line_36x36_falls_back_to_blocks ( ):
+    check( 6, 6 )
+
+def test_unsolved_keeps_alignment ( ):
+    generator = BoardGenerator.BoardGenerator( 6, 6, 1 )
+    board = generator.puzzle( 100 )
+    f = io.StringIO()
+    writer = PuzzleStream.PuzzleWriter( f )
+    writer.writeUnsolved( board )
+    writer.write( board )
+    f.seek( 0 )
+    read = list( PuzzleStream.PuzzleReader( f ) )
+    assert len( read ) == 2
+    assert read[0].board == [ [ 0 ] * 36 for _ in range(36) ]
+    assert read[1].board == board.board
+
+def test_mixed_formats ( ):
+    f = io.StringIO( "# comment\n" + "1" + "0" * 80 + "\n\n2 2\n1 2 3 4\n0 0 0 0\n0 0 0 0\n0 0 0 0\n" )
+    read = list( PuzzleStream.PuzzleReader( f ) )
+    assert [ ( b.p, b.q ) for b in read ] == [ ( 3, 3 ), ( 2, 2 ) ]
+    assert read[0].board[0][0] == 1
+    assert read[1].board[0] == [ 1, 2, 3, 4 ]
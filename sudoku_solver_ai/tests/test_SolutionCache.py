@@ -0,0 +1,68 @@
+import random
+import BoardGenerator
+import DLXSolver
+import SolutionCache
+import SudokuBoard
+from conftest import flat
+
+def solutionOf ( board ):
+    solver = DLXSolver.DLXSolver( board )
+    solver.solve()
+    return solver.getSolution()
+
+# The board under a random symmetry: digits relabelled, rows and bands,
+# columns and stacks permuted, and transposed when the blocks are square
+def shuffled ( board, rng ):
+    p, q, N = board.p, board.q, board.N
+    digits = list( range( 1, N + 1 ) )
+    rng.shuffle( digits )
+    bands  = rng.sample( range( q ), q )
+    stacks = rng.sample( range( p ), p )
+    rows = [ b * p + r for b in bands for r in rng.sample( range( p ), p ) ]
+    cols = [ s * q + c for s in stacks for c in rng.sample( range( q ), q ) ]
+    g = [ [ digits[board.board[r][c] - 1] if board.board[r][c] else 0 for c in cols ] for r in rows ]
+    if p == q and rng.random() < 0.5:
+        g = [ list( col ) for col in zip( *g ) ]
+    return SudokuBoard.SudokuBoard( p, q, board=g )
+
+# A hit for a board equivalent to a cached one is a solution of that board
+def test_hits_equivalent_boards ( ):
+    rng = random.Random( 4 )
+    for p, q, givens in [ ( 3, 3, 30 ), ( 2, 3, 14 ), ( 3, 4, 70 ) ]:
+        cache = SolutionCache.SolutionCache()
+        for board in BoardGenerator.BoardGenerator( p, q, 8, unique=True ).puzzles( givens, 3 ):
+            cache.put( board, solutionOf( board ) )
+            other = shuffled( board, rng )
+            assert cache.get( other ).board == solutionOf( other ).board
+        assert cache.hits == 3 and cache.misses == 0
+
+def test_transform_round_trip ( ):
+    board = BoardGenerator.BoardGenerator( 3, 3, 2 ).puzzle( 30 )
+    _, transform = SolutionCache.canonicalForm( board )
+    g = SolutionCache.applyTransform( transform, board.board )
+    assert SolutionCache.invertTransform( transform, g ) == board.board
+
+def test_keeps_most_recently_used ( ):
+    generator = BoardGenerator.BoardGenerator( 3, 3, 6, unique=True )
+    a, b, c = generator.puzzles( 30, 3 )
+    cache = SolutionCache.SolutionCache( capacity=2 )
+    cache.put( a, solutionOf( a ) )
+    cache.put( b, solutionOf( b ) )
+    assert cache.get( a ) is not None
+    cache.put( c, solutionOf( c ) )
+    assert cache.get( b ) is None
+    assert cache.get( a ) is not None and cache.get( c ) is not None
+
+# The dbm file outlives the cache, also for values past one character
+def test_store_persists ( tmp_path ):
+    path = str( tmp_path / "cache" )
+    board = BoardGenerator.BoardGenerator( 6, 6, 3 ).puzzle( 1000 )
+    solution = solutionOf( board )
+
+    cache = SolutionCache.SolutionCache( path=path )
+    cache.put( board, solution )
+    cache.close()
+
+    cache = SolutionCache.SolutionCache( path=path )
+    assert cache.get( board ).board == solution.board
+    cache.close()
@@ -0,0 +1,48 @@
+import SolverStats
+from conftest import boards, makeSolver
+
+# The hooks see every node, backtrack and solution the counters do,
+# and the backtracks are the assignments the trail undid
+def test_hooks_follow_the_counters ( ):
+    undone = 0
+    for _, board in boards():
+        for cc in [ "forwardChecking", "norvigCheck" ]:
+            for count in [ False, True ]:
+                events = []
+                solver = makeSolver( board, cc=cc )
+                solver.stats.addHook( lambda event, s: events.append( event ) )
+                if count:
+                    solver.countSolutions( 20 )
+                else:
+                    assert solver.solve() == 0
+
+                stats = solver.stats
+                solutions = solver.numSolutions if count else 1
+                assert ( events.count( "node" ), events.count( "backtrack" ), events.count( "solution" ) ) == ( stats.nodes, stats.backtracks, solutions )
+                assert stats.backtracks == solver.trail.getUndoCount()
+                assert stats.nodes >= stats.maxDepth
+                undone += stats.backtracks
+    assert undone > 0
+
+# Merging adds up the workers' counters and keeps the deepest search
+def test_merge_adds_up ( ):
+    runs = []
+    for _, board in boards()[-2:]:
+        solver = makeSolver( board )
+        solver.solve()
+        runs.append( solver.stats )
+
+    total = SolverStats.SolverStats().merge( runs[0] ).merge( runs[1] )
+    for name in SolverStats.SolverStats.COUNTERS:
+        if name == "maxDepth":
+            assert total.maxDepth == max( runs[0].maxDepth, runs[1].maxDepth )
+        else:
+            assert getattr( total, name ) == getattr( runs[0], name ) + getattr( runs[1], name )
+
+def test_dict_round_trip ( ):
+    solver = makeSolver( boards()[-1][1], cc="norvigCheck" )
+    solver.solve()
+    d = solver.stats.toDict()
+    assert sorted( d ) == sorted( SolverStats.SolverStats.COUNTERS )
+    assert SolverStats.SolverStats.fromDict( d ).toDict() == d
+    assert SolverStats.SolverStats.fromDict( { "nodes" : 3 } ).toDict() == dict( SolverStats.SolverStats().toDict(), nodes=3 )
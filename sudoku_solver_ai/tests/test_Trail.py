@@ -0,0 +1,85 @@
+import gc
+import weakref
+import BoardGenerator
+import BTSolver
+import Trail
+from conftest import makeSolver, nonzero
+
+def puzzle ( ):
+    return BoardGenerator.BoardGenerator( 3, 3, 5 ).puzzle( 30 )
+
+# Everything an undo has to put back: domains, assignments and the
+# network's value and candidate counts
+def state ( network ):
+    return ( [ ( list( v.getDomain().values ), v.isAssigned() ) for v in network.getVariables() ],
+             [ ( nonzero( c.valueCounts ), nonzero( c.candidateCounts ) ) for c in network.getConstraints() ],
+             network.assignedCount )
+
+# Assigns a value and propagates it the way the search does
+def decide ( solver ):
+    v = solver.selectNextVariable()
+    solver.trail.placeTrailMarker()
+    solver.trail.push( v )
+    v.assignValue( v.getDomain().values[0] )
+    solver.assignedVars.appendleft( v )
+    return solver.checkConsistency()
+
+def test_undo_restores_network ( ):
+    for bitDomains in [ False, True ]:
+        for cc in [ "forwardChecking", "norvigCheck" ]:
+            solver = makeSolver( puzzle(), cc=cc, bitDomains=bitDomains )
+            states = [ state( solver.network ) ]
+            for _ in range( 3 ):
+                decide( solver )
+                states.append( state( solver.network ) )
+
+            states.pop()
+            while states:
+                solver.trail.undo()
+                assert state( solver.network ) == states.pop()
+
+# A variable is recorded once per level however often it is pushed
+def test_one_entry_per_level ( ):
+    solver = makeSolver( puzzle(), cc="norvigCheck" )
+    trail  = solver.trail
+    v = solver.selectNextVariable()
+    values = list( v.getDomain().values )
+    base   = trail.size()
+
+    trail.placeTrailMarker()
+    trail.push( v )
+    v.removeValueFromDomain( values[0] )
+    trail.push( v )
+    v.removeValueFromDomain( values[1] )
+    assert trail.size() == base + 1
+
+    trail.placeTrailMarker()
+    trail.push( v )
+    assert trail.size() == base + 2
+
+    trail.undo()
+    trail.undo()
+    assert v.getDomain().values == values
+    assert trail.size() == base and trail.getUndoCount() == 2
+
+# Boards solved one after another on one trail, as Main does, leave
+# nothing behind: pushedAt only holds variables still on the trail, and
+# clearing it lets the last board's network go
+def test_shared_trail_lets_boards_go ( ):
+    trail = Trail.Trail()
+    networks = []
+    for board in BoardGenerator.BoardGenerator( 3, 3, 5 ).puzzles( 24, 4 ):
+        trail.clear()
+        solver = BTSolver.BTSolver( board, trail, "", "MinimumRemainingValue", "forwardChecking" )
+        solver.checkConsistency()
+        assert solver.solve() == 0
+        assert len( trail.pushedAt ) <= trail.size() and set( trail.pushedAt ) <= set( trail.variables )
+        networks.append( weakref.ref( solver.network ) )
+    assert trail.getUndoCount() > 0
+
+    del solver
+    gc.collect()
+    assert all( ref() is None for ref in networks[:-1] ) and networks[-1]() is not None
+    trail.clear()
+    gc.collect()
+    assert networks[-1]() is None and trail.variables == [] and trail.pushedAt == {}
@@ -0,0 +1,58 @@
+import random
+import BoardGenerator
+from conftest import makeSolver
+
+def puzzle ( seed ):
+    return BoardGenerator.BoardGenerator( 3, 3, seed ).puzzle( 24 )
+
+# The variable a plain scan of the network picks: the smallest domain,
+# then with useDegree the most unassigned neighbors, then network order
+def scan ( solver, useDegree ):
+    network = solver.network
+    best = None
+    for i, v in enumerate( network.getVariables() ):
+        if v.isAssigned():
+            continue
+        key = ( v.size(), i )
+        if useDegree:
+            key = ( v.size(), -sum( 1 for n in network.getNeighborsOfVariable( v ) if not n.isAssigned() ), i )
+        if best is None or key < best[0]:
+            best = ( key, v )
+    return best[1] if best is not None else None
+
+# Through assignments, propagation and undos the queue picks what the
+# scan does
+def test_select_matches_a_scan ( ):
+    rng = random.Random( 3 )
+    for var_sh, useDegree in [ ( "MinimumRemainingValue", False ), ( "MRVwithTieBreaker", True ) ]:
+        for cc in [ "forwardChecking", "norvigCheck" ]:
+            for seed in range( 3 ):
+                solver = makeSolver( puzzle( seed ), var_sh=var_sh, cc=cc )
+                trail  = solver.trail
+                levels = 0
+                for _ in range( 60 ):
+                    v = solver.variableQueue.select()
+                    assert v is scan( solver, useDegree )
+                    if v is None or ( levels and rng.random() < 0.3 ):
+                        if not levels:
+                            break
+                        trail.undo()
+                        levels -= 1
+                        continue
+
+                    # assign and propagate the way the search does
+                    trail.placeTrailMarker()
+                    trail.push( v )
+                    v.assignValue( rng.choice( v.getDomain().values ) )
+                    solver.assignedVars.appendleft( v )
+                    levels += 1
+                    if not solver.checkConsistency():
+                        trail.undo()
+                        levels -= 1
+
+# The legacy selectors agree with the queue they now sit on
+def test_legacy_selectors_agree ( ):
+    solver = makeSolver( puzzle( 1 ), var_sh="MRVwithTieBreaker" )
+    assert solver.MRVwithTieBreaker()[0] is solver.variableQueue.select()
+    solver = makeSolver( puzzle( 1 ) )
+    assert solver.getMRV() is scan( solver, False )
@@ -0,0 +1,43 @@
+import pytest
+np = pytest.importorskip( "numpy" )
+import BoardGenerator
+import SudokuBoard
+import VectorBatch
+from conftest import makeSolver, isSolutionOf, unsatBoards
+
+# Easy and hard boards with one solution and with many, an empty board
+# and boards without a solution, in several geometries
+def mixedBoards ( ):
+    out = [ SudokuBoard.SudokuBoard( 3, 3, board=[ [ 0 ] * 9 for _ in range( 9 ) ] ) ]
+    for p, q, givens, unique in [ ( 3, 3, 40, True ), ( 3, 3, 24, True ), ( 3, 3, 10, False ), ( 2, 3, 8, False ) ]:
+        out += BoardGenerator.BoardGenerator( p, q, 13, unique ).puzzles( givens, 3 )
+    out.append( SudokuBoard.SudokuBoard( 2, 3, board=[ [ 0 ] * 6 for _ in range( 6 ) ] ) )
+    return out + unsatBoards()
+
+# Every board comes out solved exactly when the sequential search solves it
+def test_matches_sequential_search ( ):
+    boards = mixedBoards()
+    for chunkSize in [ 1, 4, 64 ]:
+        batch   = VectorBatch.VectorBatch( 3, 3, "", "MinimumRemainingValue", "forwardChecking", chunkSize )
+        results = list( batch.solveBoards( boards ) )
+        assert [ board for board, _ in results ] == boards
+
+        for board, solution in results:
+            solver = makeSolver( board )
+            solver.solve()
+            assert ( solution is not None ) == solver.hassolution
+            if solution is not None:
+                assert isSolutionOf( BoardGenerator.BoardGenerator( board.p, board.q, 0 ), solution, board )
+
+        assert batch.numBoards == len( boards )
+        assert batch.numSolutions == sum( 1 for _, s in results if s is not None )
+        assert batch.numPropagated > 0 and batch.numSearched > 0
+
+def test_solve_grids ( ):
+    boards = BoardGenerator.BoardGenerator( 3, 3, 5 ).puzzles( 30, 4 )
+    grids  = [ b.board for b in boards ] + [ [ [ 0 ] * 9 for _ in range( 9 ) ] ]
+    solutions, solved = VectorBatch.VectorBatch( 3, 3, "", "MinimumRemainingValue", "norvigCheck" ).solve( grids )
+    assert solutions.shape == ( 5, 9, 9 ) and solved.all()
+    for grid, solution in zip( grids, solutions ):
+        board = SudokuBoard.SudokuBoard( 3, 3, board=grid )
+        assert isSolutionOf( BoardGenerator.BoardGenerator( 3, 3, 0 ), SudokuBoard.SudokuBoard( 3, 3, board=solution.tolist() ), board )
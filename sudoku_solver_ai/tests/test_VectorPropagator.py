@@ -0,0 +1,72 @@
+import pytest
+np = pytest.importorskip( "numpy" )
+import BoardGenerator
+import SudokuBoard
+import VectorPropagator
+from conftest import flat, unsatBoards
+
+SHAPES = [ ( 2, 3 ), ( 3, 2 ), ( 3, 3 ), ( 3, 4 ) ]
+
+def puzzles ( p, q ):
+    out = []
+    for givens, unique in [ ( p*q*p*q // 2, False ), ( p*q*p*q // 3, True ), ( p*q, False ) ]:
+        out += BoardGenerator.BoardGenerator( p, q, 17, unique ).puzzles( givens, 3 )
+    return out
+
+# The unit counts hold, for every cell and value, the count over the
+# cells of its row, column and block as found by walking them
+def test_unit_counts_follow_the_geometry ( ):
+    rng = np.random.default_rng( 3 )
+    for p, q in SHAPES:
+        N = p*q
+        x = rng.random( ( 2, N, N, N ) ) < 0.3
+        rows, cols, blocks = [ np.broadcast_to( c, x.shape ) for c in VectorPropagator.unitCounts( x, p, q ) ]
+        for b in range( 2 ):
+            for i in range( N ):
+                for j in range( N ):
+                    block = [ ( r, c ) for r in range( N ) for c in range( N ) if ( r // p, c // q ) == ( i // p, j // q ) ]
+                    assert ( rows[b, i, j] == x[b, i, :, :].sum( axis=0 ) ).all()
+                    assert ( cols[b, i, j] == x[b, :, j, :].sum( axis=0 ) ).all()
+                    assert ( blocks[b, i, j] == sum( x[b, r, c] for r, c in block ) ).all()
+
+# Propagation keeps the givens and every solution: the reduced board has
+# as many solutions as the board it came from
+def test_reduced_boards_keep_their_solutions ( ):
+    filled = 0
+    for p, q in SHAPES:
+        generator = BoardGenerator.BoardGenerator( p, q, 0 )
+        for board in puzzles( p, q ):
+            reduced  = VectorPropagator.reduceBoard( board )
+            expected = generator.countSolutions( flat( board ), 20 )
+            assert reduced is not None and ( reduced.p, reduced.q ) == ( p, q )
+            assert all( g in ( 0, v ) for g, v in zip( flat( board ), flat( reduced ) ) )
+            assert generator.countSolutions( flat( reduced ), 20 ) == expected
+            if expected == 1:
+                _, solution = generator.search( flat( board ), 1 )
+                assert all( v in ( 0, s ) for v, s in zip( flat( reduced ), solution ) )
+            filled += flat( reduced ).count( 0 ) < flat( board ).count( 0 )
+    assert filled > 0
+
+# A board is only called unsolvable when it has no solution, and clashing
+# givens always are
+def test_unsat_detection ( ):
+    found = 0
+    for board in unsatBoards():
+        assert BoardGenerator.BoardGenerator( board.p, board.q, 0 ).countSolutions( flat( board ), 1 ) == 0
+        if VectorPropagator.reduceBoard( board ) is None:
+            found += 1
+    clash = SudokuBoard.SudokuBoard( 3, 4, board=[ [ 7 ] + [ 0 ] * 10 + [ 7 ] ] + [ [ 0 ] * 12 for _ in range( 11 ) ] )
+    assert VectorPropagator.reduceBoard( clash ) is None
+    assert found > 0
+
+# Boards propagated together come out as they do one by one
+def test_batch_matches_single_boards ( ):
+    for p, q in SHAPES:
+        boards = puzzles( p, q ) + [ b for b in unsatBoards() if ( b.p, b.q ) == ( p, q ) ]
+        cand, ok = VectorPropagator.propagate( VectorPropagator.candidateTensor( [ b.board for b in boards ], p, q ), p, q )
+        grids = VectorPropagator.toGrids( cand )
+        for board, grid, solvable in zip( boards, grids, ok ):
+            reduced = VectorPropagator.reduceBoard( board )
+            assert solvable == ( reduced is not None )
+            if solvable:
+                assert grid.tolist() == reduced.board